@@ -1,27 +1,68 @@
+import argparse
+import faulthandler
 import logging
+import os
+import sqlite3
+from typing import TYPE_CHECKING, Optional
 
-import model.data_model as DM
-import view.MasterFrame as MF
+from view.util.startup_timing import StartupTimer
 
-import faulthandler
+if TYPE_CHECKING:
+    import model.data_model as DM
+    import view.MasterFrame as MF
 
 
 class Main:
     connection_manager = None
-    data_model: DM.DataModel = None
-    master_frame: MF.MasterFrame = None
+    data_model: "DM.DataModel" = None
+    master_frame: "MF.MasterFrame" = None
 
-    def __init__(self):
+    def __init__(self, startup_timer: Optional[StartupTimer] = None):
+        # Imported here rather than at the top, so a startup timer sees them load. The heavier libraries (ArchivesSnake,
+        # keyring, PIL) are left to the modules that use them, and load on first use rather than before the window shows
+        import model.data_model as DM
+        import view.MasterFrame as MF
         from controller.connection_manager import ConnectionManager
+        from controller.record_cache import RecordCache
+
+        if startup_timer is not None:
+            startup_timer.mark("modules imported")
 
         # Get the singleton instance of DataModel and initialize it with self
         Main.data_model = DM.DataModel(self)
-        Main.connection_manager = ConnectionManager(self)
+        try:
+            record_cache = RecordCache()
+        except (OSError, sqlite3.Error) as e:
+            logging.warning(f"Record cache unavailable, every read will go to the server: {e}")
+            record_cache = None
+        Main.connection_manager = ConnectionManager(self, record_cache=record_cache)
+        if startup_timer is not None:
+            startup_timer.mark("model and record cache ready")
+
+        def first_paint():
+            startup_timer.mark("first paint")
+            startup_timer.stop()
+            logging.info(startup_timer.report())
 
-        Main.master_frame = MF.MasterFrame(Main.connection_manager)
+        Main.master_frame = MF.MasterFrame(
+            Main.connection_manager,
+            on_first_paint=first_paint if startup_timer is not None else None,
+        )
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ArchivesSpace Collections Manager")
+    parser.add_argument(
+        "--startup-timing",
+        action="store_true",
+        default=os.environ.get("ACM_STARTUP_TIMING", "").strip().lower() in ("1", "true"),
+        help="log how long startup took to reach the first paint, and its slowest imports",
+    )
+    arguments = parser.parse_args()
+    timer = None
+    if arguments.startup_timing:
+        timer = StartupTimer()
+        timer.start()
     logging.basicConfig(level=logging.DEBUG)
     faulthandler.enable()
-    app = Main()
+    app = Main(timer)
@@ -0,0 +1,39 @@
+"""Records and query leaves shared by the tests of the query engine: the optimizer, parser, indexes and column store"""
+
+from unittest.mock import Mock
+
+from model.query_node import NO_DATA_QUERY_TYPES, SET_QUERY_TYPES, QueryNode
+from model.query_type import QueryType
+from model.resource_field import ResourceField
+
+# id_0 values covering the awkward cases: prefixes of one another, empty, missing, differing only in case, and not text
+ID_VALUES = ["A.M85", "A.M8", "D.48", "", None, "a.m85", "M85", 3, "XM8Y"]
+
+
+def make_records(copies: int = 2) -> list[dict]:
+    """copies runs of ID_VALUES as resource records with ids from 1. A None value is left out of every other record"""
+    records = []
+    for i, value in enumerate(ID_VALUES * copies):
+        record = {"uri": f"/repositories/2/resources/{i + 1}", "level": "series"}
+        if value is not None or i % 2:
+            record["id_0"] = value
+        records.append(record)
+    return records
+
+
+def make_records_by_id(copies: int = 2) -> dict[int, dict]:
+    """make_records, keyed by resource id"""
+    return {i + 1: record for i, record in enumerate(make_records(copies))}
+
+
+def leaf(query_type: QueryType, value=None, field=ResourceField.id_0) -> QueryNode:
+    return QueryNode(Mock(), field, query_type, value)
+
+
+def comparison_data(query_type: QueryType):
+    """Data for a leaf of query_type that some, but not all, of make_records match"""
+    if query_type in NO_DATA_QUERY_TYPES:
+        return None
+    if query_type in SET_QUERY_TYPES:
+        return ["A.M85", "D.48", "nope"]
+    return "M8"
@@ -0,0 +1,128 @@
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from observer.ui_event import UiEvent
+from view.util.background_worker import BackgroundWorker
+
+
+@pytest.fixture
+def event_manager():
+    return Mock()
+
+
+@pytest.fixture
+def worker(event_manager):
+    worker = BackgroundWorker(max_workers=2, event_manager=event_manager)
+    yield worker
+    worker.shutdown()
+
+
+def drain_until(worker, delivered=1, timeout=2.0):
+    """Drain as the Tk event loop would, until enough results have been delivered"""
+    total = 0
+    deadline = time.monotonic() + timeout
+    while total < delivered and time.monotonic() < deadline:
+        total += worker.drain()
+        time.sleep(0.01)
+    return total
+
+
+class TestBackgroundWorker:
+    def test_is_a_singleton_until_shut_down(self, worker):
+        assert BackgroundWorker() is worker
+
+    def test_results_are_delivered_on_the_draining_thread(self, worker):
+        seen = []
+        worker.submit(
+            lambda task: threading.get_ident(),
+            on_done=lambda worker_thread: seen.append((worker_thread, threading.get_ident())),
+        )
+
+        assert drain_until(worker) == 1
+        [(worker_thread, delivered_on)] = seen
+        assert worker_thread != delivered_on == threading.get_ident()
+
+    def test_nothing_is_delivered_without_draining(self, worker):
+        done = Mock()
+        task = worker.submit(lambda task: 1, on_done=done)
+        task.future.result(timeout=2)
+
+        done.assert_not_called()
+
+    def test_success_publishes_the_event(self, worker, event_manager):
+        worker.submit(lambda task: {"repositories": []}, event=UiEvent.REPOSITORIES_LOADED)
+        worker.submit(lambda task: 3, event=UiEvent.QUERY_UPDATED)
+
+        drain_until(worker, delivered=2)
+
+        published = {call.args[0]: call.args[1] for call in event_manager.publish_event.call_args_list}
+        assert published == {
+            UiEvent.REPOSITORIES_LOADED: {"repositories": []},
+            UiEvent.QUERY_UPDATED: {"result": 3},
+        }
+
+    def test_errors_go_to_on_error(self, worker, event_manager):
+        errors = []
+
+        def fail(task):
+            raise ValueError("no")
+
+        worker.submit(fail, on_error=errors.append)
+        drain_until(worker)
+
+        assert [str(e) for e in errors] == ["no"]
+        event_manager.publish_event.assert_not_called()
+
+    def test_unhandled_errors_are_published(self, worker, event_manager):
+        def fail(task):
+            raise ValueError("no")
+
+        worker.submit(fail, name="Failing")
+        drain_until(worker)
+
+        event, data = event_manager.publish_event.call_args.args
+        assert event == UiEvent.TASK_FAILED
+        assert data["task"] == "Failing"
+        assert isinstance(data["error"], ValueError)
+
+    def test_a_failing_callback_does_not_stop_delivery(self, worker):
+        delivered = []
+        worker.submit(lambda task: 1, on_done=lambda _: 1 / 0)
+        worker.submit(lambda task: 2, on_done=delivered.append)
+
+        drain_until(worker, delivered=2)
+
+        assert delivered == [2]
+
+    def test_cancelling_stops_the_work_and_drops_its_result(self, worker):
+        started = threading.Event()
+        done = Mock()
+
+        def wait_for_cancel(task):
+            started.set()
+            return task.cancel_event.wait(2)
+
+        task = worker.submit(wait_for_cancel, on_done=done)
+        assert started.wait(2)
+        task.cancel()
+        assert task.future.result(timeout=2) is None
+        assert task.done()
+
+        assert worker.drain() == 0
+        done.assert_not_called()
+
+    def test_attach_polls_on_the_roots_event_loop(self, worker):
+        root = Mock()
+        worker.attach(root)
+
+        delay, poll = root.after.call_args.args
+        assert delay == BackgroundWorker.POLL_INTERVAL_MS
+        done = Mock()
+        worker.submit(lambda task: 1, on_done=done).future.result(timeout=2)
+        poll()
+
+        done.assert_called_once_with(1)
+        assert root.after.call_count == 2
@@ -0,0 +1,177 @@
+import threading
+from unittest.mock import Mock
+
+import pytest
+
+from controller.bulk_updater import BulkUpdater, UpdateResult
+from controller.connection_exceptions import ConflictError, ServerError
+
+
+def make_record(resource_id, lock_version=0, title="Old"):
+    return {
+        "uri": f"/repositories/2/resources/{resource_id}",
+        "lock_version": lock_version,
+        "title": title,
+    }
+
+
+def retitle(record):
+    record["title"] = record["title"] + " (revised)"
+    return record
+
+
+@pytest.fixture
+def connection_manager():
+    manager = Mock()
+    manager.update_resource_record.return_value = {"status": "Updated"}
+    return manager
+
+
+class TestBulkUpdater:
+    def test_updates_every_record_without_touching_the_originals(self, connection_manager):
+        records = [(i, make_record(i)) for i in range(1, 11)]
+
+        report = BulkUpdater(connection_manager, retitle, max_workers=3).run(2, records)
+
+        assert report.updated == 10
+        assert not report.failed
+        written = {
+            call.args[1]: call.args[2]
+            for call in connection_manager.update_resource_record.call_args_list
+        }
+        assert written[4]["title"] == "Old (revised)"
+        assert records[3][1]["title"] == "Old"
+        assert report.throughput > 0
+
+    def test_transform_returning_none_skips_the_write(self, connection_manager):
+        report = BulkUpdater(connection_manager, lambda record: None).run(
+            2, [(1, make_record(1))]
+        )
+
+        assert report.skipped == 1
+        connection_manager.update_resource_record.assert_not_called()
+
+    def test_unchanged_records_are_not_written(self, connection_manager):
+        report = BulkUpdater(connection_manager, lambda record: record).run(
+            2, [(1, make_record(1))]
+        )
+
+        assert report.unchanged == 1
+        assert report.results[0].diff is None
+        connection_manager.update_resource_record.assert_not_called()
+
+    def test_results_carry_the_diff(self, connection_manager):
+        report = BulkUpdater(connection_manager, retitle).run(2, [(1, make_record(1))])
+
+        assert report.results[0].diff == [
+            {"op": "replace", "path": "/title", "value": "Old (revised)"}
+        ]
+
+    def test_dry_run_reports_diffs_without_writing(self, connection_manager):
+        report = BulkUpdater(connection_manager, retitle, dry_run=True).run(
+            2, [(1, make_record(1)), (2, make_record(2))]
+        )
+
+        assert report.would_update == 2
+        assert report.results[0].diff
+        assert "2 would update" in report.summary()
+        connection_manager.update_resource_record.assert_not_called()
+
+    def test_conflict_refetches_and_reapplies(self, connection_manager):
+        connection_manager.update_resource_record.side_effect = [
+            ConflictError("stale"),
+            {"status": "Updated"},
+        ]
+        connection_manager.get_resource_record.return_value = make_record(
+            1, lock_version=1, title="Edited elsewhere"
+        )
+
+        report = BulkUpdater(connection_manager, retitle).run(2, [(1, make_record(1))])
+
+        assert report.updated == 1
+        assert report.retries == 1
+        final = connection_manager.update_resource_record.call_args.args[2]
+        assert final == make_record(1, lock_version=1, title="Edited elsewhere (revised)")
+
+    def test_gives_up_after_max_conflict_retries(self, connection_manager):
+        connection_manager.update_resource_record.side_effect = ConflictError("stale")
+        connection_manager.get_resource_record.return_value = make_record(1)
+
+        report = BulkUpdater(connection_manager, retitle, max_conflict_retries=2).run(
+            2, [(1, make_record(1))]
+        )
+
+        (result,) = report.failed
+        assert result.attempts == 3
+        assert "Still conflicting" in result.error
+
+    def test_failures_are_reported_per_record_and_the_run_continues(
+        self, connection_manager
+    ):
+        def update(repo, resource_id, record):
+            if resource_id == 2:
+                raise ServerError("invalid record")
+            return {"status": "Updated"}
+
+        connection_manager.update_resource_record.side_effect = update
+        results = []
+
+        report = BulkUpdater(connection_manager, retitle).run(
+            2, [(i, make_record(i)) for i in (1, 2, 3)], on_result=results.append
+        )
+
+        assert report.updated == 2
+        (failed,) = report.failed
+        assert isinstance(failed, UpdateResult)
+        assert (failed.resource_id, failed.status) == (2, UpdateResult.FAILED)
+        assert "invalid record" in failed.error
+        assert [result.status for result in results if result.resource_id != 2] == [
+            UpdateResult.UPDATED,
+            UpdateResult.UPDATED,
+        ]
+        assert len(results) == 3
+        assert "1 failed" in report.summary()
+
+    def test_unexpected_exceptions_fail_only_their_record(self, connection_manager):
+        def transform(record):
+            if record["uri"].endswith("/2"):
+                record.get("notes").append({"type": "odd"})
+            return retitle(record)
+
+        report = BulkUpdater(connection_manager, transform).run(
+            2, [(i, make_record(i)) for i in (1, 2, 3)]
+        )
+
+        assert report.updated == 2
+        (result,) = report.failed
+        assert isinstance(result, UpdateResult)
+        assert (result.resource_id, result.status) == (2, UpdateResult.FAILED)
+        assert result.error.startswith("AttributeError")
+
+    def test_in_flight_records_are_bounded(self, connection_manager):
+        release = threading.Event()
+        pulled = []
+
+        def records():
+            for i in range(1, 20):
+                pulled.append(i)
+                yield i, make_record(i)
+
+        def update(repo, resource_id, record):
+            release.wait(5)
+            return {}
+
+        connection_manager.update_resource_record.side_effect = update
+        updater = BulkUpdater(connection_manager, retitle, max_workers=2, max_in_flight=3)
+        finished = threading.Thread(target=updater.run, args=(2, records()))
+        finished.start()
+        finished.join(0.2)
+
+        assert len(pulled) == 3
+        release.set()
+        finished.join(5)
+        assert len(pulled) == 19
+
+    def test_invalid_worker_count(self, connection_manager):
+        with pytest.raises(ValueError):
+            BulkUpdater(connection_manager, retitle, max_workers=0)
@@ -0,0 +1,178 @@
+from unittest.mock import Mock
+
+import pytest
+
+from controller import cli
+from controller.connection_exceptions import AuthenticationError
+from controller.connection_manager import ConnectionManager
+from model.credential_index_manager import CredentialInfo
+
+
+def credential(name, username="archivist", server="https://aspace.example.edu"):
+    return CredentialInfo(username, server, name, f"{username}@{server}")
+
+
+@pytest.fixture
+def connection_manager(mocker):
+    records = {
+        2: [
+            {"uri": "/repositories/2/resources/1", "id_0": "A.1", "title": "One", "lock_version": 0},
+            {"uri": "/repositories/2/resources/2", "id_0": "B.2", "title": "Two", "lock_version": 0},
+        ],
+        3: [
+            {"uri": "/repositories/3/resources/5", "id_0": "A.5", "title": "Five", "lock_version": 3},
+        ],
+    }
+    manager = ConnectionManager(None)
+    manager.connection = Mock()
+    manager.get_repositories = Mock(
+        return_value=[{"uri": "/repositories/2"}, {"uri": "/repositories/3"}]
+    )
+    manager.get_resource_list = Mock(
+        side_effect=lambda repo: [int(r["uri"].rsplit("/", 1)[1]) for r in records[repo]]
+    )
+    manager.get_resource_batch = Mock(
+        side_effect=lambda repo, ids: [
+            r for r in records[repo] if int(r["uri"].rsplit("/", 1)[1]) in ids
+        ]
+    )
+    manager.update_resource_record = Mock(return_value={"lock_version": 1})
+    mocker.patch.object(cli, "connect", return_value=manager)
+    return manager
+
+
+def query_file(tmp_path, text):
+    path = tmp_path / "run.acmq"
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def run(*argv):
+    return cli.main([str(arg) for arg in argv] + ["--no-cache"])
+
+
+class TestFindCredential:
+    def test_single_stored_credential_is_the_default(self):
+        only = credential("Production")
+        assert cli.find_credential([only], None) is only
+
+    def test_matches_display_name_before_username(self):
+        production = credential("Production", username="admin")
+        other = credential("admin", username="someone")
+
+        assert cli.find_credential([production, other], "admin") is other
+        assert cli.find_credential([production, other], "someone") is other
+
+    @pytest.mark.parametrize("name", [None, "Missing", "archivist"])
+    def test_ambiguous_or_missing_names_are_refused(self, name):
+        with pytest.raises(LookupError):
+            cli.find_credential([credential("One"), credential("Two")], name)
+
+
+class TestMain:
+    def test_log_streams_matches_from_every_repository(self, tmp_path, capsys, connection_manager):
+        path = query_file(tmp_path, 'IF {%id_0 &Starts_With "A."} THEN LOG')
+
+        assert run(path) == cli.EXIT_OK
+
+        out, err = capsys.readouterr()
+        assert out.splitlines() == [
+            "2\t1\t/repositories/2/resources/1\tOne",
+            "3\t5\t/repositories/3/resources/5\tFive",
+        ]
+        assert "Repository 3: finished" in err
+        assert "2 records matched" in err
+        connection_manager.update_resource_record.assert_not_called()
+
+    def test_note_action_updates_matches_of_the_chosen_repositories(
+        self, tmp_path, capsys, connection_manager
+    ):
+        path = query_file(
+            tmp_path,
+            'IF {%id_0 &Starts_With "A."} THEN CREATE_NOTE -type=General -content="Checked"',
+        )
+
+        assert run(path, "--repo", 2, "--repo", 3) == cli.EXIT_OK
+
+        written = {
+            call.args[1]: call.args[2]["notes"][0]["subnotes"][0]["content"]
+            for call in connection_manager.update_resource_record.call_args_list
+        }
+        assert written == {1: "Checked", 5: "Checked"}
+        assert "updated\t3\t5\t/repositories/3/resources/5" in capsys.readouterr().out
+
+    def test_cached_runs_sync_each_repository_first(
+        self, tmp_path, capsys, connection_manager, mocker
+    ):
+        from controller.record_cache import RecordCache
+
+        mocker.patch.object(
+            cli, "RecordCache", side_effect=lambda: RecordCache(tmp_path / "cache.sqlite3")
+        )
+        connection_manager.connection.server = "https://aspace.example.edu"
+        path = query_file(tmp_path, 'IF {%id_0 &Starts_With "A."} THEN LOG')
+        assert cli.main([str(path), "--repo", "2"]) == cli.EXIT_OK
+        capsys.readouterr()
+
+        # Someone else renumbers resource 2 between runs
+        connection_manager.get_modified_resource_ids = Mock(return_value=[2])
+        connection_manager.get_deleted_resource_ids = Mock(return_value=set())
+        connection_manager.get_resource_batch.reset_mock()
+        connection_manager.get_resource_batch.side_effect = lambda repo, ids: [
+            {"uri": "/repositories/2/resources/2", "id_0": "A.2", "title": "Two"}
+        ]
+
+        assert cli.main([str(path), "--repo", "2"]) == cli.EXIT_OK
+
+        assert capsys.readouterr().out.splitlines() == [
+            "2\t1\t/repositories/2/resources/1\tOne",
+            "2\t2\t/repositories/2/resources/2\tTwo",
+        ]
+        # Only the record changed since the first run was downloaded again
+        connection_manager.get_resource_batch.assert_called_once_with(2, [2])
+
+    def test_dry_run_writes_nothing(self, tmp_path, capsys, connection_manager):
+        path = query_file(
+            tmp_path, 'IF {%id_0 &Starts_With "A."} THEN DELETE_NOTE -type=General'
+        )
+        connection_manager.get_resource_batch.side_effect = lambda repo, ids: [
+            {
+                "uri": f"/repositories/{repo}/resources/{i}",
+                "id_0": f"A.{i}",
+                "notes": [{"type": "odd"}],
+            }
+            for i in ids
+        ]
+
+        assert run(path, "--dry-run", "--repo", 2) == cli.EXIT_OK
+
+        connection_manager.update_resource_record.assert_not_called()
+        assert "2 would update" in capsys.readouterr().err
+
+    def test_failed_writes_give_a_failure_exit_code(self, tmp_path, connection_manager):
+        from controller.connection_exceptions import ServerError
+
+        connection_manager.update_resource_record.side_effect = ServerError("down")
+        path = query_file(
+            tmp_path, 'IF {%id_0 &Starts_With "A."} THEN CREATE_NOTE -type=General -content="x"'
+        )
+
+        assert run(path, "--journal", tmp_path / "run.journal") == cli.EXIT_FAILURES
+        assert '"event":"failed"' in (tmp_path / "run.journal").read_text()
+
+    @pytest.mark.parametrize(
+        "text", ['IF {%id_0 &Starts_With "A."', 'IF {%id_0 &Equals "A"} THEN DELETE_RECORD']
+    )
+    def test_bad_query_files_are_usage_errors(self, tmp_path, capsys, connection_manager, text):
+        assert run(query_file(tmp_path, text)) == cli.EXIT_USAGE
+        assert str(tmp_path) in capsys.readouterr().err
+        cli.connect.assert_not_called()
+
+    def test_missing_query_file_is_a_usage_error(self, tmp_path, connection_manager):
+        assert run(tmp_path / "missing.acmq") == cli.EXIT_USAGE
+
+    def test_connection_failures_have_their_own_exit_code(self, tmp_path, mocker):
+        mocker.patch.object(cli, "connect", side_effect=AuthenticationError("bad password"))
+        path = query_file(tmp_path, 'IF {%id_0 &Equals "A"} THEN LOG')
+
+        assert run(path) == cli.EXIT_CONNECTION
@@ -0,0 +1,120 @@
+import pytest
+
+from controller.column_store import Column, ColumnStore, bitmap_rows, rows_bitmap
+from controller.record_cache import RecordCache
+from model.operator_node import OperatorNode
+from model.operator_type import OperatorType
+from model.query_type import QueryType
+from model.resource_field import ResourceField
+from query_helpers import comparison_data, leaf, make_records
+
+class TestBitmapHelpers:
+    def test_round_trip(self):
+        assert list(bitmap_rows(rows_bitmap([0, 3, 9, 64], 70))) == [0, 3, 9, 64]
+
+    def test_empty_bitmap(self):
+        assert list(bitmap_rows(0)) == []
+
+
+class TestColumn:
+    def test_dictionary_encodes_values(self):
+        column = Column(["a", "b", "a", "a"])
+
+        assert column.dictionary == ["a", "b"]
+        assert list(column.codes) == [0, 1, 0, 0]
+        assert list(column.postings[0]) == [0, 2, 3]
+
+
+class TestColumnStoreMatchesCompiledQueries:
+    """Every comparison over columns must agree with the record-by-record predicate"""
+
+    @pytest.mark.parametrize("query_type", list(QueryType))
+    def test_each_query_type(self, query_type):
+        query = leaf(query_type, comparison_data(query_type))
+        records = make_records(3)
+        store = ColumnStore(records)
+
+        predicate = query.compile()
+        expected = [i for i, record in enumerate(records) if predicate(record)]
+
+        assert list(bitmap_rows(store.evaluate(query))) == expected
+
+    def test_operators(self):
+        records = make_records(3)
+        records[4]["level"] = "file"
+        query = OperatorNode(
+            OperatorType.OR,
+            [
+                OperatorNode(
+                    OperatorType.AND,
+                    [
+                        leaf(QueryType.Starts_With, "A."),
+                        leaf(QueryType.Not_Ends_With, "5"),
+                    ],
+                ),
+                OperatorNode(
+                    OperatorType.NOT,
+                    [leaf(QueryType.Equals, "series", ResourceField.level)],
+                ),
+            ],
+        )
+        store = ColumnStore(records)
+
+        predicate = query.compile()
+        expected = [
+            (i + 1, record) for i, record in enumerate(records) if predicate(record)
+        ]
+
+        assert list(store.matches(query)) == expected
+
+    def test_invalid_query_raises(self):
+        with pytest.raises(ValueError):
+            ColumnStore(make_records(3)).evaluate(leaf(QueryType.Equals))
+
+    def test_columns_are_built_on_demand(self):
+        store = ColumnStore(make_records(3))
+        store.evaluate(leaf(QueryType.Equals, "x"))
+
+        assert list(store.columns) == [ResourceField.id_0]
+
+
+    def test_multi_valued_paths_are_tested_per_record(self):
+        from model.field_path import FieldPath
+
+        records = make_records(3)
+        records[1]["dates"] = [{"expression": "1923"}, {"expression": "1950"}]
+        records[5]["dates"] = [{"expression": "1950"}]
+        query = leaf(QueryType.Equals, "1950", FieldPath("dates[*].expression"))
+        store = ColumnStore(records)
+
+        assert list(bitmap_rows(store.evaluate(query))) == [1, 5]
+        assert store.columns == {}
+        with pytest.raises(ValueError):
+            store.column(FieldPath("dates[*].expression"))
+
+
+class TestColumnStoreFromCache:
+    def test_builds_from_cached_repository(self):
+        cache = RecordCache(":memory:")
+        cache.put_many("server", 2, make_records(3))
+        cache.put("server", 3, {"uri": "/repositories/3/resources/1", "id_0": "A.M85"})
+
+        store = ColumnStore.from_cache(cache, "server", 2)
+
+        assert len(store) == len(make_records(3))
+        matches = store.matches(leaf(QueryType.Equals, "A.M85"))
+        assert [resource_id for resource_id, _ in matches] == [1, 10, 19]
+        cache.close()
+
+    def test_query_manager_evaluates_over_columns(self):
+        from controller.query_manager import QueryManager
+
+        store = ColumnStore(make_records(3))
+        query = OperatorNode(
+            OperatorType.OR,
+            [leaf(QueryType.Equals, "D.48"), leaf(QueryType.Equals, "M85")],
+        )
+
+        matches = list(QueryManager().evaluate_columns(query, store))
+
+        assert [resource_id for resource_id, _ in matches] == [3, 7, 12, 16, 21, 25]
@@ -93,6 +93,7 @@ from controller.connection_exceptions import (
     ConfigurationError,
     AuthenticationError,
     NetworkError,
+    OperationCancelledError,
     ServerError,
 )
 from controller.HttpRequestType import HttpRequestType
@@ -409,6 +410,39 @@ class TestConnectionRetryBehavior:
         assert mock_client_class.call_count == 3
         assert mock_sleep.call_count == 2  # Sleep between retries
 
+    def test_cancelling_cuts_the_retry_wait_short(self, mocker):
+        """Test that a test cancelled while waiting to retry gives up rather than retrying"""
+        import threading
+
+        conn = Connection("https://test.com", "user", "pass")
+        mock_client_class = mocker.patch("controller.connection.ASnakeClient")
+        mock_sleep = mocker.patch("time.sleep")
+        mock_client_class.side_effect = requests.exceptions.ConnectionError("down")
+        cancel = mocker.Mock(spec=threading.Event)
+        cancel.is_set.return_value = False
+        cancel.wait.return_value = True  # Set during the wait
+
+        with pytest.raises(OperationCancelledError):
+            conn.test_connection(cancel)
+
+        assert mock_client_class.call_count == 1
+        cancel.wait.assert_called_once_with(1)
+        mock_sleep.assert_not_called()
+
+    def test_cancelled_test_makes_no_attempt(self, mocker):
+        """Test that a test cancelled before it starts never contacts the server"""
+        import threading
+
+        conn = Connection("https://test.com", "user", "pass")
+        mock_client_class = mocker.patch("controller.connection.ASnakeClient")
+        cancel = threading.Event()
+        cancel.set()
+
+        with pytest.raises(OperationCancelledError):
+            conn.test_connection(cancel)
+
+        mock_client_class.assert_not_called()
+
     def test_test_connection_fails_after_exhausting_retries(self, mocker):
         """Test that connection fails after all retries are exhausted"""
         conn = Connection("https://test.com", "user", "pass")
@@ -720,3 +754,121 @@ class TestConnectionIntegration:
         # Call query without calling test_connection first
         with pytest.raises(AuthenticationError):
             result = conn.query(HttpRequestType.GET, "/test")
+
+
+class TestConnectionPooling:
+    """Test that every client shares the connection's pooled session"""
+
+    def test_client_uses_pooled_session(self, mocker):
+        conn = Connection("https://test.com", "user", "pass")
+        mock_client_class = mocker.patch("controller.connection.ASnakeClient")
+        mock_client = mocker.Mock(spec=ASnakeClient)
+        mock_client_class.return_value = mock_client
+
+        conn.test_connection()
+
+        assert mock_client.session is conn.get_http_session()
+
+    def test_session_survives_retesting(self, mocker):
+        conn = Connection("https://test.com", "user", "pass")
+        mock_client_class = mocker.patch("controller.connection.ASnakeClient")
+        mock_client1 = mocker.Mock(spec=ASnakeClient)
+        mock_client2 = mocker.Mock(spec=ASnakeClient)
+        mock_client_class.side_effect = [mock_client1, mock_client2]
+
+        conn.test_connection()
+        conn.test_connection()
+
+        assert mock_client1.session is mock_client2.session
+
+    def test_pool_config_is_applied(self, mocker):
+        from controller.http_session import PoolConfig
+
+        conn = Connection(
+            "https://test.com", "user", "pass", pool_config=PoolConfig(pool_maxsize=3)
+        )
+        adapter = conn.get_http_session().get_adapter("https://test.com")
+        assert adapter._pool_maxsize == 3
+
+    def test_pool_stats_before_use_are_empty(self):
+        conn = Connection("https://test.com", "user", "pass")
+        assert conn.pool_stats().requests_sent == 0
+
+    def test_close_invalidates_connection(self, mocker):
+        conn = Connection("https://test.com", "user", "pass")
+        mock_client_class = mocker.patch("controller.connection.ASnakeClient")
+        mock_client_class.return_value = mocker.Mock(spec=ASnakeClient)
+        conn.test_connection()
+
+        conn.close()
+
+        assert conn.validated is False
+        assert conn.http_session is None
+        with pytest.raises(AuthenticationError):
+            conn.query(HttpRequestType.GET, "/test")
+
+
+class TestConnectionThrottling:
+    """Test that query backs off and retries on 429/503 responses"""
+
+    @pytest.fixture
+    def tested_connection(self, mocker):
+        conn = Connection("https://test.com", "user", "pass")
+        mock_client_class = mocker.patch("controller.connection.ASnakeClient")
+        mock_client = mocker.Mock(spec=ASnakeClient)
+        mock_client_class.return_value = mock_client
+        conn.test_connection()
+        mock_client.get.reset_mock()
+        return conn, mock_client
+
+    @pytest.mark.parametrize("status_code", [429, 503])
+    def test_query_retries_after_throttle(self, mocker, tested_connection, status_code):
+        mock_sleep = mocker.patch("time.sleep")
+        conn, mock_client = tested_connection
+        throttled = mocker.Mock(status_code=status_code, headers={"Retry-After": "3"})
+        ok = mocker.Mock(status_code=200)
+        mock_client.get.side_effect = [throttled, ok]
+
+        result = conn.query(HttpRequestType.GET, "/test")
+
+        assert result is ok
+        assert mock_client.get.call_count == 2
+        assert any(call.args[0] >= 2.9 for call in mock_sleep.call_args_list)
+        assert conn.rate_limiter.throttled_count == 1
+
+    def test_query_raises_server_error_when_throttling_persists(
+        self, mocker, tested_connection
+    ):
+        mocker.patch("time.sleep")
+        conn, mock_client = tested_connection
+        mock_client.get.return_value = mocker.Mock(status_code=429, headers={})
+
+        with pytest.raises(ServerError):
+            conn.query(HttpRequestType.GET, "/test")
+
+        assert mock_client.get.call_count == conn.max_throttle_retries + 1
+
+    def test_query_passes_params_through(self, tested_connection):
+        conn, mock_client = tested_connection
+        conn.query(HttpRequestType.GET, "/test", params={"page": 1})
+        mock_client.get.assert_called_with("/test", params={"page": 1})
+
+    def test_update_is_throttled_like_queries(self, mocker, tested_connection):
+        mocker.patch("time.sleep")
+        conn, mock_client = tested_connection
+        ok = mocker.Mock(status_code=200)
+        mock_client.put.side_effect = [mocker.Mock(status_code=429, headers={}), ok]
+
+        assert conn.update("/repositories/2/resources/1", {"title": "x"}) is ok
+        mock_client.put.assert_called_with(
+            "/repositories/2/resources/1", json={"title": "x"}
+        )
+        assert conn.rate_limiter.throttled_count == 1
+
+    def test_rate_limiter_can_be_shared(self):
+        from controller.rate_limiter import RateLimiter
+
+        limiter = RateLimiter()
+        conn1 = Connection("https://a.com", "u", "p", rate_limiter=limiter)
+        conn2 = Connection("https://a.com", "u", "p", rate_limiter=limiter)
+        assert conn1.rate_limiter is conn2.rate_limiter
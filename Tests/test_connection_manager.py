@@ -5,7 +5,7 @@ import requests
 from requests.exceptions import ConnectionError, Timeout
 
 # Import the classes we're testing
-from controller.connection_manager import ConnectionManager
+from controller.connection_manager import ConnectionManager, RetrievalStats
 from controller.connection import Connection
 from controller.HttpRequestType import HttpRequestType
 
@@ -316,9 +316,7 @@ class TestResourceUpdate:
         mock_response = Mock()
         mock_response.status_code = 200
 
-        # Mock the client.put method
-        mock_connection.client = Mock()
-        mock_connection.client.put.return_value = mock_response
+        mock_connection.update.return_value = mock_response
 
         result = connection_manager.put_resource_record(2, 1, resource_data)
 
@@ -334,14 +332,13 @@ class TestResourceUpdate:
 
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_connection.client = Mock()
-        mock_connection.client.put.return_value = mock_response
+        mock_connection.update.return_value = mock_response
 
         connection_manager.put_resource_record(2, 1, resource_data)
 
         # Verify correct endpoint and data
-        mock_connection.client.put.assert_called_once_with(
-            "/repositories/2/resources/1", json=resource_data
+        mock_connection.update.assert_called_once_with(
+            "/repositories/2/resources/1", resource_data
         )
 
     def test_put_resource_record_handles_client_errors(
@@ -352,8 +349,7 @@ class TestResourceUpdate:
 
         mock_response = Mock()
         mock_response.status_code = 400  # Client error
-        mock_connection.client = Mock()
-        mock_connection.client.put.return_value = mock_response
+        mock_connection.update.return_value = mock_response
 
         result = connection_manager.put_resource_record(2, 1, resource_data)
 
@@ -368,8 +364,7 @@ class TestResourceUpdate:
 
         mock_response = Mock()
         mock_response.status_code = 500  # Server error
-        mock_connection.client = Mock()
-        mock_connection.client.put.return_value = mock_response
+        mock_connection.update.return_value = mock_response
 
         result = connection_manager.put_resource_record(2, 1, resource_data)
 
@@ -382,8 +377,7 @@ class TestResourceUpdate:
         """Test behavior when update raises connection exception."""
         resource_data = {"title": "Test Collection"}
 
-        mock_connection.client = Mock()
-        mock_connection.client.put.side_effect = ConnectionError("Network failed")
+        mock_connection.update.side_effect = ConnectionError("Network failed")
 
         result = connection_manager.put_resource_record(2, 1, resource_data)
 
@@ -400,8 +394,7 @@ class TestResourceUpdate:
         for repo_id, resource_id in test_cases:
             mock_response = Mock()
             mock_response.status_code = 200
-            mock_connection.client = Mock()
-            mock_connection.client.put.return_value = mock_response
+            mock_connection.update.return_value = mock_response
 
             result = connection_manager.put_resource_record(
                 repo_id, resource_id, resource_data
@@ -409,9 +402,64 @@ class TestResourceUpdate:
 
             assert result is True
             expected_endpoint = f"/repositories/{repo_id}/resources/{resource_id}"
-            mock_connection.client.put.assert_called_with(
-                expected_endpoint, json=resource_data
-            )
+            mock_connection.update.assert_called_with(expected_endpoint, resource_data)
+
+
+class TestUpdateResourceRecord:
+    """Test conflict-aware updates"""
+
+    @staticmethod
+    def respond(mock_connection, status_code, body):
+        response = Mock()
+        response.status_code = status_code
+        response.json.return_value = body
+        mock_connection.update.return_value = response
+
+    def test_success_returns_server_response(self, connection_manager, mock_connection):
+        self.respond(mock_connection, 200, {"status": "Updated", "lock_version": 2})
+
+        result = connection_manager.update_resource_record(2, 1, {"lock_version": 1})
+
+        assert result["lock_version"] == 2
+        mock_connection.update.assert_called_once_with(
+            "/repositories/2/resources/1", {"lock_version": 1}
+        )
+
+    @pytest.mark.parametrize(
+        "status_code, body",
+        [
+            (409, {"error": "The record you tried to update has been modified"}),
+            (400, {"error": {"lock_version": ["is stale"]}}),
+        ],
+    )
+    def test_stale_lock_version_raises_conflict(
+        self, connection_manager, mock_connection, status_code, body
+    ):
+        from controller.connection_exceptions import ConflictError
+
+        self.respond(mock_connection, status_code, body)
+
+        with pytest.raises(ConflictError):
+            connection_manager.update_resource_record(2, 1, {"lock_version": 1})
+
+    def test_other_rejections_raise_server_error(self, connection_manager, mock_connection):
+        from controller.connection_exceptions import ConflictError, ServerError
+
+        self.respond(mock_connection, 400, {"error": {"title": ["is required"]}})
+
+        with pytest.raises(ServerError) as error:
+            connection_manager.update_resource_record(2, 1, {})
+        assert not isinstance(error.value, ConflictError)
+
+    def test_unreachable_server_raises_network_error(
+        self, connection_manager, mock_connection
+    ):
+        from controller.connection_exceptions import NetworkError
+
+        mock_connection.update.side_effect = ConnectionError("refused")
+
+        with pytest.raises(NetworkError):
+            connection_manager.update_resource_record(2, 1, {})
 
 
 class TestErrorPropagation:
@@ -611,3 +659,552 @@ class TestConnectionManagerIntegration:
         # with pytest.raises(SomeExpectedError):
         #     real_connection_manager.get_repository(99999)
         pass
+
+
+class TestConcurrentResourceRetrieval:
+    """Test the thread pool fetch mode of get_resource_records."""
+
+    @staticmethod
+    def _mock_get_resource(repo_id, resource_id):
+        return {"uri": f"/repositories/{repo_id}/resources/{resource_id}"}
+
+    def test_concurrent_fetch_returns_all_resources(self, connection_manager):
+        connection_manager.get_resource_record = Mock(
+            side_effect=self._mock_get_resource
+        )
+        resource_ids = list(range(1, 51))
+
+        result = connection_manager.get_resource_records(
+            2, resource_ids, max_workers=8
+        )
+
+        assert set(result) == set(resource_ids)
+        assert result[7]["uri"] == "/repositories/2/resources/7"
+
+    def test_ordered_delivery_preserves_request_order(self, connection_manager):
+        import time
+
+        def slow_for_low_ids(repo_id, resource_id):
+            time.sleep(0.02 if resource_id < 3 else 0)
+            return self._mock_get_resource(repo_id, resource_id)
+
+        connection_manager.get_resource_record = Mock(side_effect=slow_for_low_ids)
+        resource_ids = [1, 2, 3, 4, 5, 6]
+
+        result = connection_manager.get_resource_records(
+            2, resource_ids, max_workers=3, ordered=True
+        )
+
+        assert list(result) == resource_ids
+
+    def test_as_completed_delivery_returns_everything(self, connection_manager):
+        connection_manager.get_resource_record = Mock(
+            side_effect=self._mock_get_resource
+        )
+        resource_ids = list(range(1, 21))
+
+        result = connection_manager.get_resource_records(
+            2, resource_ids, max_workers=4, ordered=False
+        )
+
+        assert sorted(result) == resource_ids
+
+    def test_in_flight_window_is_bounded(self, connection_manager):
+        import threading
+        import time
+
+        lock = threading.Lock()
+        active = {"now": 0, "peak": 0}
+
+        def tracked(repo_id, resource_id):
+            with lock:
+                active["now"] += 1
+                active["peak"] = max(active["peak"], active["now"])
+            time.sleep(0.005)
+            with lock:
+                active["now"] -= 1
+            return self._mock_get_resource(repo_id, resource_id)
+
+        connection_manager.get_resource_record = Mock(side_effect=tracked)
+
+        connection_manager.get_resource_records(
+            2, list(range(1, 41)), max_workers=4, max_in_flight=4
+        )
+
+        assert active["peak"] <= 4
+
+    def test_critical_error_aborts_concurrent_fetch(self, connection_manager):
+        from controller.connection_exceptions import NetworkError
+
+        def failing(repo_id, resource_id):
+            if resource_id == 5:
+                raise NetworkError("Network down")
+            return self._mock_get_resource(repo_id, resource_id)
+
+        connection_manager.get_resource_record = Mock(side_effect=failing)
+
+        with pytest.raises(NetworkError):
+            connection_manager.get_resource_records(
+                2, list(range(1, 101)), max_workers=4
+            )
+
+        assert connection_manager.get_resource_record.call_count < 100
+
+    def test_unexpected_errors_are_collected_not_raised(self, connection_manager):
+        def flaky(repo_id, resource_id):
+            if resource_id % 2:
+                raise RuntimeError("odd record")
+            return self._mock_get_resource(repo_id, resource_id)
+
+        connection_manager.get_resource_record = Mock(side_effect=flaky)
+
+        result = connection_manager.get_resource_records(
+            2, list(range(1, 11)), max_workers=3
+        )
+
+        assert sorted(result) == [2, 4, 6, 8, 10]
+
+    def test_invalid_worker_count_raises(self, connection_manager):
+        with pytest.raises(ValueError):
+            connection_manager.get_resource_records(2, [1], max_workers=0)
+
+
+class TestBulkResourceRetrieval:
+    """Test all_ids listing and id_set batch retrieval."""
+
+    @staticmethod
+    def _response(payload):
+        response = Mock()
+        response.json.return_value = payload
+        return response
+
+    def test_get_resource_list_uses_single_all_ids_request(
+        self, connection_manager, mock_connection
+    ):
+        mock_connection.query.return_value = self._response([1, 2, 3])
+
+        result = connection_manager.get_resource_list(2)
+
+        assert result == [1, 2, 3]
+        mock_connection.query.assert_called_once_with(
+            HttpRequestType.GET,
+            "/repositories/2/resources",
+            params={"all_ids": "true"},
+        )
+
+    def test_get_resource_list_rejects_error_payload(
+        self, connection_manager, mock_connection
+    ):
+        from controller.connection_exceptions import ServerError
+
+        mock_connection.query.return_value = self._response({"error": "nope"})
+
+        with pytest.raises(ServerError):
+            connection_manager.get_resource_list(2)
+
+    def test_get_resource_batch_sends_id_set(self, connection_manager, mock_connection):
+        records = [{"uri": "/repositories/2/resources/4"}]
+        mock_connection.query.return_value = self._response(records)
+
+        result = connection_manager.get_resource_batch(2, [4, 5])
+
+        assert result == records
+        mock_connection.query.assert_called_once_with(
+            HttpRequestType.GET,
+            "/repositories/2/resources",
+            params={"id_set": [4, 5]},
+        )
+
+    def test_get_all_resource_records_batches_requests(
+        self, connection_manager, mock_connection
+    ):
+        ids = list(range(1, 11))
+
+        def query(request_type, endpoint, params):
+            if "all_ids" in params:
+                return self._response(ids)
+            return self._response(
+                [{"uri": f"/repositories/2/resources/{i}"} for i in params["id_set"]]
+            )
+
+        mock_connection.query.side_effect = query
+
+        stats = RetrievalStats()
+
+        result = connection_manager.get_all_resource_records(2, batch_size=4, stats=stats)
+
+        assert sorted(result) == ids
+        # one listing call plus ceil(10 / 4) batch calls
+        assert mock_connection.query.call_count == 4
+        assert (stats.fetched, stats.requests) == (10, 3)
+
+    def test_get_all_resource_records_tolerates_vanished_records(
+        self, connection_manager, mock_connection
+    ):
+        mock_connection.query.side_effect = [
+            self._response([1, 2]),
+            self._response([{"uri": "/repositories/2/resources/1"}]),
+        ]
+
+        result = connection_manager.get_all_resource_records(2)
+
+        assert list(result) == [1]
+
+    def test_resource_id_from_uri(self):
+        from controller.connection_manager import resource_id_from_uri
+
+        assert resource_id_from_uri("/repositories/2/resources/15") == 15
+
+
+class TestStreamingResourceRetrieval:
+    """Test the iter_resource_records generator."""
+
+    @staticmethod
+    def _batch_query(ids):
+        def query(request_type, endpoint, params):
+            response = Mock()
+            if "all_ids" in params:
+                response.json.return_value = ids
+            else:
+                response.json.return_value = [
+                    {"uri": f"/repositories/2/resources/{i}"} for i in params["id_set"]
+                ]
+            return response
+
+        return query
+
+    def test_yields_id_record_pairs(self, connection_manager, mock_connection):
+        mock_connection.query.side_effect = self._batch_query([3, 1, 2])
+
+        result = list(connection_manager.iter_resource_records(2))
+
+        assert [resource_id for resource_id, _ in result] == [3, 1, 2]
+        assert result[0][1]["uri"] == "/repositories/2/resources/3"
+
+    def test_is_lazy(self, connection_manager, mock_connection):
+        mock_connection.query.side_effect = self._batch_query([1, 2])
+
+        records = connection_manager.iter_resource_records(2)
+
+        mock_connection.query.assert_not_called()
+        next(records)
+        assert mock_connection.query.call_count == 2
+
+    def test_fetches_one_batch_at_a_time(self, connection_manager, mock_connection):
+        mock_connection.query.side_effect = self._batch_query(list(range(1, 11)))
+
+        records = connection_manager.iter_resource_records(2, batch_size=5)
+        for _ in range(5):
+            next(records)
+
+        # listing plus the first batch only
+        assert mock_connection.query.call_count == 2
+
+    def test_explicit_ids_skip_listing(self, connection_manager, mock_connection):
+        mock_connection.query.side_effect = self._batch_query([])
+
+        result = list(connection_manager.iter_resource_records(2, [7, 8]))
+
+        assert [resource_id for resource_id, _ in result] == [7, 8]
+        assert mock_connection.query.call_count == 1
+
+    def test_invalid_repository_raises_on_first_use(self, connection_manager):
+        with pytest.raises(ValueError):
+            next(connection_manager.iter_resource_records(0))
+
+
+class TestRecordCacheIntegration:
+    """Test that ConnectionManager reads through and invalidates its record cache."""
+
+    @pytest.fixture
+    def cached_manager(self, mock_connection, mocker):
+        from controller.record_cache import RecordCache
+
+        mock_connection.server = "https://test.archivesspace.org"
+        cache = RecordCache(":memory:")
+        cm = ConnectionManager(mocker.Mock(), record_cache=cache)
+        cm.connection = mock_connection
+        yield cm
+        cache.close()
+
+    def test_second_read_is_served_from_cache(self, cached_manager, mock_connection):
+        response = Mock()
+        response.json.return_value = {"uri": "/repositories/2/resources/1"}
+        mock_connection.query.return_value = response
+
+        first = cached_manager.get_resource_record(2, 1)
+        second = cached_manager.get_resource_record(2, 1)
+
+        assert first == second
+        mock_connection.query.assert_called_once()
+
+    def test_error_responses_are_not_cached(self, cached_manager, mock_connection):
+        response = Mock()
+        response.json.return_value = {"error": "Resource not found"}
+        mock_connection.query.return_value = response
+
+        cached_manager.get_resource_record(2, 1)
+        cached_manager.get_resource_record(2, 1)
+
+        assert mock_connection.query.call_count == 2
+
+    def test_streaming_only_requests_uncached_ids(
+        self, cached_manager, mock_connection
+    ):
+        cached_manager.record_cache.put(
+            mock_connection.server, 2, {"uri": "/repositories/2/resources/1"}
+        )
+        response = Mock()
+        response.json.return_value = [{"uri": "/repositories/2/resources/2"}]
+        mock_connection.query.return_value = response
+
+        result = dict(cached_manager.iter_resource_records(2, [1, 2]))
+
+        assert sorted(result) == [1, 2]
+        mock_connection.query.assert_called_once_with(
+            HttpRequestType.GET,
+            "/repositories/2/resources",
+            params={"id_set": [2]},
+        )
+
+    def test_put_invalidates_cached_record(self, cached_manager, mock_connection):
+        cached_manager.record_cache.put(
+            mock_connection.server, 2, {"uri": "/repositories/2/resources/1"}
+        )
+        mock_connection.client = Mock()
+        mock_connection.client.put.return_value = Mock(status_code=200)
+
+        cached_manager.put_resource_record(2, 1, {"title": "Updated"})
+
+        assert cached_manager.record_cache.get(mock_connection.server, 2, 1) is None
+
+
+class TestIncrementalSync:
+    """Test sync_repository against a fake ArchivesSpace."""
+
+    SERVER = "https://test.archivesspace.org"
+
+    @pytest.fixture
+    def syncing_manager(self, mock_connection, mocker):
+        from controller.record_cache import RecordCache
+
+        mock_connection.server = self.SERVER
+        cache = RecordCache(":memory:")
+        cm = ConnectionManager(mocker.Mock(), record_cache=cache)
+        cm.connection = mock_connection
+        yield cm
+        cache.close()
+
+    @staticmethod
+    def _fake_server(all_ids, modified_ids, deleted_uris):
+        calls = []
+
+        def query(request_type, endpoint, params):
+            calls.append((endpoint, dict(params)))
+            response = Mock()
+            if endpoint == "/delete-feed":
+                response.json.return_value = {
+                    "this_page": 1,
+                    "last_page": 1,
+                    "results": deleted_uris,
+                }
+            elif "modified_since" in params:
+                response.json.return_value = modified_ids
+            elif "all_ids" in params:
+                response.json.return_value = all_ids
+            else:
+                response.json.return_value = [
+                    {"uri": f"/repositories/2/resources/{i}", "lock_version": 1}
+                    for i in params["id_set"]
+                ]
+            return response
+
+        return query, calls
+
+    def test_requires_record_cache(self, connection_manager):
+        with pytest.raises(ValueError):
+            connection_manager.sync_repository(2)
+
+    def test_first_sync_is_full(self, syncing_manager, mock_connection):
+        query, calls = self._fake_server([1, 2, 3], [], [])
+        mock_connection.query.side_effect = query
+
+        result = syncing_manager.sync_repository(2)
+
+        assert result.full is True
+        assert result.fetched == 3
+        assert syncing_manager.record_cache.cached_ids(self.SERVER, 2) == {1, 2, 3}
+        assert syncing_manager.record_cache.get_watermark(self.SERVER, 2) is not None
+
+    def test_full_sync_drops_records_no_longer_on_server(
+        self, syncing_manager, mock_connection
+    ):
+        syncing_manager.record_cache.put(
+            self.SERVER, 2, {"uri": "/repositories/2/resources/9"}
+        )
+        query, _ = self._fake_server([1], [], [])
+        mock_connection.query.side_effect = query
+
+        result = syncing_manager.sync_repository(2)
+
+        assert result.deleted == 1
+        assert syncing_manager.record_cache.cached_ids(self.SERVER, 2) == {1}
+
+    def test_second_sync_only_fetches_changes(self, syncing_manager, mock_connection):
+        query, calls = self._fake_server([1, 2, 3], [], [])
+        mock_connection.query.side_effect = query
+        syncing_manager.sync_repository(2)
+
+        query, calls = self._fake_server(
+            [1, 2, 3],
+            [2],
+            ["/repositories/2/resources/3", "/repositories/5/resources/3"],
+        )
+        mock_connection.query.side_effect = query
+
+        result = syncing_manager.sync_repository(2)
+
+        assert result.full is False
+        assert result.fetched == 1
+        assert result.deleted == 1
+        assert syncing_manager.record_cache.cached_ids(self.SERVER, 2) == {1, 2}
+        fetched_ids = [p["id_set"] for e, p in calls if "id_set" in p]
+        assert fetched_ids == [[2]]
+        since = [p["modified_since"] for e, p in calls if "modified_since" in p]
+        assert since and all(isinstance(value, int) for value in since)
+
+    def test_delete_feed_is_paged(self, syncing_manager, mock_connection):
+        pages = {
+            1: {"this_page": 1, "last_page": 2, "results": ["/repositories/2/resources/1"]},
+            2: {"this_page": 2, "last_page": 2, "results": ["/repositories/2/resources/2"]},
+        }
+
+        def query(request_type, endpoint, params):
+            response = Mock()
+            response.json.return_value = pages[params["page"]]
+            return response
+
+        mock_connection.query.side_effect = query
+
+        assert syncing_manager.get_deleted_resource_ids(2, 0) == {1, 2}
+
+
+class TestRecordMemoIntegration:
+    """Test the per-run record memo."""
+
+    def test_by_id_lookups_hit_network_once_inside_memo(
+        self, connection_manager, mock_connection
+    ):
+        response = Mock()
+        response.json.return_value = {"uri": "/repositories/2/resources/1"}
+        mock_connection.query.return_value = response
+
+        with connection_manager.record_memo():
+            for _ in range(5):
+                connection_manager.get_resource_record(2, 1)
+
+        mock_connection.query.assert_called_once()
+
+    def test_memo_is_dropped_after_the_run(self, connection_manager, mock_connection):
+        response = Mock()
+        response.json.return_value = {"uri": "/repositories/2/resources/1"}
+        mock_connection.query.return_value = response
+
+        with connection_manager.record_memo():
+            connection_manager.get_resource_record(2, 1)
+        connection_manager.get_resource_record(2, 1)
+
+        assert connection_manager.active_memo is None
+        assert mock_connection.query.call_count == 2
+
+    def test_streamed_records_are_remembered(self, connection_manager, mock_connection):
+        response = Mock()
+        response.json.return_value = [{"uri": "/repositories/2/resources/1"}]
+        mock_connection.query.return_value = response
+
+        with connection_manager.record_memo():
+            list(connection_manager.iter_resource_records(2, [1]))
+            connection_manager.get_resource_record(2, 1)
+
+        mock_connection.query.assert_called_once()
+
+
+class TestSearchResourceIds:
+    """Test listing resources through the repository search index."""
+
+    def test_pages_through_every_hit(self, connection_manager, mock_connection):
+        pages = {
+            1: {"this_page": 1, "last_page": 2, "results": [{"uri": "/repositories/2/resources/7"}]},
+            2: {"this_page": 2, "last_page": 2, "results": [{"uri": "/repositories/2/resources/3"}]},
+        }
+
+        def query(request_type, endpoint, params):
+            response = Mock()
+            response.json.return_value = pages[params["page"]]
+            return response
+
+        mock_connection.query.side_effect = query
+
+        result = connection_manager.search_resource_ids(2, "level:collection")
+
+        assert result == [7, 3]
+        first_call = mock_connection.query.call_args_list[0]
+        assert first_call.args == (HttpRequestType.GET, "/repositories/2/search")
+        assert first_call.kwargs["params"]["q"] == "level:collection"
+        assert first_call.kwargs["params"]["type"] == ["resource"]
+        assert first_call.kwargs["params"]["fields"] == ["uri"]
+
+    def test_unexpected_response_raises_server_error(
+        self, connection_manager, mock_connection
+    ):
+        from controller.connection_exceptions import ServerError
+
+        mock_connection.query.return_value.json.return_value = {"error": "boom"}
+
+        with pytest.raises(ServerError):
+            connection_manager.search_resource_ids(2, "level:collection")
+
+
+class TestSetConnection:
+    """Test setting a new connection, tested on the calling thread or by a worker"""
+
+    @pytest.fixture
+    def manager(self, mocker):
+        manager = ConnectionManager(mocker.Mock())
+        manager.event_manager = Mock()
+        mocker.patch("controller.connection.Connection.test_connection")
+        return manager
+
+    def test_without_a_worker_the_test_runs_here(self, manager):
+        assert manager.set_connection("https://test.com", "user", "pass") is None
+
+        event, data = manager.event_manager.publish_event.call_args.args
+        assert data["is_valid"] is True
+        assert data["connection"] is manager.connection
+
+    def test_with_a_worker_the_outcome_is_published_when_it_finishes(self, manager):
+        from controller.connection_exceptions import AuthenticationError
+
+        worker = Mock()
+        Connection.test_connection.side_effect = AuthenticationError("bad password")
+
+        task = manager.set_connection("https://test.com", "user", "pass", worker=worker)
+
+        assert task is worker.submit.return_value
+        manager.event_manager.publish_event.assert_not_called()
+        work, on_done = worker.submit.call_args.args[0], worker.submit.call_args.kwargs["on_done"]
+        on_done(work(Mock()))
+        data = manager.event_manager.publish_event.call_args.args[1]
+        assert data["is_valid"] is False
+        assert "bad password" in data["error_message"]
+
+    def test_a_superseded_test_publishes_nothing(self, manager):
+        worker = Mock()
+        manager.set_connection("https://old.com", "user", "pass", worker=worker)
+        work, on_done = worker.submit.call_args.args[0], worker.submit.call_args.kwargs["on_done"]
+        manager.set_connection("https://new.com", "user", "pass")
+        manager.event_manager.publish_event.reset_mock()
+
+        on_done(work(Mock()))
+
+        manager.event_manager.publish_event.assert_not_called()
@@ -0,0 +1,90 @@
+from unittest.mock import Mock
+
+import pytest
+
+from model.field_path import FieldPath, field_path
+from model.query_node import QueryNode
+from model.query_type import QueryType
+from model.resource_field import ResourceField
+
+RECORD = {
+    "id_0": "A.M85",
+    "dates": [
+        {"expression": "1923-1950", "date_type": "inclusive"},
+        {"expression": "", "date_type": "bulk"},
+    ],
+    "extents": [{"number": "3"}, {"number": "12"}],
+    "notes": [
+        {"type": "abstract", "subnotes": [{"content": "Letters"}, {"content": "Maps"}]},
+        {"type": "odd", "subnotes": [{"content": "Photographs"}]},
+        {"type": "bioghist"},
+    ],
+    "user_defined": {"string_1": "box"},
+}
+
+
+class TestFieldPathAccess:
+    @pytest.mark.parametrize(
+        "expression, expected",
+        [
+            ("id_0", "A.M85"),
+            ("missing", ""),
+            ("user_defined.string_1", "box"),
+            ("user_defined.string_2", ""),
+            ("extents[0].number", "3"),
+            ("extents[-1].number", "12"),
+            ("extents[5].number", ""),
+            ("id_0.nested", ""),
+            ("dates[*].expression", ["1923-1950", ""]),
+            ("extents[*].number", ["3", "12"]),
+            ("notes[*].subnotes[*].content", ["Letters", "Maps", "Photographs"]),
+            ("notes[*].subnotes[0].content", ["Letters", "Photographs"]),
+            ("id_0[*]", []),
+        ],
+    )
+    def test_get(self, expression, expected):
+        assert FieldPath(expression).get(RECORD) == expected
+
+    @pytest.mark.parametrize("expression", ["", ".a", "a..b", "a[0]b", "a[x]", "a[*"])
+    def test_invalid_paths_are_rejected(self, expression):
+        with pytest.raises(ValueError):
+            FieldPath(expression)
+
+    def test_fields_map_to_top_level_keys(self):
+        path = field_path(ResourceField.id_0)
+
+        assert path.name == "id_0"
+        assert not path.multi_valued
+        assert field_path(ResourceField.id_0) is path
+
+    def test_paths_compare_by_expression(self):
+        assert FieldPath("dates[*].expression") == FieldPath("dates[*].expression")
+        assert len({FieldPath("a.b"), FieldPath("a.b"), FieldPath("a.c")}) == 2
+
+
+class TestQueryNodeOverPaths:
+    """A multi-valued path matches when any value does, and its negations when none does"""
+
+    @pytest.mark.parametrize(
+        "path, query_type, data, expected",
+        [
+            ("dates[*].expression", QueryType.Starts_With, "1923", True),
+            ("dates[*].expression", QueryType.Not_Starts_With, "1923", False),
+            ("dates[*].expression", QueryType.Equals, "1950", False),
+            ("dates[*].expression", QueryType.Not_Equals, "1950", True),
+            ("dates[*].expression", QueryType.Empty, None, False),
+            ("dates[*].expression", QueryType.Not_Empty, None, True),
+            ("notes[*].subnotes[*].content", QueryType.Contains, "Photo", True),
+            ("notes[*].subnotes[*].content", QueryType.Not_Contains, "Photo", False),
+            ("notes[*].subnotes[*].content", QueryType.In, ["Maps", "Plans"], True),
+            ("notes[*].subnotes[*].content", QueryType.Not_In, ["Plans"], True),
+            ("deaccessions[*].reason", QueryType.Empty, None, True),
+            ("deaccessions[*].reason", QueryType.Not_Equals, "x", True),
+            ("user_defined.string_1", QueryType.Equals, "box", True),
+        ],
+    )
+    def test_compiled_and_evaluated_agree(self, path, query_type, data, expected):
+        node = QueryNode(Mock(), FieldPath(path), query_type, data)
+
+        assert node.compile()(RECORD) is expected
+        assert node.eval_record(RECORD) is expected
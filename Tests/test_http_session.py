@@ -0,0 +1,68 @@
+import pytest
+from requests.adapters import HTTPAdapter
+
+from controller.http_session import PoolConfig, PoolStats, build_session, pool_stats
+
+
+class TestPoolConfig:
+    """Test PoolConfig defaults and validation"""
+
+    def test_defaults_are_sane(self):
+        config = PoolConfig()
+        assert config.pool_maxsize >= 1
+        assert config.pool_connections >= 1
+        assert config.keep_alive is True
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        [{"pool_connections": 0}, {"pool_maxsize": 0}, {"max_retries": -1}],
+    )
+    def test_invalid_values_raise_value_error(self, kwargs):
+        with pytest.raises(ValueError):
+            PoolConfig(**kwargs)
+
+
+class TestBuildSession:
+    """Test that build_session mounts a correctly sized adapter"""
+
+    def test_same_adapter_mounted_for_http_and_https(self):
+        session = build_session(PoolConfig(pool_maxsize=7))
+        https_adapter = session.get_adapter("https://example.org")
+        http_adapter = session.get_adapter("http://example.org")
+
+        assert isinstance(https_adapter, HTTPAdapter)
+        assert https_adapter is http_adapter
+        assert https_adapter._pool_maxsize == 7
+
+    def test_asnake_default_headers_are_set(self):
+        session = build_session(PoolConfig())
+        assert session.headers["Accept"] == "application/json"
+
+    def test_keep_alive_disabled_sends_connection_close(self):
+        session = build_session(PoolConfig(keep_alive=False))
+        assert session.headers["Connection"] == "close"
+
+
+class TestPoolStats:
+    """Test pool statistics collection"""
+
+    def test_fresh_session_reports_nothing(self):
+        stats = pool_stats(build_session(PoolConfig()))
+        assert stats == PoolStats()
+        assert stats.connections_reused == 0
+
+    def test_counts_requests_and_connections_per_host(self):
+        session = build_session(PoolConfig())
+        pool = session.get_adapter("https://example.org").poolmanager.connection_from_url(
+            "https://example.org"
+        )
+        pool.num_connections = 2
+        pool.num_requests = 10
+
+        stats = pool_stats(session)
+
+        assert stats.hosts == 1
+        assert stats.connections_opened == 2
+        assert stats.requests_sent == 10
+        assert stats.connections_reused == 8
+        assert stats.to_dict()["connections_reused"] == 8
@@ -0,0 +1,87 @@
+import pytest
+
+from controller.json_diff import diff, patch
+
+RESOURCE = {
+    "uri": "/repositories/2/resources/1",
+    "lock_version": 3,
+    "title": "Papers",
+    "notes": [
+        {"type": "abstract", "subnotes": [{"content": "Letters"}]},
+        {"type": "odd", "content": ["Misc"]},
+    ],
+    "extents": [{"number": "3", "extent_type": "linear_feet"}],
+}
+
+
+class TestDiff:
+    def test_equal_documents_have_no_diff(self):
+        assert diff(RESOURCE, dict(RESOURCE)) == []
+
+    def test_appended_note_is_a_single_add(self):
+        after = {**RESOURCE, "notes": RESOURCE["notes"] + [{"type": "bioghist"}]}
+
+        assert diff(RESOURCE, after) == [
+            {"op": "add", "path": "/notes/2", "value": {"type": "bioghist"}}
+        ]
+
+    def test_removed_note_is_a_single_remove(self):
+        after = {**RESOURCE, "notes": RESOURCE["notes"][1:]}
+
+        assert diff(RESOURCE, after) == [{"op": "remove", "path": "/notes/0"}]
+
+    def test_edit_inside_a_note_is_addressed_precisely(self):
+        notes = [
+            {"type": "abstract", "subnotes": [{"content": "Letters and maps"}]},
+            RESOURCE["notes"][1],
+        ]
+
+        assert diff(RESOURCE, {**RESOURCE, "notes": notes}) == [
+            {
+                "op": "replace",
+                "path": "/notes/0/subnotes/0/content",
+                "value": "Letters and maps",
+            }
+        ]
+
+    def test_keys_are_escaped(self):
+        assert diff({"a/b": 1, "c~d": 1}, {"a/b": 2}) == [
+            {"op": "remove", "path": "/c~0d"},
+            {"op": "replace", "path": "/a~1b", "value": 2},
+        ]
+
+    def test_type_changes_are_differences(self):
+        assert diff({"publish": 1}, {"publish": True}) == [
+            {"op": "replace", "path": "/publish", "value": True}
+        ]
+
+
+class TestPatch:
+    @pytest.mark.parametrize(
+        "after",
+        [
+            {**RESOURCE, "title": "Family papers", "level": "collection"},
+            {**RESOURCE, "notes": [RESOURCE["notes"][1], {"type": "new"}, RESOURCE["notes"][0]]},
+            {**RESOURCE, "notes": [], "extents": RESOURCE["extents"] * 3},
+            {key: value for key, value in RESOURCE.items() if key != "notes"},
+        ],
+    )
+    def test_patching_with_the_diff_reproduces_the_target(self, after):
+        assert patch(RESOURCE, diff(RESOURCE, after)) == after
+
+    def test_patch_leaves_the_original_alone(self):
+        patch(RESOURCE, [{"op": "remove", "path": "/notes/0"}])
+
+        assert len(RESOURCE["notes"]) == 2
+
+    @pytest.mark.parametrize(
+        "operation",
+        [
+            {"op": "remove", "path": "/missing"},
+            {"op": "replace", "path": "/notes/9/type", "value": "x"},
+            {"op": "move", "path": "/title", "from": "/uri"},
+        ],
+    )
+    def test_invalid_operations_raise(self, operation):
+        with pytest.raises(ValueError):
+            patch(RESOURCE, [operation])
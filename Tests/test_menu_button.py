@@ -258,6 +258,24 @@ class TestConcreteImplementations:
         # Should create connection dialog
         mock_dialog.assert_called_once_with(parent, connection_manager)
 
+    def test_configure_connection_dialog_leaves_publishing_to_set_connection(self, mocker):
+        """Saving publishes CONNECTION_CHANGED once, from set_connection, after the background test"""
+        from view.menu_buttons.ConfigureConnection import ConnectionDialog
+
+        worker = mocker.patch("view.menu_buttons.ConfigureConnection.BackgroundWorker")
+        dialog = mocker.Mock()
+        dialog.server.get.return_value = "https://aspace.example.edu"
+        dialog.username.get.return_value = "admin"
+        dialog.password.get.return_value = "secret"
+
+        ConnectionDialog.close_window(dialog)
+
+        dialog.connection_manager.set_connection.assert_called_once_with(
+            "https://aspace.example.edu", "admin", "secret", worker=worker.return_value
+        )
+        dialog.event_manager.publish_event.assert_not_called()
+        dialog.frame.destroy.assert_called_once()
+
     def test_configure_connection_dialog_reuse(self, mocker):
         """Test that existing dialog is reused if still open"""
         parent = mocker.Mock()
@@ -339,6 +357,41 @@ class TestConcreteImplementations:
         # Should call save_connection
         mock_save.assert_called_once_with(mock_connection)
 
+    def test_save_connection_tests_in_the_background_before_storing(self, mocker):
+        """The connection is tested on the BackgroundWorker, and only stored once the test passes"""
+        from controller.connection_exceptions import NetworkError
+        from view.menu_buttons import SaveConnection
+
+        mocker.patch.object(SaveConnection, "Toplevel")
+        mocker.patch.object(SaveConnection, "FrameUtils")
+        ttk = mocker.patch.object(SaveConnection, "ttk")
+        credentials = mocker.patch.object(SaveConnection, "credential_manager")
+        credentials.store_credential.return_value = True
+        worker = mocker.patch.object(SaveConnection, "BackgroundWorker").return_value
+        connection = mocker.Mock(server="https://aspace.example.edu", username="admin")
+
+        task = SaveConnection.save_connection(connection)
+
+        connection.test_connection.assert_not_called()
+        credentials.store_credential.assert_not_called()
+        assert task is worker.submit.return_value
+        submitted = worker.submit.call_args
+        work = submitted.args[0]
+        work(mocker.Mock(cancel_event="cancel"))
+        connection.test_connection.assert_called_once_with("cancel")
+
+        label = ttk.Label.return_value
+        submitted.kwargs["on_error"](NetworkError("unreachable"))
+        credentials.store_credential.assert_not_called()
+        assert "Network error" in label.configure.call_args.kwargs["text"]
+
+        submitted.kwargs["on_done"](None)
+        credentials.store_credential.assert_called_once()
+        assert "Successfully stored" in label.configure.call_args.kwargs["text"]
+
+        ttk.Button.call_args.kwargs["command"]()
+        task.cancel.assert_called_once()
+
     def test_save_connection_implements_popup_button(self, mocker):
         """Test that SaveConnectionButtonImpl implements PopupButton protocol"""
         parent = mocker.Mock()
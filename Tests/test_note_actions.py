@@ -0,0 +1,103 @@
+import pytest
+
+from controller.note_actions import build_transform, note_json, parse_action
+from model.action_type import ActionType
+from model.note_type import NoteType
+
+
+def scope_note(content, publish=True):
+    return {
+        "jsonmodel_type": "note_multipart",
+        "type": "scopecontent",
+        "persistent_id": "abc123",
+        "publish": publish,
+        "subnotes": [
+            {"jsonmodel_type": "note_text", "content": content, "publish": publish}
+        ],
+    }
+
+
+class TestParseAction:
+    def test_empty_action_is_log(self):
+        assert parse_action("").action_type == ActionType.Log
+
+    def test_names_and_flags_are_case_insensitive(self):
+        action = parse_action(
+            'create_note -TYPE=scope_and_contents -publish=TRUE -content="A \\"quoted\\" note"'
+        )
+
+        assert action.action_type == ActionType.Create_Note
+        assert action.note_type == NoteType.Scope_and_Contents
+        assert action.publish is True
+        assert action.content == 'A "quoted" note'
+
+    def test_note_type_can_be_given_as_its_archivesspace_code(self):
+        assert parse_action("DELETE_NOTE -type=bioghist").note_type == (
+            NoteType.Biographical_Historical
+        )
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "FROB",
+            "DELETE_NOTE",
+            "CREATE_NOTE -type=General",
+            "DELETE_NOTE -type=Nonsense",
+            "DELETE_NOTE -type=General -colour=red",
+            "CREATE_NOTE -type=General -publish=maybe -content=x",
+            "DELETE_NOTE -type=General stray",
+        ],
+    )
+    def test_rejects_malformed_actions(self, text):
+        with pytest.raises(ValueError):
+            parse_action(text)
+
+
+class TestBuildTransform:
+    def test_log_changes_nothing(self):
+        assert build_transform(parse_action("LOG")) is None
+
+    def test_record_actions_are_not_supported(self):
+        with pytest.raises(ValueError, match="not supported"):
+            build_transform(parse_action("DELETE_RECORD"))
+
+    def test_create_note_appends_once(self):
+        transform = build_transform(
+            parse_action('CREATE_NOTE -type=Scope_and_Contents -publish=true -content="Hi"')
+        )
+
+        record = transform({"notes": []})
+        assert record["notes"] == [
+            {
+                "type": "scopecontent",
+                "publish": True,
+                "jsonmodel_type": "note_multipart",
+                "subnotes": [
+                    {"jsonmodel_type": "note_text", "content": "Hi", "publish": True}
+                ],
+            }
+        ]
+        # The server adds ids of its own, which don't make the note a different one
+        assert transform({"notes": [scope_note("Hi")]}) == {"notes": [scope_note("Hi")]}
+
+    def test_singlepart_notes_carry_their_content_as_a_list(self):
+        note = note_json(parse_action('CREATE_NOTE -type=Abstract -content="Short"'))
+
+        assert note["jsonmodel_type"] == "note_singlepart"
+        assert note["content"] == ["Short"]
+
+    def test_delete_note_removes_only_that_type(self):
+        transform = build_transform(parse_action("DELETE_NOTE -type=Scope_and_Contents"))
+        other = {"type": "odd", "subnotes": []}
+
+        assert transform({"notes": [scope_note("x"), other]}) == {"notes": [other]}
+        assert transform({"title": "No notes"}) == {"title": "No notes"}
+
+    def test_replace_note_leaves_a_matching_note_alone(self):
+        transform = build_transform(
+            parse_action('REPLACE_NOTE -type=Scope_and_Contents -publish=true -content="New"')
+        )
+
+        assert transform({"notes": [scope_note("New")]}) == {"notes": [scope_note("New")]}
+        replaced = transform({"notes": [scope_note("Old"), scope_note("Older")]})
+        assert [note["subnotes"][0]["content"] for note in replaced["notes"]] == ["New"]
@@ -0,0 +1,121 @@
+import pytest
+from unittest.mock import Mock
+
+from model.operator_node import OperatorNode
+from model.operator_type import OperatorType
+from model.query_node import QueryNode
+from model.query_type import QueryType
+from model.resource_field import ResourceField
+
+
+def equals(value, field=ResourceField.id_0):
+    return QueryNode(Mock(), field, QueryType.Equals, value)
+
+
+class TestOperatorNodeValidation:
+    """Test OperatorNode.validate"""
+
+    def test_valid_and(self):
+        assert OperatorNode(OperatorType.AND, [equals("a"), equals("b")]).validate()
+
+    def test_not_takes_exactly_one_child(self):
+        assert OperatorNode(OperatorType.NOT, [equals("a")]).validate()
+        assert not OperatorNode(OperatorType.NOT, [equals("a"), equals("b")]).validate()
+
+    def test_and_needs_two_children(self):
+        assert not OperatorNode(OperatorType.AND, [equals("a")]).validate()
+
+    def test_non_node_children_are_invalid(self):
+        assert not OperatorNode(OperatorType.OR, [equals("a"), "b"]).validate()
+
+    def test_invalid_leaf_invalidates_tree(self):
+        bad = QueryNode(Mock(), ResourceField.id_0, QueryType.Equals)
+        assert not OperatorNode(OperatorType.OR, [equals("a"), bad]).validate()
+
+
+class TestOperatorNodeCompile:
+    """Test compiled predicates for boolean operators"""
+
+    def test_and(self):
+        predicate = OperatorNode(
+            OperatorType.AND, [equals("a"), equals("b", ResourceField.id_1)]
+        ).compile()
+        assert predicate({"id_0": "a", "id_1": "b"}) is True
+        assert predicate({"id_0": "a", "id_1": "c"}) is False
+
+    def test_or(self):
+        predicate = OperatorNode(
+            OperatorType.OR, [equals("a"), equals("b"), equals("c")]
+        ).compile()
+        assert predicate({"id_0": "c"}) is True
+        assert predicate({"id_0": "d"}) is False
+
+    def test_not(self):
+        predicate = OperatorNode(OperatorType.NOT, [equals("a")]).compile()
+        assert predicate({"id_0": "b"}) is True
+        assert predicate({"id_0": "a"}) is False
+
+    def test_nested_same_operator_is_flattened(self):
+        inner = OperatorNode(OperatorType.AND, [equals("a"), equals("b", ResourceField.id_1)])
+        outer = OperatorNode(OperatorType.AND, [inner, equals("c", ResourceField.id_2)])
+
+        assert len(outer._flattened_children(OperatorType.AND)) == 3
+        predicate = outer.compile()
+        assert predicate({"id_0": "a", "id_1": "b", "id_2": "c"}) is True
+        assert predicate({"id_0": "a", "id_1": "b", "id_2": "x"}) is False
+
+    def test_and_short_circuits(self):
+        later = Mock(spec=QueryNode)
+        later.validate.return_value = True
+        later_predicate = Mock(return_value=True)
+        later.compile.return_value = later_predicate
+        predicate = OperatorNode(OperatorType.AND, [equals("a"), later]).compile()
+
+        assert predicate({"id_0": "nope"}) is False
+        later_predicate.assert_not_called()
+
+    def test_exception_list_example(self):
+        """All finding aids except a list of identifiers, as in docs/QueryFormat.md"""
+        exceptions = ["A.A31", "A.M85", "D.122"]
+        query = OperatorNode(
+            OperatorType.AND,
+            [OperatorNode(OperatorType.NOT, [equals(value)]) for value in exceptions],
+        )
+        predicate = query.compile()
+
+        assert predicate({"id_0": "D.999"}) is True
+        assert predicate({"id_0": "A.M85"}) is False
+
+    def test_invalid_tree_does_not_compile(self):
+        with pytest.raises(ValueError):
+            OperatorNode(OperatorType.AND, [equals("a")]).compile()
+
+
+class TestOperatorNodeEval:
+    """Test that evaluating by id fetches the record once for the whole tree"""
+
+    def test_eval_fetches_once_for_all_leaves(self):
+        data_model = Mock()
+        data_model.main.connection_manager.get_resource_record.return_value = {
+            "id_0": "a",
+            "id_1": "b",
+        }
+        leaves = [
+            QueryNode(data_model, ResourceField.id_0, QueryType.Equals, "a"),
+            QueryNode(data_model, ResourceField.id_1, QueryType.Equals, "b"),
+            QueryNode(data_model, ResourceField.id_2, QueryType.Empty),
+        ]
+        query = OperatorNode(OperatorType.AND, leaves)
+
+        assert query.eval(2, 7) is True
+        data_model.main.connection_manager.get_resource_record.assert_called_once_with(
+            2, 7
+        )
+
+    def test_eval_record_needs_no_connection(self):
+        query = OperatorNode(
+            OperatorType.OR,
+            [equals("a"), OperatorNode(OperatorType.NOT, [equals("b")])],
+        )
+        assert query.eval_record({"id_0": "a"}) is True
+        assert query.eval_record({"id_0": "b"}) is False
@@ -0,0 +1,392 @@
+from unittest.mock import Mock
+
+from controller.query_manager import QueryManager
+from model.operator_node import OperatorNode
+from model.operator_type import OperatorType
+from model.query_node import QueryNode
+from model.query_type import QueryType
+from model.resource_field import ResourceField
+
+
+def equals(value):
+    return QueryNode(Mock(), ResourceField.id_0, QueryType.Equals, value)
+
+
+class TestQueryManagerEvaluate:
+    """Test streaming evaluation of compiled queries"""
+
+    def test_yields_only_matches_in_order(self):
+        query = OperatorNode(OperatorType.OR, [equals("a"), equals("c")])
+        records = [(1, {"id_0": "a"}), (2, {"id_0": "b"}), (3, {"id_0": "c"})]
+
+        result = list(QueryManager().evaluate(query, records))
+
+        assert [resource_id for resource_id, _ in result] == [1, 3]
+
+    def test_compiles_once(self, mocker):
+        query = equals("a")
+        compile_spy = mocker.spy(query, "compile")
+
+        list(QueryManager().evaluate(query, ((i, {"id_0": "a"}) for i in range(50))))
+
+        assert compile_spy.call_count == 1
+
+    def test_consumes_records_lazily(self):
+        consumed = []
+
+        def records():
+            for i in range(3):
+                consumed.append(i)
+                yield i, {"id_0": "a"}
+
+        matches = QueryManager().evaluate(equals("a"), records())
+        next(matches)
+
+        assert consumed == [0]
+
+
+class TestQueryManagerRunQuery:
+    """Test end-to-end streaming runs against a ConnectionManager"""
+
+    def test_run_query_fetches_each_record_once(self, mocker):
+        from controller.connection import Connection
+        from controller.connection_manager import ConnectionManager
+        from controller.HttpRequestType import HttpRequestType
+
+        connection = Mock(spec=Connection)
+
+        def query(request_type, endpoint, params):
+            response = Mock()
+            response.json.return_value = [
+                {"uri": f"/repositories/2/resources/{i}", "id_0": f"ID{i}"}
+                for i in params["id_set"]
+            ]
+            return response
+
+        connection.query.side_effect = query
+        connection_manager = ConnectionManager(mocker.Mock())
+        connection_manager.connection = connection
+        query_tree = OperatorNode(OperatorType.OR, [equals("ID1"), equals("ID3")])
+
+        matches = list(
+            QueryManager().run_query(
+                connection_manager, 2, query_tree, [1, 2, 3], use_search=False
+            )
+        )
+
+        assert [resource_id for resource_id, _ in matches] == [1, 3]
+        connection.query.assert_called_once_with(
+            HttpRequestType.GET, "/repositories/2/resources", params={"id_set": [1, 2, 3]}
+        )
+        assert connection_manager.active_memo is None
+
+
+class TestQueryManagerSync:
+    """Test that runs bring the record cache up to date before reading from it"""
+
+    @staticmethod
+    def cached_manager(mocker):
+        from controller.connection_manager import ConnectionManager
+        from controller.record_cache import RecordCache
+
+        cache = RecordCache(":memory:")
+        cache.put("server", 2, {"uri": "/repositories/2/resources/1", "id_0": "old"})
+        connection_manager = ConnectionManager(mocker.Mock(), record_cache=cache)
+        connection_manager.connection = Mock()
+        connection_manager.connection.server = "server"
+        connection_manager.get_resource_batch = Mock(return_value=[])
+        return connection_manager, cache
+
+    def test_syncs_before_reading_the_cache(self, mocker):
+        connection_manager, cache = self.cached_manager(mocker)
+
+        def sync(repo):
+            # Someone else edited the record since it was cached
+            cache.put("server", repo, {"uri": "/repositories/2/resources/1", "id_0": "new"})
+
+        connection_manager.sync_repository = Mock(side_effect=sync)
+
+        matches = list(
+            QueryManager().run_query(connection_manager, 2, equals("new"), [1], use_search=False)
+        )
+
+        connection_manager.sync_repository.assert_called_once_with(2)
+        assert [resource_id for resource_id, _ in matches] == [1]
+        connection_manager.get_resource_batch.assert_not_called()
+
+    def test_failed_sync_still_runs(self, mocker):
+        from controller.connection_exceptions import ServerError
+
+        connection_manager, _ = self.cached_manager(mocker)
+        connection_manager.sync_repository = Mock(side_effect=ServerError("down"))
+
+        matches = list(
+            QueryManager().run_query(connection_manager, 2, equals("old"), [1], use_search=False)
+        )
+
+        assert [resource_id for resource_id, _ in matches] == [1]
+
+    def test_sync_can_be_skipped(self, mocker):
+        connection_manager, _ = self.cached_manager(mocker)
+        connection_manager.sync_repository = Mock()
+
+        list(
+            QueryManager().run_query(
+                connection_manager, 2, equals("old"), [1], use_search=False, sync=False
+            )
+        )
+
+        connection_manager.sync_repository.assert_not_called()
+
+
+class TestQueryManagerSearchPushdown:
+    """Test narrowing runs through the repository search index"""
+
+    @staticmethod
+    def manager_with_records(mocker, records, search_ids):
+        from controller.connection_manager import ConnectionManager
+
+        connection_manager = ConnectionManager(mocker.Mock())
+        connection_manager.connection = Mock()
+        connection_manager.search_resource_ids = Mock(return_value=search_ids)
+        connection_manager.get_resource_batch = Mock(
+            side_effect=lambda repo, ids: [records[i] for i in ids]
+        )
+        return connection_manager
+
+    def test_downloads_only_search_candidates(self, mocker):
+        records = {
+            i: {"uri": f"/repositories/2/resources/{i}", "id_0": f"ID{i}", "level": "series"}
+            for i in range(1, 6)
+        }
+        records[4]["level"] = "collection"
+        connection_manager = self.manager_with_records(mocker, records, [2, 4])
+        query = OperatorNode(
+            OperatorType.AND,
+            [
+                QueryNode(Mock(), ResourceField.level, QueryType.Equals, "collection"),
+                QueryNode(Mock(), ResourceField.id_0, QueryType.Contains, "4"),
+            ],
+        )
+
+        matches = list(QueryManager().run_query(connection_manager, 2, query, use_search=True))
+
+        connection_manager.search_resource_ids.assert_called_once_with(
+            2, "level:collection"
+        )
+        connection_manager.get_resource_batch.assert_called_once_with(2, [2, 4])
+        # Candidate 2 came back from the index but the full query still rejects it locally
+        assert [resource_id for resource_id, _ in matches] == [4]
+
+    def test_candidates_are_restricted_to_requested_ids(self, mocker):
+        records = {i: {"uri": f"/repositories/2/resources/{i}", "id_0": "A"} for i in range(1, 6)}
+        connection_manager = self.manager_with_records(mocker, records, [5, 1, 3])
+
+        matches = list(
+            QueryManager().run_query(
+                connection_manager, 2, equals("A"), [3, 4, 5], use_search=True
+            )
+        )
+
+        assert [resource_id for resource_id, _ in matches] == [3, 5]
+
+    def test_unpushable_query_scans_without_searching(self, mocker):
+        records = {i: {"uri": f"/repositories/2/resources/{i}", "id_0": "A"} for i in range(1, 3)}
+        connection_manager = self.manager_with_records(mocker, records, [])
+        query = QueryNode(Mock(), ResourceField.id_0, QueryType.Contains, "A")
+
+        matches = list(
+            QueryManager().run_query(connection_manager, 2, query, [1, 2], use_search=True)
+        )
+
+        connection_manager.search_resource_ids.assert_not_called()
+        assert len(matches) == 2
+
+    def test_search_is_off_by_default(self, mocker):
+        records = {i: {"uri": f"/repositories/2/resources/{i}", "id_0": "A"} for i in range(1, 3)}
+        connection_manager = self.manager_with_records(mocker, records, [])
+
+        matches = list(QueryManager().run_query(connection_manager, 2, equals("A"), [1, 2]))
+
+        connection_manager.search_resource_ids.assert_not_called()
+        assert len(matches) == 2
+
+    def test_search_failure_falls_back_to_scan(self, mocker):
+        from controller.connection_exceptions import ServerError
+
+        records = {i: {"uri": f"/repositories/2/resources/{i}", "id_0": "A"} for i in range(1, 3)}
+        connection_manager = self.manager_with_records(mocker, records, [])
+        connection_manager.search_resource_ids.side_effect = ServerError("no index")
+
+        matches = list(
+            QueryManager().run_query(connection_manager, 2, equals("A"), [1, 2], use_search=True)
+        )
+
+        assert [resource_id for resource_id, _ in matches] == [1, 2]
+
+
+class TestQueryManagerProfile:
+    """Test profiled runs"""
+
+    def test_counts_per_node_and_short_circuits(self, mocker):
+        import json
+
+        records = {
+            i: {"uri": f"/repositories/2/resources/{i}", "id_0": f"ID{i}", "level": "series"}
+            for i in range(1, 5)
+        }
+        records[2]["level"] = "collection"
+        connection_manager = TestQueryManagerSearchPushdown.manager_with_records(
+            mocker, records, [1, 2, 3, 4]
+        )
+        level = QueryNode(Mock(), ResourceField.level, QueryType.Equals, "collection")
+        contains = QueryNode(Mock(), ResourceField.id_0, QueryType.Contains, "ID")
+        query = OperatorNode(OperatorType.AND, [contains, level])
+
+        profile = QueryManager().profile_query(connection_manager, 2, query, use_search=True)
+
+        assert profile.matched == 1
+        assert profile.search_query == "level:collection"
+        assert profile.search_candidates == 4
+        assert profile.retrieval.fetched == 4
+        root = profile.root
+        assert (root.reached, root.passed) == (4, 1)
+        # The optimizer runs the selective Equals first, so Contains only sees what it passes
+        first, second = root.children
+        assert first.label == '%level &Equals "collection"'
+        assert first.pushed_down is True
+        assert (first.reached, first.passed) == (4, 1)
+        assert second.pushed_down is False
+        assert (second.reached, second.short_circuited) == (1, 3)
+        assert root.pushed_down is False
+
+        exported = json.loads(profile.to_json())
+        assert exported["plan"]["children"][1]["short_circuited"] == 3
+        rendered = profile.render().splitlines()
+        assert rendered[0] == "Search: level:collection -> 4 candidates"
+        assert rendered[2].startswith("AND  [reached 4, passed 1")
+        assert "pushed down" in rendered[3]
+        assert "short-circuited 3" in rendered[4]
+
+    def test_profiling_does_not_change_results(self, mocker):
+        records = {
+            i: {"uri": f"/repositories/2/resources/{i}", "id_0": str(i)} for i in range(1, 7)
+        }
+        connection_manager = TestQueryManagerSearchPushdown.manager_with_records(
+            mocker, records, []
+        )
+        query = OperatorNode(
+            OperatorType.OR,
+            [
+                QueryNode(Mock(), ResourceField.id_0, QueryType.Ends_With, "2"),
+                OperatorNode(
+                    OperatorType.NOT,
+                    [QueryNode(Mock(), ResourceField.id_0, QueryType.Contains, "5")],
+                ),
+            ],
+        )
+        from controller.query_profiler import QueryProfile
+
+        plain = list(
+            QueryManager().run_query(connection_manager, 2, query, [1, 2, 3, 4, 5, 6])
+        )
+        profiled = list(
+            QueryManager().run_query(
+                connection_manager, 2, query, [1, 2, 3, 4, 5, 6], profile=QueryProfile()
+            )
+        )
+
+        assert plain == profiled
+
+
+class TestQueryManagerAcrossRepositories:
+    """Test running one query over several repositories at once"""
+
+    @staticmethod
+    def manager(mocker, ids_by_repo, delays=None, failing=()):
+        import time
+
+        from controller.connection_exceptions import ServerError
+        from controller.connection_manager import ConnectionManager
+
+        delays = delays or {}
+
+        def batch(repo, ids):
+            time.sleep(delays.get(repo, 0))
+            if repo in failing:
+                raise ServerError("unavailable")
+            return [
+                {"uri": f"/repositories/{repo}/resources/{i}", "id_0": "A" if i % 2 else "B"}
+                for i in ids
+            ]
+
+        connection_manager = ConnectionManager(mocker.Mock())
+        connection_manager.connection = Mock()
+        connection_manager.get_resource_list = Mock(side_effect=lambda repo: ids_by_repo[repo])
+        connection_manager.get_resource_batch = Mock(side_effect=batch)
+        return connection_manager
+
+    def test_ordered_merge_follows_repository_order(self, mocker):
+        connection_manager = self.manager(
+            mocker, {2: [1, 2, 3], 3: [5, 7], 4: [9]}, delays={2: 0.2}
+        )
+
+        matches = list(
+            QueryManager().run_query_across(
+                connection_manager, [2, 3, 4, 3], equals("A"), use_search=False
+            )
+        )
+
+        assert [(repo, resource_id) for repo, resource_id, _ in matches] == [
+            (2, 1),
+            (2, 3),
+            (3, 5),
+            (3, 7),
+            (4, 9),
+        ]
+        assert connection_manager.active_memo is None
+
+    def test_unordered_merge_delivers_fast_repositories_first(self, mocker):
+        connection_manager = self.manager(mocker, {2: [1], 3: [5]}, delays={2: 0.3})
+
+        matches = list(
+            QueryManager().run_query_across(
+                connection_manager, [2, 3], equals("A"), use_search=False, ordered=False
+            )
+        )
+
+        assert [repo for repo, _, _ in matches] == [3, 2]
+
+    def test_progress_and_failures_are_reported_per_repository(self, mocker):
+        connection_manager = self.manager(mocker, {2: [1, 2, 3], 3: [5]}, failing={3})
+        updates = []
+
+        matches = list(
+            QueryManager().run_query_across(
+                connection_manager,
+                [2, 3],
+                equals("A"),
+                use_search=False,
+                on_progress=lambda progress: updates.append(
+                    (progress.repo_number, progress.state, progress.examined, progress.matched)
+                ),
+            )
+        )
+
+        assert len(matches) == 2
+        final = {repo: (state, examined, matched) for repo, state, examined, matched in updates}
+        assert final[2] == ("finished", 3, 2)
+        assert final[3][0] == "failed"
+
+    def test_closing_the_stream_cancels_the_workers(self, mocker):
+        connection_manager = self.manager(mocker, {2: list(range(1, 2000, 2))})
+
+        stream = QueryManager().run_query_across(
+            connection_manager, [2], equals("A"), use_search=False
+        )
+        next(stream)
+        stream.close()
+
+        # The worker stops at its next record rather than reading the remaining batches
+        assert connection_manager.get_resource_batch.call_count < 4
+        assert connection_manager.active_memo is None
@@ -0,0 +1,94 @@
+import pytest
+from unittest.mock import Mock
+
+from model.query_node import QueryNode
+from model.query_type import QueryType
+from model.resource_field import ResourceField
+
+
+def make_node(query_type, compare_data=None, field=ResourceField.id_0):
+    return QueryNode(Mock(), field, query_type, compare_data)
+
+
+RECORDS = [
+    {"id_0": "A.M85"},
+    {"id_0": "D.122"},
+    {"id_0": ""},
+    {"id_0": None},
+    {},
+    {"id_0": "xA.M85x"},
+]
+
+CASES = [
+    (QueryType.Equals, "A.M85"),
+    (QueryType.Not_Equals, "A.M85"),
+    (QueryType.Empty, None),
+    (QueryType.Not_Empty, None),
+    (QueryType.Starts_With, "A."),
+    (QueryType.Not_Starts_With, "A."),
+    (QueryType.Ends_With, "85"),
+    (QueryType.Not_Ends_With, "85"),
+    (QueryType.Contains, "M8"),
+    (QueryType.Not_Contains, "M8"),
+]
+
+
+class TestQueryNodeValidation:
+    """Test QueryNode.validate"""
+
+    def test_data_required_for_comparisons(self):
+        assert make_node(QueryType.Equals).validate() is False
+        assert make_node(QueryType.Equals, "x").validate() is True
+
+    def test_data_forbidden_for_emptiness_checks(self):
+        assert make_node(QueryType.Empty, "x").validate() is False
+        assert make_node(QueryType.Empty).validate() is True
+
+
+class TestQueryNodeCompile:
+    """Test that compiled predicates match interpreted comparisons"""
+
+    @pytest.mark.parametrize("query_type, data", CASES)
+    def test_compiled_matches_interpreted(self, query_type, data):
+        node = make_node(query_type, data)
+        predicate = node.compile()
+
+        for record in RECORDS:
+            expected = node._compare_values(node._extract_field_value(record))
+            assert predicate(record) is expected
+
+    def test_equals_compiled(self):
+        predicate = make_node(QueryType.Equals, "A.M85").compile()
+        assert predicate({"id_0": "A.M85"}) is True
+        assert predicate({"id_0": "A.M86"}) is False
+
+    def test_missing_field_counts_as_empty(self):
+        assert make_node(QueryType.Empty).compile()({}) is True
+
+    def test_compile_rejects_missing_data(self):
+        with pytest.raises(ValueError, match="requires comparison data"):
+            make_node(QueryType.Contains).compile()
+
+    def test_compile_rejects_unexpected_data(self):
+        with pytest.raises(ValueError, match="should not have comparison data"):
+            make_node(QueryType.Not_Empty, "x").compile()
+
+    def test_compare_values_still_validates(self):
+        with pytest.raises(ValueError):
+            make_node(QueryType.Equals)._compare_values("x")
+
+
+class TestQueryNodeEval:
+    """Test by-id and in-place evaluation"""
+
+    def test_eval_record_uses_given_record(self):
+        node = make_node(QueryType.Equals, "A.M85")
+        assert node.eval_record({"id_0": "A.M85"}) is True
+        node.data_model.main.connection_manager.get_resource_record.assert_not_called()
+
+    def test_eval_fetches_then_evaluates(self):
+        node = make_node(QueryType.Equals, "A.M85")
+        node.data_model.main.connection_manager.get_resource_record.return_value = {
+            "id_0": "A.M85"
+        }
+        assert node.eval(2, 5) is True
@@ -0,0 +1,254 @@
+from unittest.mock import Mock
+
+from controller.query_optimizer import QueryOptimizer, SampleStatistics
+from model.operator_node import OperatorNode
+from model.operator_type import OperatorType
+from model.query_node import QueryNode
+from model.query_type import QueryType
+from model.resource_field import ResourceField
+from query_helpers import leaf
+
+
+def not_equals_chain(values):
+    return OperatorNode(
+        OperatorType.AND,
+        [OperatorNode(OperatorType.NOT, [leaf(QueryType.Equals, v)]) for v in values],
+    )
+
+
+class TestCollapseMembership:
+    """Test rewriting exception lists into set lookups"""
+
+    def test_and_of_not_equals_becomes_not_in(self):
+        query = OperatorNode(
+            OperatorType.AND,
+            [leaf(QueryType.Not_Equals, v) for v in ["a", "b", "c"]],
+        )
+
+        optimized = QueryOptimizer().optimize(query)
+
+        assert isinstance(optimized, QueryNode)
+        assert optimized.query_type == QueryType.Not_In
+        assert optimized.compare_data == frozenset({"a", "b", "c"})
+
+    def test_and_of_not_wrapped_equals_becomes_not_in(self):
+        optimized = QueryOptimizer().optimize(not_equals_chain(["a", "b"]))
+
+        assert optimized.query_type == QueryType.Not_In
+        assert optimized.compare_data == frozenset({"a", "b"})
+
+    def test_or_of_equals_becomes_in(self):
+        query = OperatorNode(
+            OperatorType.OR, [leaf(QueryType.Equals, v) for v in ["a", "b"]]
+        )
+
+        optimized = QueryOptimizer().optimize(query)
+
+        assert optimized.query_type == QueryType.In
+
+    def test_other_children_are_kept_in_place(self):
+        other = leaf(QueryType.Starts_With, "A.", ResourceField.id_1)
+        query = OperatorNode(
+            OperatorType.AND,
+            [leaf(QueryType.Not_Equals, "a"), other, leaf(QueryType.Not_Equals, "b")],
+        )
+
+        optimized = QueryOptimizer().collapse_membership(query)
+
+        assert isinstance(optimized, OperatorNode)
+        assert optimized.children[0].query_type == QueryType.Not_In
+        assert optimized.children[1] is other
+        assert len(optimized.children) == 2
+
+    def test_different_fields_are_not_mixed(self):
+        query = OperatorNode(
+            OperatorType.AND,
+            [
+                leaf(QueryType.Not_Equals, "a", ResourceField.id_0),
+                leaf(QueryType.Not_Equals, "b", ResourceField.id_1),
+            ],
+        )
+
+        optimized = QueryOptimizer().optimize(query)
+
+        assert [child.query_type for child in optimized.children] == [
+            QueryType.Not_Equals,
+            QueryType.Not_Equals,
+        ]
+
+    def test_equals_under_and_is_not_collapsed(self):
+        query = OperatorNode(
+            OperatorType.AND, [leaf(QueryType.Equals, v) for v in ["a", "b"]]
+        )
+
+        optimized = QueryOptimizer().optimize(query)
+
+        assert all(c.query_type == QueryType.Equals for c in optimized.children)
+
+    def test_original_tree_is_untouched(self):
+        query = not_equals_chain(["a", "b", "c"])
+        QueryOptimizer().optimize(query)
+        assert len(query.children) == 3
+
+    def test_optimized_tree_matches_same_records(self):
+        values = [f"D.{i}" for i in range(40)]
+        query = not_equals_chain(values)
+        optimized = QueryOptimizer().optimize(query)
+
+        original_predicate = query.compile()
+        optimized_predicate = optimized.compile()
+        for candidate in values + ["A.A31", "", "D.999"]:
+            record = {"id_0": candidate}
+            assert original_predicate(record) == optimized_predicate(record)
+
+
+class TestSetQueryNodes:
+    """Test In/Not_In leaves"""
+
+    def test_string_data_becomes_single_member_set(self):
+        assert leaf(QueryType.In, "a").compare_data == frozenset({"a"})
+
+    def test_in_matches_members(self):
+        predicate = leaf(QueryType.In, ["a", "b"]).compile()
+        assert predicate({"id_0": "a"}) is True
+        assert predicate({"id_0": "ab"}) is False
+
+    def test_to_string_lists_values(self):
+        assert leaf(QueryType.Not_In, ["b", "a"]).to_string() == '%id_0 &Not_In ["a", "b"]'
+
+    def test_values_loaded_from_file(self, tmp_path):
+        value_file = tmp_path / "exceptions.txt"
+        value_file.write_text("# exceptions\nA.A31\n\n  A.M85  \n", encoding="utf-8")
+
+        node = QueryNode.from_value_file(
+            Mock(), ResourceField.id_0, QueryType.Not_In, value_file
+        )
+
+        assert node.compare_data == frozenset({"A.A31", "A.M85"})
+        assert node.to_string() == f'%id_0 &Not_In @"{value_file}"'
+
+    def test_empty_set_is_invalid(self):
+        assert leaf(QueryType.In, []).validate() is False
+
+
+class TestReorderByCost:
+    """Test ordering AND/OR children so evaluation short-circuits cheaply"""
+
+    def test_cheap_selective_leaf_moves_ahead_of_notes_scan(self):
+        notes_scan = leaf(QueryType.Contains, "restricted", ResourceField.notes)
+        identifier = leaf(QueryType.Equals, "A.M85")
+        query = OperatorNode(OperatorType.AND, [notes_scan, identifier])
+
+        optimized = QueryOptimizer().optimize(query)
+
+        assert optimized.children == [identifier, notes_scan]
+        assert query.children == [notes_scan, identifier]
+
+    def test_or_puts_likely_pass_first(self):
+        rare = leaf(QueryType.Equals, "x", ResourceField.level)
+        common = leaf(QueryType.Not_Empty, None, ResourceField.level)
+        query = OperatorNode(OperatorType.OR, [rare, common])
+
+        optimized = QueryOptimizer().optimize(query)
+
+        assert optimized.children == [common, rare]
+
+    def test_equal_ranks_keep_written_order(self):
+        children = [
+            leaf(QueryType.Starts_With, "a", ResourceField.id_0),
+            leaf(QueryType.Starts_With, "b", ResourceField.id_1),
+            leaf(QueryType.Starts_With, "c", ResourceField.id_2),
+        ]
+
+        optimized = QueryOptimizer().optimize(OperatorNode(OperatorType.AND, children))
+
+        assert optimized.children == children
+
+    def test_nested_same_operator_groups_are_flattened(self):
+        inner = OperatorNode(
+            OperatorType.AND,
+            [
+                leaf(QueryType.Contains, "a", ResourceField.notes),
+                leaf(QueryType.Equals, "b"),
+            ],
+        )
+        query = OperatorNode(
+            OperatorType.AND,
+            [inner, leaf(QueryType.Not_Empty, None, ResourceField.level)],
+        )
+
+        optimized = QueryOptimizer().optimize(query)
+
+        assert len(optimized.children) == 3
+        assert optimized.children[-1].compare_field == ResourceField.notes
+
+    def test_sampled_selectivity_overrides_defaults(self):
+        # Every sampled record is a collection, so Equals "collection" never settles an AND
+        records = [{"level": "collection", "id_0": f"A{i}"} for i in range(20)]
+        statistics = SampleStatistics(records)
+        level = leaf(QueryType.Equals, "collection", ResourceField.level)
+        identifier = leaf(QueryType.Starts_With, "A1", ResourceField.id_0)
+        query = OperatorNode(OperatorType.AND, [level, identifier])
+
+        assert QueryOptimizer().optimize(query).children == [level, identifier]
+        assert QueryOptimizer().optimize(query, statistics).children == [
+            identifier,
+            level,
+        ]
+
+    def test_reordered_tree_matches_same_records(self):
+        query = OperatorNode(
+            OperatorType.OR,
+            [
+                OperatorNode(
+                    OperatorType.AND,
+                    [
+                        leaf(QueryType.Contains, "x", ResourceField.notes),
+                        leaf(QueryType.Equals, "a"),
+                    ],
+                ),
+                OperatorNode(
+                    OperatorType.NOT,
+                    [leaf(QueryType.Empty, None, ResourceField.level)],
+                ),
+            ],
+        )
+        optimized = QueryOptimizer().optimize(query)
+        for record in [
+            {"id_0": "a", "notes": "x"},
+            {"id_0": "a", "notes": "y"},
+            {"level": "file"},
+            {},
+        ]:
+            assert query.compile()(record) == optimized.compile()(record)
+
+
+class TestExplain:
+    def test_lists_nodes_in_chosen_order_with_estimates(self):
+        query = OperatorNode(
+            OperatorType.AND,
+            [
+                leaf(QueryType.Contains, "x", ResourceField.notes),
+                leaf(QueryType.Equals, "a"),
+            ],
+        )
+
+        lines = QueryOptimizer().explain(query).splitlines()
+
+        assert lines[0].startswith("AND  (cost=")
+        assert lines[1].startswith('  %id_0 &Equals "a"  (cost=1.00, selectivity=0.100)')
+        assert lines[2].startswith('  %notes &Contains "x"')
+
+    def test_estimate_of_and_discounts_later_children(self):
+        query = OperatorNode(
+            OperatorType.AND,
+            [
+                leaf(QueryType.Equals, "a"),
+                leaf(QueryType.Equals, "b", ResourceField.id_1),
+            ],
+        )
+
+        cost, selectivity = QueryOptimizer().estimate(query)
+
+        assert cost == 1.0 + 0.1 * 1.0
+        assert abs(selectivity - 0.01) < 1e-9
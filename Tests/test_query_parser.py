@@ -0,0 +1,178 @@
+from unittest.mock import Mock
+
+import pytest
+
+from controller.query_parser import QueryParseError, QueryParser
+from model.operator_node import OperatorNode
+from model.operator_type import OperatorType
+from model.query_node import QueryNode
+from model.query_type import QueryType
+from model.resource_field import ResourceField
+from query_helpers import leaf
+
+
+@pytest.fixture
+def parser():
+    return QueryParser(data_model=Mock())
+
+
+class TestParseLeaves:
+    def test_scalar_value(self, parser):
+        node = parser.parse('%id_0 &Equals "A.M85"')
+
+        assert isinstance(node, QueryNode)
+        assert node.compare_field == ResourceField.id_0
+        assert node.query_type == QueryType.Equals
+        assert node.compare_data == "A.M85"
+
+    def test_names_are_case_insensitive(self, parser):
+        node = parser.parse('%ID_0 &EQUALS "x"')
+        assert node.query_type == QueryType.Equals
+
+    def test_no_data_query_type(self, parser):
+        node = parser.parse("%level &Not_Empty")
+        assert node.compare_data is None
+
+    def test_value_list(self, parser):
+        node = parser.parse('%id_0 &Not_In ["A.A31", "A.M85"]')
+        assert node.compare_data == frozenset({"A.A31", "A.M85"})
+
+    def test_value_file_relative_to_base_path(self, tmp_path):
+        (tmp_path / "exceptions.txt").write_text("A.A31\nD.48\n", encoding="utf-8")
+
+        node = QueryParser(Mock(), tmp_path).parse('%id_0 &Not_In @"exceptions.txt"')
+
+        assert node.compare_data == frozenset({"A.A31", "D.48"})
+        assert node.source_path == "exceptions.txt"
+
+    def test_nested_path(self, parser):
+        from model.field_path import FieldPath
+
+        node = parser.parse('%dates[*].expression &Contains "1923"')
+
+        assert node.compare_field == FieldPath("dates[*].expression")
+        assert node.to_string() == '%dates[*].expression &Contains "1923"'
+
+    def test_nested_path_root_takes_the_field_name_casing(self, parser):
+        from model.field_path import FieldPath
+
+        node = parser.parse('%Dates[*].expression &Contains "1923"')
+
+        assert node.compare_field == FieldPath("dates[*].expression")
+        assert node.to_string() == '%dates[*].expression &Contains "1923"'
+        assert node.compile()({"dates": [{"expression": "1923-1950"}]})
+
+    def test_escapes(self, parser):
+        node = parser.parse(r'%finding_aid_title &Contains "say \"hi\" \\ bye"')
+        assert node.compare_data == 'say "hi" \\ bye'
+
+
+class TestParseOperators:
+    def test_nested_operators(self, parser):
+        node = parser.parse(
+            '$AND{%id_0 &Starts_With "D."}{$NOT{%level &Equals "file"}}'
+        )
+
+        assert node.operator == OperatorType.AND
+        assert node.children[0].compare_data == "D."
+        assert node.children[1].operator == OperatorType.NOT
+        assert node.children[1].children[0].compare_data == "file"
+
+    def test_if_then_wrapper_and_action(self, parser):
+        node, action = parser.parse_document(
+            'IF {%id_0 &Not_In ["A"]} THEN CREATE_NOTE -publish=true'
+        )
+
+        assert node.query_type == QueryType.Not_In
+        assert action == "CREATE_NOTE -publish=true"
+
+    def test_deep_nesting_does_not_recurse(self, parser):
+        depth = 5000
+        text = "$NOT{" * depth + '%id_0 &Equals "x"' + "}" * depth
+
+        node = parser.parse(text)
+
+        for _ in range(depth):
+            node = node.children[0]
+        assert node.compare_data == "x"
+
+
+class TestParseErrors:
+    @pytest.mark.parametrize(
+        "text, message, column",
+        [
+            ('%id_0 &Equals "x', "Unterminated string", 15),
+            ('%nope &Equals "x"', "Unknown field %nope", 1),
+            ('%nope[*].x &Equals "x"', "Unknown field %nope[*].x", 1),
+            ('%id_0 &Nearly "x"', "Unknown query type &Nearly", 7),
+            ("%id_0 &Equals", "Equals needs a quoted value", 14),
+            ('%level &Empty "x"', "Empty does not take a value", 15),
+            ("%id_0 &In []", "In needs at least one value in its list", 11),
+            ("%id_0 &Not_In [ ]", "Not_In needs at least one value in its list", 15),
+            ('$AND{%id_0 &Equals "x"}', "$AND needs at least two clauses", 1),
+            ('$NOT{%id_0 &Empty}{%id_0 &Empty}', "$NOT takes exactly one clause", 1),
+            ('{%id_0 &Empty', "Expected } to close the { at line 1, column 1", 14),
+            ('%id_0 &Empty }', "Unexpected close brace", 14),
+        ],
+    )
+    def test_reports_position(self, parser, text, message, column):
+        with pytest.raises(QueryParseError) as error:
+            parser.parse(text)
+
+        assert message in str(error.value)
+        assert error.value.column == column
+
+    def test_reports_line(self, parser):
+        with pytest.raises(QueryParseError) as error:
+            parser.parse('$OR\n{%id_0 &Empty}\n{%id_0 &Bad}')
+
+        assert error.value.line == 3
+        assert error.value.column == 8
+
+    def test_missing_value_file(self, parser, tmp_path):
+        with pytest.raises(QueryParseError, match="Could not read value file"):
+            QueryParser(Mock(), tmp_path).parse('%id_0 &In @"missing.txt"')
+
+    def test_action_rejected_by_parse(self, parser):
+        with pytest.raises(QueryParseError, match="Unexpected action"):
+            parser.parse("%id_0 &Empty THEN DELETE_RECORD")
+
+
+class TestRoundTrip:
+    @pytest.mark.parametrize(
+        "query",
+        [
+            leaf(QueryType.Equals, 'quote " and \\ backslash'),
+            leaf(QueryType.In, ["b", "a,c", 'd"']),
+            OperatorNode(
+                OperatorType.OR,
+                [
+                    leaf(QueryType.Empty, None, ResourceField.level),
+                    OperatorNode(OperatorType.NOT, [leaf(QueryType.Contains, "x")]),
+                    leaf(QueryType.Ends_With, "}", ResourceField.ead_id),
+                ],
+            ),
+        ],
+    )
+    def test_serialize_then_parse_is_identity(self, parser, query):
+        text = query.to_string()
+        assert parser.parse(text).to_string() == text
+
+    def test_large_query(self, parser):
+        query = OperatorNode(
+            OperatorType.AND,
+            [leaf(QueryType.Not_Equals, f"D.{i}") for i in range(10_000)],
+        )
+        text = query.to_string()
+
+        parsed = parser.parse(text)
+
+        assert len(parsed.children) == 10_000
+        assert parsed.to_string() == text
+
+    def test_query_manager_constructs_from_string(self):
+        from controller.query_manager import QueryManager
+
+        node = QueryManager().construct_from_string('%id_0 &Equals "x"', Mock())
+
+        assert node.compare_data == "x"
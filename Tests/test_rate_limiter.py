@@ -0,0 +1,114 @@
+import pytest
+
+from controller.rate_limiter import RateLimiter, parse_retry_after
+
+
+class TestParseRetryAfter:
+    """Test Retry-After header parsing"""
+
+    @pytest.mark.parametrize(
+        "value, expected", [("5", 5.0), (" 2.5 ", 2.5), ("-3", 0.0)]
+    )
+    def test_delta_seconds(self, value, expected):
+        assert parse_retry_after(value) == expected
+
+    @pytest.mark.parametrize("value", [None, "", "soon", 12])
+    def test_unreadable_values_return_none(self, value):
+        assert parse_retry_after(value) is None
+
+    def test_http_date_in_the_past_is_zero(self):
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+class TestRateLimiterConfiguration:
+    """Test RateLimiter argument validation"""
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        [
+            {"rate": 0, "min_rate": 0},
+            {"rate": 100, "max_rate": 50},
+            {"burst": 0},
+            {"decrease_factor": 1.5},
+        ],
+    )
+    def test_invalid_configuration_raises(self, kwargs):
+        with pytest.raises(ValueError):
+            RateLimiter(**kwargs)
+
+
+class TestRateLimiterPacing:
+    """Test token bucket pacing"""
+
+    def test_burst_is_served_without_waiting(self, mocker):
+        mock_sleep = mocker.patch("time.sleep")
+        limiter = RateLimiter(rate=1.0, burst=3)
+
+        for _ in range(3):
+            limiter.acquire()
+
+        mock_sleep.assert_not_called()
+
+    def test_requests_beyond_burst_wait(self, mocker):
+        mock_sleep = mocker.patch("time.sleep")
+        limiter = RateLimiter(rate=1.0, burst=1)
+
+        limiter.acquire()
+        waited = limiter.acquire()
+
+        assert waited > 0.9
+        mock_sleep.assert_called_once()
+
+    def test_retry_after_blocks_callers(self, mocker):
+        mock_sleep = mocker.patch("time.sleep")
+        limiter = RateLimiter(rate=10.0, burst=10)
+
+        limiter.record_throttle(retry_after=30)
+        waited = limiter.acquire()
+
+        assert waited >= 29
+        mock_sleep.assert_called_once()
+
+    def test_callers_behind_retry_after_are_paced_after_it(self, mocker):
+        mocker.patch("time.sleep")
+        limiter = RateLimiter(rate=10.0, burst=10)
+
+        limiter.record_throttle(retry_after=30)
+        waits = [limiter.acquire() for _ in range(3)]
+
+        # The throttle halved the rate to 5/s, so each caller wakes 0.2s after the one before
+        assert waits[0] >= 29
+        assert waits[1] - waits[0] > 0.15
+        assert waits[2] - waits[1] > 0.15
+
+
+class TestRateLimiterAdaptation:
+    """Test AIMD rate adjustment"""
+
+    def test_fast_successes_increase_rate(self):
+        limiter = RateLimiter(rate=5.0)
+        limiter.record_success(0.1)
+        assert limiter.rate > 5.0
+
+    def test_rate_never_exceeds_maximum(self):
+        limiter = RateLimiter(rate=5.0, max_rate=6.0)
+        for _ in range(100):
+            limiter.record_success(0.1)
+        assert limiter.rate == 6.0
+
+    def test_slow_responses_decrease_rate(self):
+        limiter = RateLimiter(rate=5.0, latency_target=1.0)
+        limiter.record_success(3.0)
+        assert limiter.rate < 5.0
+
+    def test_throttle_halves_rate(self):
+        limiter = RateLimiter(rate=8.0, decrease_factor=0.5)
+        limiter.record_throttle()
+        assert limiter.rate == 4.0
+        assert limiter.throttled_count == 1
+
+    def test_rate_never_drops_below_minimum(self):
+        limiter = RateLimiter(rate=1.0, min_rate=0.5)
+        for _ in range(10):
+            limiter.record_throttle()
+        assert limiter.rate == 0.5
@@ -0,0 +1,183 @@
+import pytest
+
+from controller.record_cache import RecordCache, resource_id_from_uri
+
+SERVER = "https://test.archivesspace.org"
+
+
+def make_record(resource_id, lock_version=0, title="Test"):
+    return {
+        "uri": f"/repositories/2/resources/{resource_id}",
+        "lock_version": lock_version,
+        "system_mtime": "2025-01-01T00:00:00Z",
+        "title": title,
+    }
+
+
+@pytest.fixture
+def cache(tmp_path):
+    record_cache = RecordCache(tmp_path / "cache.sqlite3")
+    yield record_cache
+    record_cache.close()
+
+
+class TestRecordCacheStorage:
+    """Test storing and reading cached records"""
+
+    def test_round_trip(self, cache):
+        cache.put(SERVER, 2, make_record(5))
+        assert cache.get(SERVER, 2, 5) == make_record(5)
+
+    def test_missing_record_returns_none(self, cache):
+        assert cache.get(SERVER, 2, 5) is None
+
+    def test_keys_include_server_and_repository(self, cache):
+        cache.put(SERVER, 2, make_record(5))
+        assert cache.get("https://other.org", 2, 5) is None
+        assert cache.get(SERVER, 3, 5) is None
+
+    def test_newer_copy_replaces_older(self, cache):
+        cache.put(SERVER, 2, make_record(5, lock_version=1))
+        cache.put(SERVER, 2, make_record(5, lock_version=2, title="New"))
+
+        assert cache.get(SERVER, 2, 5)["title"] == "New"
+        assert cache.lock_version(SERVER, 2, 5) == 2
+        assert cache.count() == 1
+
+    def test_get_many_returns_only_cached(self, cache):
+        cache.put_many(SERVER, 2, [make_record(1), make_record(3)])
+        assert sorted(cache.get_many(SERVER, 2, [1, 2, 3])) == [1, 3]
+
+    def test_persists_across_instances(self, tmp_path):
+        path = tmp_path / "cache.sqlite3"
+        first = RecordCache(path)
+        first.put(SERVER, 2, make_record(5))
+        first.close()
+
+        second = RecordCache(path)
+        assert second.get(SERVER, 2, 5) is not None
+        second.close()
+
+
+class TestRecordCacheValidity:
+    """Test expiry and invalidation"""
+
+    def test_expired_entries_are_not_served(self, tmp_path):
+        cache = RecordCache(tmp_path / "cache.sqlite3", max_age=-1)
+        cache.put(SERVER, 2, make_record(5))
+
+        assert cache.get(SERVER, 2, 5) is None
+        assert cache.get_many(SERVER, 2, [5]) == {}
+        assert cache.lock_version(SERVER, 2, 5) == 0
+
+    def test_default_max_age_expires_within_the_hour(self, cache):
+        import time
+
+        cache.put(SERVER, 2, make_record(5))
+        cache.touch_repository(SERVER, 2, time.time() - 60 * 60)
+
+        assert cache.get(SERVER, 2, 5) is None
+
+    def test_invalidate_removes_record(self, cache):
+        cache.put(SERVER, 2, make_record(5))
+        cache.invalidate(SERVER, 2, 5)
+        assert cache.get(SERVER, 2, 5) is None
+
+    def test_clear_by_repository(self, cache):
+        cache.put(SERVER, 2, make_record(1))
+        cache.put(SERVER, 3, make_record(1))
+
+        cache.clear(SERVER, 2)
+
+        assert cache.count(SERVER) == 1
+
+
+def test_resource_id_from_uri():
+    assert resource_id_from_uri("/repositories/2/resources/15/") == 15
+
+
+class TestRecordCacheSyncState:
+    """Test watermark bookkeeping used by incremental sync"""
+
+    def test_watermark_round_trip(self, cache):
+        assert cache.get_watermark(SERVER, 2) is None
+        cache.set_watermark(SERVER, 2, 1234.5)
+        assert cache.get_watermark(SERVER, 2) == 1234.5
+        assert cache.get_watermark(SERVER, 3) is None
+
+    def test_touch_revalidates_expired_rows(self, tmp_path):
+        import time
+
+        cache = RecordCache(tmp_path / "cache.sqlite3", max_age=60)
+        cache.put(SERVER, 2, make_record(1))
+        cache.touch_repository(SERVER, 2, time.time() - 120)
+        assert cache.get(SERVER, 2, 1) is None
+
+        cache.touch_repository(SERVER, 2, time.time())
+        assert cache.get(SERVER, 2, 1) is not None
+
+    def test_invalidate_many_and_cached_ids(self, cache):
+        cache.put_many(SERVER, 2, [make_record(1), make_record(2), make_record(3)])
+        cache.invalidate_many(SERVER, 2, [1, 3])
+        assert cache.cached_ids(SERVER, 2) == {2}
+
+    def test_clear_also_forgets_watermark(self, cache):
+        cache.set_watermark(SERVER, 2, 1.0)
+        cache.clear(SERVER)
+        assert cache.get_watermark(SERVER, 2) is None
+
+
+class TestRecordMemo:
+    """Test the bounded per-run memo"""
+
+    def test_round_trip_and_counters(self):
+        from controller.record_cache import RecordMemo
+
+        memo = RecordMemo()
+        assert memo.get(2, 1) is None
+        memo.put(2, 1, make_record(1))
+        assert memo.get(2, 1) == make_record(1)
+        assert (memo.hits, memo.misses) == (1, 1)
+
+    def test_least_recently_used_is_evicted(self):
+        from controller.record_cache import RecordMemo
+
+        memo = RecordMemo(max_size=2)
+        memo.put(2, 1, make_record(1))
+        memo.put(2, 2, make_record(2))
+        memo.get(2, 1)
+        memo.put(2, 3, make_record(3))
+
+        assert len(memo) == 2
+        assert memo.get(2, 2) is None
+        assert memo.get(2, 1) is not None
+
+
+class TestRecordCacheSample:
+    def test_sample_is_bounded_and_scoped_to_repository(self):
+        cache = RecordCache(":memory:")
+        cache.put_many(
+            "server", 2, [{"uri": f"/repositories/2/resources/{i}"} for i in range(10)]
+        )
+        cache.put("server", 3, {"uri": "/repositories/3/resources/1"})
+
+        sample = cache.sample("server", 2, 4)
+
+        assert len(sample) == 4
+        assert all(record["uri"].startswith("/repositories/2/") for record in sample)
+        cache.close()
+
+    def test_sample_reads_only_the_chosen_rows(self):
+        cache = RecordCache(":memory:")
+        cache.put_many(
+            "server", 2, [{"uri": f"/repositories/2/resources/{i}"} for i in range(50)]
+        )
+        statements = []
+        cache._db.set_trace_callback(statements.append)
+
+        sample = cache.sample("server", 2, 5)
+
+        assert len({record["uri"] for record in sample}) == 5
+        assert not any("RANDOM()" in statement for statement in statements)
+        assert len(cache.sample("server", 2, 100)) == 50
+        cache.close()
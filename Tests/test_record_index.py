@@ -0,0 +1,224 @@
+from unittest.mock import Mock
+
+import pytest
+
+from controller.record_cache import RecordCache
+from controller.record_index import FieldIndex, IndexKind, RecordIndex
+from model.operator_node import OperatorNode
+from model.operator_type import OperatorType
+from model.query_type import QueryType
+from model.resource_field import ResourceField
+from query_helpers import ID_VALUES, comparison_data, leaf, make_records_by_id
+
+def indexed(records, kinds=frozenset(IndexKind)):
+    index = RecordIndex({ResourceField.id_0: kinds, ResourceField.level: ()})
+    for resource_id, record in records.items():
+        index.add(resource_id, record)
+    return index
+
+
+def matching_ids(query, records):
+    predicate = query.compile()
+    return {resource_id for resource_id, record in records.items() if predicate(record)}
+
+
+class TestFieldIndexLookups:
+    """Every lookup must agree with the record-by-record predicate, whichever index kinds are kept"""
+
+    @pytest.mark.parametrize("kinds", [frozenset(IndexKind), frozenset()])
+    @pytest.mark.parametrize("query_type", list(QueryType))
+    def test_each_query_type(self, query_type, kinds):
+        query = leaf(query_type, comparison_data(query_type))
+        records = make_records_by_id()
+
+        assert indexed(records, kinds).candidates(query) == matching_ids(query, records)
+
+    def test_short_contains_falls_back_to_scanning_values(self):
+        records = make_records_by_id()
+        query = leaf(QueryType.Contains, "8")
+
+        assert indexed(records).candidates(query) == matching_ids(query, records)
+
+    def test_removing_last_holder_of_a_value_drops_it(self):
+        index = FieldIndex(ResourceField.id_0, IndexKind)
+        index.add(1, {"id_0": "ABC"})
+        index.add(1, {"id_0": "XYZ"})
+
+        assert index.sorted_texts == ["XYZ"]
+        assert index.sorted_reversed == ["ZYX"]
+        assert set(index.texts_by_gram) == {"XYZ"}
+        assert index.lookup(QueryType.Starts_With, "AB") == set()
+
+
+class TestRecordIndexCandidates:
+    def test_and_narrows_by_its_indexed_children(self):
+        records = make_records_by_id()
+        query = OperatorNode(
+            OperatorType.AND,
+            [
+                leaf(QueryType.Starts_With, "A."),
+                leaf(QueryType.Contains, "5", ResourceField.slug),
+            ],
+        )
+
+        assert indexed(records).candidates(query) == {1, 2, 10, 11}
+
+    def test_or_with_an_unindexed_child_cannot_narrow(self):
+        query = OperatorNode(
+            OperatorType.OR,
+            [
+                leaf(QueryType.Equals, "A.M85"),
+                leaf(QueryType.Contains, "5", ResourceField.slug),
+            ],
+        )
+
+        assert indexed(make_records_by_id()).candidates(query) is None
+
+    def test_not_needs_an_exact_child(self):
+        inexact = OperatorNode(
+            OperatorType.AND,
+            [
+                leaf(QueryType.Equals, "A.M85"),
+                leaf(QueryType.Contains, "5", ResourceField.slug),
+            ],
+        )
+        exact = OperatorNode(
+            OperatorType.AND,
+            [
+                leaf(QueryType.Equals, "A.M85"),
+                leaf(QueryType.Equals, "series", ResourceField.level),
+            ],
+        )
+        records = make_records_by_id()
+        index = indexed(records)
+
+        assert index.candidates(OperatorNode(OperatorType.NOT, [inexact])) is None
+        negated = OperatorNode(OperatorType.NOT, [exact])
+        assert index.candidates(negated) == matching_ids(negated, records)
+
+    def test_records_with_unknown_values_are_always_candidates(self):
+        records = make_records_by_id()
+        index = indexed(records)
+        index.mark_unknown(1)
+
+        assert index.candidates(leaf(QueryType.Equals, "D.48")) == {1, 3, 12}
+
+        index.add(1, records[1])
+        assert index.candidates(leaf(QueryType.Equals, "D.48")) == {3, 12}
+
+    def test_removed_records_are_forgotten(self):
+        index = indexed(make_records_by_id())
+        index.remove(3)
+
+        assert index.candidates(leaf(QueryType.Equals, "D.48")) == {12}
+        assert len(index) == len(ID_VALUES) * 2 - 1
+
+
+class TestRecordCacheIndexes:
+    """The cache keeps a repository's indexes current as records are stored, written back and dropped"""
+
+    def test_index_follows_cache_writes(self):
+        cache = RecordCache(":memory:")
+        records = make_records_by_id()
+        cache.put_many("server", 2, records.values())
+        index = cache.index("server", 2)
+        query = leaf(QueryType.Equals, "D.48")
+        assert index.candidates(query) == {3, 12}
+
+        cache.put("server", 2, {"uri": "/repositories/2/resources/1", "id_0": "D.48"})
+        assert index.candidates(query) == {1, 3, 12}
+
+        cache.invalidate("server", 2, 5)
+        assert index.candidates(query) == {1, 3, 5, 12}
+
+        cache.invalidate_many("server", 2, [3, 5])
+        assert index.candidates(query) == {1, 12}
+
+        assert cache.index("server", 2) is index
+        cache.clear("server", 2)
+        assert cache.index("server", 2) is not index
+        cache.close()
+
+    def test_is_current_needs_a_recent_sync(self):
+        cache = RecordCache(":memory:", max_age=60)
+        assert not cache.is_current("server", 2)
+
+        cache.set_watermark("server", 2, 0)
+        assert not cache.is_current("server", 2)
+
+        import time
+
+        cache.set_watermark("server", 2, time.time())
+        assert cache.is_current("server", 2)
+        cache.close()
+
+
+class TestQueryManagerUsesIndexes:
+    @staticmethod
+    def manager(mocker, records, synced):
+        import time
+
+        from controller.connection_exceptions import ServerError
+        from controller.connection_manager import ConnectionManager
+
+        cache = RecordCache(":memory:", max_age=None)
+        cache.put_many("server", 2, records.values())
+        # A watermark from an earlier run, which on its own isn't enough for the index to be trusted
+        cache.set_watermark("server", 2, time.time())
+        connection_manager = ConnectionManager(mocker.Mock(), record_cache=cache)
+        connection_manager.connection = Mock()
+        connection_manager.connection.server = "server"
+        connection_manager.sync_repository = Mock(
+            side_effect=None if synced else ServerError("sync failed")
+        )
+        connection_manager.search_resource_ids = Mock(return_value=list(records))
+        return connection_manager
+
+    def test_synced_repository_is_narrowed_without_searching(self, mocker):
+        from controller.query_manager import QueryManager
+        from controller.query_profiler import QueryProfile
+
+        records = make_records_by_id()
+        connection_manager = self.manager(mocker, records, synced=True)
+        query = leaf(QueryType.Starts_With, "A.")
+        profile = QueryProfile()
+
+        matches = list(
+            QueryManager().run_query(connection_manager, 2, query, profile=profile)
+        )
+
+        assert [resource_id for resource_id, _ in matches] == [1, 2, 10, 11]
+        connection_manager.search_resource_ids.assert_not_called()
+        assert profile.index_candidates == 4
+        assert profile.retrieval.from_cache == 4
+        assert profile.render().startswith("Index: 4 candidates")
+
+    def test_resources_created_since_the_last_sync_are_candidates(self, mocker):
+        from controller.query_manager import QueryManager
+
+        records = make_records_by_id()
+        connection_manager = self.manager(mocker, records, synced=True)
+        created = {"uri": "/repositories/2/resources/99", "id_0": "A.99"}
+        connection_manager.sync_repository.side_effect = (
+            lambda repo: connection_manager.record_cache.put("server", repo, created)
+        )
+
+        matches = list(
+            QueryManager().run_query(connection_manager, 2, leaf(QueryType.Starts_With, "A."))
+        )
+
+        assert [resource_id for resource_id, _ in matches] == [1, 2, 10, 11, 99]
+
+    def test_failed_sync_does_not_trust_the_index(self, mocker):
+        from controller.query_manager import QueryManager
+
+        records = make_records_by_id()
+        connection_manager = self.manager(mocker, records, synced=False)
+
+        list(
+            QueryManager().run_query(
+                connection_manager, 2, leaf(QueryType.Equals, "D.48"), use_search=True
+            )
+        )
+
+        connection_manager.search_resource_ids.assert_called_once()
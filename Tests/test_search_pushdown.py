@@ -0,0 +1,118 @@
+from unittest.mock import Mock
+
+from controller.search_pushdown import SearchPushdown, solr_escape
+from model.operator_node import OperatorNode
+from model.operator_type import OperatorType
+from model.query_node import QueryNode
+from model.query_type import QueryType
+from model.resource_field import ResourceField
+
+
+def leaf(field, query_type, value=None):
+    return QueryNode(Mock(), field, query_type, value)
+
+
+class TestSolrEscape:
+    def test_escapes_special_characters_and_spaces(self):
+        assert solr_escape('A:B "c" d*') == r'A\:B\ \"c\"\ d\*'
+
+    def test_plain_text_unchanged(self):
+        assert solr_escape("collection") == "collection"
+
+
+class TestTranslateLeaves:
+    """Test which single comparisons can be answered by the index"""
+
+    def test_exact_field_equals(self):
+        query = leaf(ResourceField.level, QueryType.Equals, "collection")
+        assert SearchPushdown().translate(query) == "level:collection"
+
+    def test_exact_field_starts_with(self):
+        query = leaf(ResourceField.ead_id, QueryType.Starts_With, "mss 1")
+        assert SearchPushdown().translate(query) == r"ead_id:mss\ 1*"
+
+    def test_exact_field_in(self):
+        query = leaf(ResourceField.finding_aid_status, QueryType.In, ["draft", "completed"])
+        assert SearchPushdown().translate(query) == "finding_aid_status:(completed OR draft)"
+
+    def test_identifier_equals_becomes_prefix(self):
+        # id_0 is only the start of the indexed four-part identifier
+        query = leaf(ResourceField.id_0, QueryType.Equals, "A.M85")
+        assert SearchPushdown().translate(query) == "identifier:A.M85*"
+
+    def test_identifier_in_becomes_prefixes(self):
+        query = leaf(ResourceField.id_0, QueryType.In, ["B", "A"])
+        assert SearchPushdown().translate(query) == "identifier:(A* OR B*)"
+
+    def test_negative_and_unindexed_comparisons_are_not_pushed(self):
+        pushdown = SearchPushdown()
+        assert pushdown.translate(leaf(ResourceField.level, QueryType.Not_Equals, "x")) is None
+        assert pushdown.translate(leaf(ResourceField.level, QueryType.Contains, "x")) is None
+        assert pushdown.translate(leaf(ResourceField.level, QueryType.Empty)) is None
+        assert pushdown.translate(leaf(ResourceField.id_1, QueryType.Equals, "x")) is None
+
+
+class TestTranslateOperators:
+    """Test that translated operators only ever select a superset of the matches"""
+
+    def test_and_keeps_only_pushable_children(self):
+        query = OperatorNode(
+            OperatorType.AND,
+            [
+                leaf(ResourceField.level, QueryType.Equals, "collection"),
+                leaf(ResourceField.id_0, QueryType.Contains, "x"),
+                leaf(ResourceField.id_0, QueryType.Starts_With, "A"),
+            ],
+        )
+        assert SearchPushdown().translate(query) == "(level:collection AND identifier:A*)"
+
+    def test_and_with_single_pushable_child_is_unwrapped(self):
+        query = OperatorNode(
+            OperatorType.AND,
+            [
+                leaf(ResourceField.level, QueryType.Equals, "collection"),
+                leaf(ResourceField.id_0, QueryType.Contains, "x"),
+            ],
+        )
+        assert SearchPushdown().translate(query) == "level:collection"
+
+    def test_or_requires_every_child(self):
+        pushable = leaf(ResourceField.level, QueryType.Equals, "series")
+        unpushable = leaf(ResourceField.id_0, QueryType.Contains, "x")
+        pushdown = SearchPushdown()
+
+        assert pushdown.translate(OperatorNode(OperatorType.OR, [pushable, unpushable])) is None
+        assert (
+            pushdown.translate(OperatorNode(OperatorType.OR, [pushable, pushable]))
+            == "(level:series OR level:series)"
+        )
+
+    def test_not_is_never_pushed(self):
+        query = OperatorNode(
+            OperatorType.NOT, [leaf(ResourceField.level, QueryType.Equals, "series")]
+        )
+        assert SearchPushdown().translate(query) is None
+
+
+class TestPushedDownNodes:
+    def test_marks_leaves_and_fully_pushed_operators(self):
+        level = leaf(ResourceField.level, QueryType.Equals, "collection")
+        series = leaf(ResourceField.level, QueryType.Equals, "series")
+        status = leaf(ResourceField.finding_aid_status, QueryType.Equals, "draft")
+        pushable_or = OperatorNode(OperatorType.OR, [series, status])
+        unpushable = leaf(ResourceField.id_0, QueryType.Contains, "x")
+        negated_level = leaf(ResourceField.level, QueryType.Equals, "file")
+        negation = OperatorNode(OperatorType.NOT, [negated_level])
+        query = OperatorNode(OperatorType.AND, [level, pushable_or, unpushable, negation])
+
+        pushed = SearchPushdown().pushed_down_nodes(query)
+
+        assert pushed == {id(level), id(series), id(status), id(pushable_or)}
+
+    def test_leaves_under_unpushable_or_are_not_pushed(self):
+        level = leaf(ResourceField.level, QueryType.Equals, "collection")
+        query = OperatorNode(
+            OperatorType.OR, [level, leaf(ResourceField.id_0, QueryType.Contains, "x")]
+        )
+
+        assert SearchPushdown().pushed_down_nodes(query) == set()
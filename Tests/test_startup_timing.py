@@ -0,0 +1,69 @@
+import builtins
+import sys
+
+import pytest
+
+from view.util.startup_timing import StartupTimer
+
+
+@pytest.fixture
+def package(tmp_path, monkeypatch):
+    """A throwaway package whose outer module imports an inner one"""
+    root = tmp_path / "timed_package"
+    root.mkdir()
+    (root / "__init__.py").write_text("")
+    (root / "outer.py").write_text("import time\ntime.sleep(0.02)\nfrom . import inner\n")
+    (root / "inner.py").write_text("import time\ntime.sleep(0.03)\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield "timed_package"
+    for name in [name for name in sys.modules if name.startswith("timed_package")]:
+        del sys.modules[name]
+
+
+class TestStartupTimer:
+    def test_times_fresh_imports_with_self_and_cumulative_time(self, package):
+        timer = StartupTimer()
+        timer.start()
+        try:
+            import timed_package.outer  # noqa: F401
+        finally:
+            timer.stop()
+
+        timings = {module: entry for module, *entry in timer.imports}
+        inner_depth, inner_self, inner_total = timings["timed_package.inner"]
+        outer_depth, outer_self, outer_total = timings["timed_package.outer"]
+        assert inner_depth > outer_depth
+        assert inner_total >= 0.03
+        assert outer_total >= inner_total + 0.02
+        assert outer_self == pytest.approx(outer_total - inner_total, abs=0.01)
+
+    def test_modules_already_loaded_are_not_timed(self):
+        timer = StartupTimer()
+        timer.start()
+        try:
+            import json  # noqa: F401
+        finally:
+            timer.stop()
+
+        assert timer.imports == []
+
+    def test_stop_restores_the_import_machinery(self):
+        original = builtins.__import__
+        timer = StartupTimer()
+        timer.start()
+        timer.start()
+        timer.stop()
+
+        assert builtins.__import__ is original
+
+    def test_report_lists_phases_and_slowest_imports(self, package):
+        timer = StartupTimer()
+        timer.start()
+        import timed_package.outer  # noqa: F401
+
+        timer.stop()
+        timer.mark("first paint")
+
+        report = timer.report(top=1)
+        assert "first paint" in report
+        assert report.strip().endswith("timed_package.outer")
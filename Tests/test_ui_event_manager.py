@@ -0,0 +1,157 @@
+import threading
+from unittest.mock import Mock
+
+import pytest
+
+from observer.ui_event import UiEvent
+from view.ui_event_manager import UiEventManager
+
+
+@pytest.fixture
+def manager():
+    """A fresh event manager, with the application's singleton put back afterwards"""
+    previous = UiEventManager._instance
+    UiEventManager._instance = None
+    manager = UiEventManager()
+    yield manager
+    manager.disable_async()
+    UiEventManager._instance = previous
+
+
+class Recorder:
+    def __init__(self):
+        self.events = []
+        self.threads = []
+
+    def handle_event(self, event, data):
+        self.events.append((event, data))
+        self.threads.append(threading.get_ident())
+
+
+@pytest.fixture
+def recorder(manager):
+    recorder = Recorder()
+    manager.attach(recorder)
+    return recorder
+
+
+class TestSynchronousDispatch:
+    def test_events_are_delivered_at_once(self, manager, recorder):
+        manager.publish_event(UiEvent.QUERY_UPDATED, {"query": 1})
+
+        assert recorder.events == [(UiEvent.QUERY_UPDATED, {"query": 1})]
+
+    def test_a_failing_observer_does_not_stop_the_others(self, manager, recorder):
+        failing = Mock()
+        failing.handle_event.side_effect = RuntimeError("broken")
+        manager.detach(recorder)
+        manager.attach(failing)
+        manager.attach(recorder)
+
+        manager.publish_event(UiEvent.NOTE_CREATED)
+
+        assert recorder.events == [(UiEvent.NOTE_CREATED, {})]
+
+    def test_observers_may_detach_while_handling(self, manager, recorder):
+        class OneShot:
+            def handle_event(self, event, data):
+                manager.detach(self)
+
+        manager.detach(recorder)
+        manager.attach(OneShot())
+        manager.attach(recorder)
+
+        manager.publish_event(UiEvent.NOTE_CREATED)
+
+        assert len(recorder.events) == 1
+
+
+class TestAsynchronousDispatch:
+    @pytest.fixture
+    def root(self, manager):
+        root = Mock()
+        manager.enable_async(root, batch_size=2)
+        return root
+
+    def test_publishing_only_queues(self, manager, recorder, root):
+        manager.publish_event(UiEvent.NOTE_CREATED)
+
+        assert recorder.events == []
+        assert manager.pending_count() == 1
+
+    def test_events_from_workers_are_delivered_on_the_flushing_thread(
+        self, manager, recorder, root
+    ):
+        worker = threading.Thread(
+            target=manager.publish_event, args=(UiEvent.CONNECTION_CHANGED, {"server": "x"})
+        )
+        worker.start()
+        worker.join()
+
+        manager.flush()
+
+        assert recorder.events == [(UiEvent.CONNECTION_CHANGED, {"server": "x"})]
+        assert recorder.threads == [threading.get_ident()]
+
+    def test_only_the_latest_coalesced_event_is_delivered(self, manager, recorder, root):
+        manager.publish_event(UiEvent.QUERY_UPDATED, {"version": 1})
+        manager.publish_event(UiEvent.NOTE_CREATED, {"note": "a"})
+        manager.publish_event(UiEvent.QUERY_UPDATED, {"version": 2})
+        manager.publish_event(UiEvent.NOTE_CREATED, {"note": "b"})
+
+        assert manager.flush() == 3
+        assert recorder.events == [
+            (UiEvent.NOTE_CREATED, {"note": "a"}),
+            (UiEvent.QUERY_UPDATED, {"version": 2}),
+            (UiEvent.NOTE_CREATED, {"note": "b"}),
+        ]
+
+    def test_a_coalesced_event_after_a_flush_is_delivered_again(self, manager, recorder, root):
+        manager.publish_event(UiEvent.QUERY_UPDATED, {"version": 1})
+        manager.flush()
+        manager.publish_event(UiEvent.QUERY_UPDATED, {"version": 2})
+        manager.flush()
+
+        assert [data["version"] for _, data in recorder.events] == [1, 2]
+
+    def test_polling_delivers_in_batches(self, manager, recorder, root):
+        for index in range(5):
+            manager.publish_event(UiEvent.NOTE_CREATED, {"note": index})
+        delay, poll = root.after.call_args.args
+
+        poll()
+        assert len(recorder.events) == 2
+        poll()
+        poll()
+        assert [data["note"] for _, data in recorder.events] == [0, 1, 2, 3, 4]
+        assert root.after.call_count == 4
+
+    def test_disabling_delivers_what_is_left(self, manager, recorder, root):
+        manager.publish_event(UiEvent.NOTE_CREATED)
+        manager.publish_event(UiEvent.ACTION_SELECTED)
+        manager.publish_event(UiEvent.QUERY_UPDATED)
+
+        manager.disable_async()
+
+        assert len(recorder.events) == 3
+        root.after_cancel.assert_called_once()
+        manager.publish_event(UiEvent.NOTE_CREATED)
+        assert len(recorder.events) == 4
+
+
+class TestObserverTiming:
+    def test_each_observer_is_timed(self, manager, recorder, mocker):
+        clock = mocker.patch("view.ui_event_manager.time.perf_counter")
+        clock.side_effect = [0.0, 0.01, 1.0, 1.2]
+        warning = mocker.patch("view.ui_event_manager.logging.warning")
+
+        manager.publish_event(UiEvent.NOTE_CREATED)
+        manager.publish_event(UiEvent.QUERY_UPDATED)
+
+        timing = manager.timings["Recorder"]
+        assert timing.calls == 2
+        assert timing.seconds == pytest.approx(0.21)
+        assert timing.slowest == pytest.approx(0.2)
+        assert timing.slowest_event == UiEvent.QUERY_UPDATED
+        warning.assert_called_once()
+        assert "Recorder: 2 |" in manager.timing_report()
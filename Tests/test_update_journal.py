@@ -0,0 +1,118 @@
+import json
+from unittest.mock import Mock
+
+import pytest
+
+from controller.bulk_updater import BulkUpdater
+from controller.update_journal import UpdateJournal
+
+
+def make_record(resource_id, lock_version=0):
+    return {"uri": f"/repositories/2/resources/{resource_id}", "lock_version": lock_version}
+
+
+def retitle(record):
+    return {**record, "title": "New"}
+
+
+def entries(path):
+    return [json.loads(line) for line in path.read_text().splitlines() if line]
+
+
+class TestUpdateJournal:
+    def test_entries_are_buffered_then_flushed(self, tmp_path):
+        path = tmp_path / "run.journal"
+        journal = UpdateJournal(path, flush_every=3, flush_interval=60)
+
+        journal.planned(make_record(1))
+        journal.append(UpdateJournal.APPLIED, "/repositories/2/resources/1", new_lock_version=1)
+        assert entries(path) == []
+
+        journal.planned(make_record(2))
+        assert [entry["event"] for entry in entries(path)] == ["planned", "applied", "planned"]
+        journal.close()
+
+    def test_close_flushes(self, tmp_path):
+        path = tmp_path / "run.journal"
+        with UpdateJournal(path, flush_interval=60) as journal:
+            journal.planned(make_record(1))
+
+        assert entries(path)[0]["lock_version"] == 0
+
+    def test_existing_journal_needs_resume(self, tmp_path):
+        path = tmp_path / "run.journal"
+        with UpdateJournal(path) as journal:
+            journal.planned(make_record(1))
+
+        with pytest.raises(FileExistsError):
+            UpdateJournal(path)
+
+    def test_resume_reads_back_latest_state(self, tmp_path):
+        path = tmp_path / "run.journal"
+        with UpdateJournal(path) as journal:
+            for i in (1, 2, 3, 4):
+                journal.planned(make_record(i))
+            journal.append(UpdateJournal.APPLIED, make_record(1)["uri"], new_lock_version=1)
+            journal.append(UpdateJournal.APPLIED, make_record(2)["uri"], new_lock_version=1)
+            journal.append(UpdateJournal.FAILED, make_record(3)["uri"], error="invalid")
+        # A crash part way through writing a line
+        with open(path, "a") as torn:
+            torn.write('{"event":"applied","uri":"/repositories/2/res')
+
+        resumed = UpdateJournal(path, resume=True)
+
+        assert resumed.already_applied(make_record(1, lock_version=1))
+        # Edited by someone else after we applied our change
+        assert not resumed.already_applied(make_record(2, lock_version=2))
+        assert not resumed.already_applied(make_record(3))
+        assert resumed.in_doubt == {make_record(4)["uri"]}
+
+        resumed.planned(make_record(5))
+        resumed.close()
+        # New entries start on a line of their own after the torn one
+        last_line = path.read_text().splitlines()[-1]
+        assert json.loads(last_line)["uri"] == make_record(5)["uri"]
+
+
+class TestBulkUpdaterResume:
+    def test_interrupted_run_resumes_where_it_stopped(self, tmp_path):
+        path = tmp_path / "run.journal"
+        connection_manager = Mock()
+        written = []
+
+        def update(repo, resource_id, record):
+            if resource_id == 3:
+                raise KeyboardInterrupt  # the run dies here
+            written.append(resource_id)
+            return {"lock_version": record["lock_version"] + 1}
+
+        connection_manager.update_resource_record.side_effect = update
+        records = [(i, make_record(i)) for i in range(1, 6)]
+
+        with UpdateJournal(path) as journal:
+            updater = BulkUpdater(
+                connection_manager, retitle, max_workers=1, max_in_flight=1, journal=journal
+            )
+            with pytest.raises(KeyboardInterrupt):
+                updater.run(2, records)
+        assert written == [1, 2]
+
+        def update_after_restart(repo, resource_id, record):
+            written.append(resource_id)
+            return {"lock_version": record["lock_version"] + 1}
+
+        connection_manager.update_resource_record.side_effect = update_after_restart
+        # Fetched again, the applied records now carry the lock_version our writes gave them
+        refetched = [(i, make_record(i, lock_version=1 if i < 3 else 0)) for i in range(1, 6)]
+        with UpdateJournal(path, resume=True) as journal:
+            assert journal.in_doubt == {make_record(3)["uri"]}
+            report = BulkUpdater(connection_manager, retitle, journal=journal).run(2, refetched)
+
+        assert report.already_applied == 2
+        assert report.updated == 3
+        assert sorted(written) == [1, 2, 3, 4, 5]
+        with UpdateJournal(path, resume=True) as journal:
+            assert len(journal.applied) == 5
+            assert not journal.in_doubt
+        applied = [entry for entry in entries(path) if entry["event"] == "applied"]
+        assert applied[0]["diff"] == [{"op": "add", "path": "/title", "value": "New"}]
@@ -0,0 +1,74 @@
+"""
+Compares evaluating a query record by record with evaluating it over a ColumnStore.
+
+Run from the repository root with: python -m benchmarks.column_store_benchmark [records]
+"""
+
+import random
+import sys
+import timeit
+from unittest.mock import Mock
+
+from controller.column_store import ColumnStore
+from model.operator_node import OperatorNode
+from model.operator_type import OperatorType
+from model.query_node import QueryNode
+from model.query_type import QueryType
+from model.resource_field import ResourceField
+
+LEVELS = ["collection", "series", "subseries", "file", "item"]
+STATUSES = ["completed", "in_progress", "under_revision", ""]
+
+
+def build_records(count: int) -> list[dict]:
+    rng = random.Random(0)
+    return [
+        {
+            "uri": f"/repositories/2/resources/{i}",
+            "id_0": f"{rng.choice('ADM')}.{rng.randrange(1000)}",
+            "level": rng.choice(LEVELS),
+            "finding_aid_status": rng.choice(STATUSES),
+            "finding_aid_title": f"Papers of person {rng.randrange(20000)}",
+        }
+        for i in range(count)
+    ]
+
+
+def build_query() -> OperatorNode:
+    dm = Mock()
+    return OperatorNode(
+        OperatorType.AND,
+        [
+            QueryNode(dm, ResourceField.level, QueryType.In, ["collection", "series"]),
+            QueryNode(dm, ResourceField.id_0, QueryType.Starts_With, "D."),
+            OperatorNode(
+                OperatorType.NOT,
+                [QueryNode(dm, ResourceField.finding_aid_status, QueryType.Empty)],
+            ),
+            QueryNode(dm, ResourceField.finding_aid_title, QueryType.Contains, "person 1"),
+        ],
+    )
+
+
+def main(count: int = 100_000, repeats: int = 5) -> None:
+    records = build_records(count)
+    query = build_query()
+
+    predicate = query.compile()
+    row_scan = min(
+        timeit.repeat(lambda: [r for r in records if predicate(r)], number=1, repeat=repeats)
+    )
+
+    store = ColumnStore(records)
+    build = timeit.timeit(lambda: store.evaluate(query), number=1)
+    columnar = min(timeit.repeat(lambda: store.evaluate(query), number=1, repeat=repeats))
+    matched = sum(1 for _ in store.matches(query))
+
+    print(f"{count} records, {matched} matches")
+    print(f"compiled predicate, row by row: {row_scan * 1000:.1f} ms")
+    print(f"column store, first query (builds 4 columns): {build * 1000:.1f} ms")
+    print(f"column store, later queries: {columnar * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,46 @@
+"""
+Times parsing and serializing a large .ACMQ query.
+
+Run from the repository root with: python -m benchmarks.query_format_benchmark [leaves]
+"""
+
+import sys
+import timeit
+from unittest.mock import Mock
+
+from controller.query_parser import QueryParser
+from model.operator_node import OperatorNode
+from model.operator_type import OperatorType
+from model.query_node import QueryNode
+from model.query_type import QueryType
+from model.resource_field import ResourceField
+
+
+def build_query(leaves: int) -> OperatorNode:
+    """An AND of leaves exception clauses, half of them nested a level down, like a long hand-written query"""
+    clauses = [
+        QueryNode(Mock(), ResourceField.id_0, QueryType.Not_Equals, f"D.{i}")
+        for i in range(leaves)
+    ]
+    half = leaves // 2
+    return OperatorNode(
+        OperatorType.AND,
+        clauses[:half] + [OperatorNode(OperatorType.AND, clauses[half:])],
+    )
+
+
+def main(leaves: int = 10_000, repeats: int = 20) -> None:
+    query = build_query(leaves)
+    text = query.to_string()
+    parser = QueryParser(data_model=Mock())
+
+    parse = min(timeit.repeat(lambda: parser.parse(text), number=1, repeat=repeats))
+    serialize = min(timeit.repeat(query.to_string, number=1, repeat=repeats))
+
+    print(f"{leaves} leaves, {len(text)} characters")
+    print(f"parse:     {parse * 1000:.1f} ms")
+    print(f"serialize: {serialize * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
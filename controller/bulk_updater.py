@@ -0,0 +1,268 @@
+import copy
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Optional
+
+from .connection_exceptions import ConflictError
+from .json_diff import diff
+from .update_journal import UpdateJournal
+
+# Takes a copy of a resource's JSON and returns the edited record to write back, or None to leave it alone
+Transform = Callable[[dict], Optional[dict]]
+
+
+@dataclass
+class UpdateResult:
+    """What happened to one record of a bulk update"""
+
+    UPDATED = "updated"
+    WOULD_UPDATE = "would update"
+    UNCHANGED = "unchanged"
+    SKIPPED = "skipped"
+    ALREADY_APPLIED = "already applied"
+    FAILED = "failed"
+
+    repo_number: int
+    resource_id: int
+    status: str
+    uri: Optional[str] = None
+    attempts: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+    # The record's lock_version after our write, as the server reported it
+    lock_version: Optional[int] = None
+    # The JSON Patch operations the transform made to the record, when it made any
+    diff: Optional[list[dict]] = None
+
+    @property
+    def retries(self) -> int:
+        """Writes repeated after a lock_version conflict"""
+        return max(self.attempts - 1, 0)
+
+
+@dataclass
+class BulkUpdateReport:
+    """Totals for a bulk update run, with the result for every record in the order they finished"""
+
+    results: list[UpdateResult] = field(default_factory=list)
+    seconds: float = 0.0
+
+    def count(self, status: str) -> int:
+        return sum(1 for result in self.results if result.status == status)
+
+    @property
+    def updated(self) -> int:
+        return self.count(UpdateResult.UPDATED)
+
+    @property
+    def would_update(self) -> int:
+        return self.count(UpdateResult.WOULD_UPDATE)
+
+    @property
+    def unchanged(self) -> int:
+        return self.count(UpdateResult.UNCHANGED)
+
+    @property
+    def skipped(self) -> int:
+        return self.count(UpdateResult.SKIPPED)
+
+    @property
+    def already_applied(self) -> int:
+        return self.count(UpdateResult.ALREADY_APPLIED)
+
+    @property
+    def failed(self) -> list[UpdateResult]:
+        return [result for result in self.results if result.status == UpdateResult.FAILED]
+
+    @property
+    def retries(self) -> int:
+        return sum(result.retries for result in self.results)
+
+    @property
+    def throughput(self) -> float:
+        """Records processed per second"""
+        return len(self.results) / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.results)} records in {self.seconds:.1f}s ({self.throughput:.1f}/s): "
+            + (f"{self.would_update} would update, " if self.would_update else "")
+            + f"{self.updated} updated, {self.unchanged} unchanged, {self.skipped} skipped, "
+            f"{self.already_applied} already applied, {len(self.failed)} failed, "
+            f"{self.retries} retried after conflicts"
+        )
+
+
+class BulkUpdater:
+    """
+    Applies one transformation to many resources and writes the results back through a bounded pool of workers.
+
+    Each record is handed to the transform as a copy. When the write is refused because someone else changed the
+    record in the meantime (a stale lock_version), the record is fetched again and the transform re-applied to the
+    fresh copy, up to max_conflict_retries times, so concurrent edits made by archivists are built on rather than
+    overwritten. Other failures are recorded against the record and the run carries on.
+
+    Records are pulled from the input only as workers free up, so a run fed by QueryManager.run_query streams the
+    repository rather than loading it, and at most max_in_flight records are held at once.
+
+    Before anything is written, the edited record is diffed against the fetched one. Records the transform didn't
+    actually change are not written at all, which makes rerunning an action (say, a Create_Note whose note is already
+    there) nearly free for both us and the server's indexer. Every result carries the diff, and the journal stores
+    it, so a run can be reviewed afterwards; a dry run computes the diffs without writing anything.
+
+    With an UpdateJournal, every change is journaled as it is planned and finished, and records the journal shows
+    were already applied are passed over, so rerunning an interrupted run against its journal picks up where it
+    stopped.
+    """
+
+    def __init__(
+        self,
+        connection_manager,
+        transform: Transform,
+        max_workers: int = 4,
+        max_in_flight: Optional[int] = None,
+        max_conflict_retries: int = 3,
+        journal: Optional[UpdateJournal] = None,
+        dry_run: bool = False,
+    ):
+        if max_workers < 1:
+            raise ValueError(f"max_workers must be at least 1, not {max_workers}")
+        if max_conflict_retries < 0:
+            raise ValueError("max_conflict_retries cannot be negative")
+        if dry_run and journal is not None:
+            raise ValueError("A dry run changes nothing, so has nothing to journal")
+        self.connection_manager = connection_manager
+        self.transform = transform
+        self.max_workers = max_workers
+        self.max_in_flight = max(max_in_flight or max_workers * 2, max_workers)
+        self.max_conflict_retries = max_conflict_retries
+        self.journal = journal
+        self.dry_run = dry_run
+
+    def run(
+        self,
+        repo_number: int,
+        records: Iterable[tuple[int, dict]],
+        on_result: Optional[Callable[[UpdateResult], None]] = None,
+    ) -> BulkUpdateReport:
+        """
+        Update every record of an iterable of (resource id, resource JSON) pairs, such as run_query yields.
+
+        :param repo_number: repository the records belong to
+        :param records: the records to transform, as fetched
+        :param on_result: called on the calling thread with each record's UpdateResult as it finishes
+        :return: per-record results and run totals
+        """
+        report = BulkUpdateReport()
+        started = time.perf_counter()
+        remaining = iter(records)
+        executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="bulk-update"
+        )
+        in_flight: set[Future] = set()
+        journal = self.journal
+
+        def finish(result: UpdateResult) -> None:
+            report.results.append(result)
+            if journal is not None:
+                if result.status == UpdateResult.UPDATED:
+                    journal.append(
+                        UpdateJournal.APPLIED,
+                        result.uri,
+                        new_lock_version=result.lock_version,
+                        diff=result.diff,
+                    )
+                elif result.status in (UpdateResult.SKIPPED, UpdateResult.UNCHANGED):
+                    journal.append(UpdateJournal.SKIPPED, result.uri)
+                elif result.status == UpdateResult.FAILED:
+                    journal.append(UpdateJournal.FAILED, result.uri, error=result.error)
+            if on_result is not None:
+                on_result(result)
+
+        def submit_next() -> bool:
+            for resource_id, record in remaining:
+                if journal is not None:
+                    if journal.already_applied(record):
+                        finish(
+                            UpdateResult(
+                                repo_number,
+                                resource_id,
+                                UpdateResult.ALREADY_APPLIED,
+                                uri=record.get("uri"),
+                            )
+                        )
+                        continue
+                    journal.planned(record)
+                in_flight.add(
+                    executor.submit(self.apply, repo_number, resource_id, record)
+                )
+                return True
+            return False
+
+        try:
+            while len(in_flight) < self.max_in_flight and submit_next():
+                pass
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    in_flight.discard(future)
+                    finish(future.result())
+                    submit_next()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            if journal is not None:
+                journal.flush()
+            report.seconds = time.perf_counter() - started
+
+        logging.info(f"Bulk update of repository {repo_number}: {report.summary()}")
+        return report
+
+    def apply(self, repo_number: int, resource_id: int, record: dict) -> UpdateResult:
+        """Transform and write back one record, re-fetching and re-applying after each conflict"""
+        result = UpdateResult(
+            repo_number, resource_id, UpdateResult.FAILED, uri=record.get("uri")
+        )
+        started = time.perf_counter()
+        try:
+            while True:
+                result.attempts += 1
+                edited = self.transform(copy.deepcopy(record))
+                if edited is None:
+                    result.status = UpdateResult.SKIPPED
+                    break
+                result.diff = diff(record, edited)
+                if not result.diff:
+                    result.status = UpdateResult.UNCHANGED
+                    result.diff = None
+                    break
+                if self.dry_run:
+                    result.status = UpdateResult.WOULD_UPDATE
+                    break
+                try:
+                    response = self.connection_manager.update_resource_record(
+                        repo_number, resource_id, edited
+                    )
+                except ConflictError as e:
+                    if result.attempts > self.max_conflict_retries:
+                        result.error = f"Still conflicting after {result.attempts} attempts: {e}"
+                        break
+                    logging.debug(f"Resource {resource_id} changed under us, re-fetching: {e}")
+                    record = self.connection_manager.get_resource_record(
+                        repo_number, resource_id
+                    )
+                    if "error" in record:
+                        result.error = f"Could not re-fetch after a conflict: {record['error']}"
+                        break
+                    continue
+                result.status = UpdateResult.UPDATED
+                result.lock_version = response.get("lock_version")
+                break
+        except Exception as e:
+            # Whatever a transform or a response throws, it fails this record alone rather than the whole run
+            result.error = f"{type(e).__name__}: {e}"
+        result.seconds = time.perf_counter() - started
+        if result.status == UpdateResult.FAILED:
+            logging.warning(f"Could not update resource {resource_id}: {result.error}")
+        return result
@@ -0,0 +1,291 @@
+"""
+Runs a saved .ACMQ query and its action from the command line, without Tk, so large runs can be scheduled with cron.
+
+    python -m controller.cli exceptions.acmq --credential "Production" --repo 2 --journal run.journal
+
+Matches are written to stdout as they are found, one tab separated line per record, and progress to stderr. Unless
+--no-cache is given, each repository is synced into the local record cache before it is queried, so only records
+changed since the last run are downloaded. The exit status is one of the EXIT_ codes below.
+"""
+
+import argparse
+import itertools
+import logging
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Optional
+
+from controller.bulk_updater import BulkUpdateReport, BulkUpdater, UpdateResult
+from controller.connection_exceptions import ConnectionException
+from controller.connection_manager import ConnectionManager
+from controller.note_actions import build_transform, parse_action
+from controller.query_manager import QueryManager, RepositoryProgress
+from controller.query_parser import QueryParser, QueryParseError
+from controller.record_cache import RecordCache
+from controller.update_journal import UpdateJournal
+from model.data_model import DataModel
+
+EXIT_OK = 0
+# The run finished, but some records or repositories failed
+EXIT_FAILURES = 1
+# Bad arguments, or a query file that can't be read or parsed
+EXIT_USAGE = 2
+# No usable credential, or the server couldn't be reached or refused it
+EXIT_CONNECTION = 3
+EXIT_INTERRUPTED = 130
+
+
+class Headless:
+    """Stands in for Main as the DataModel's owner, through which query nodes reach the connection"""
+
+    connection_manager: Optional[ConnectionManager] = None
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m controller.cli",
+        description="Run a saved .ACMQ query and its action against ArchivesSpace, without the GUI.",
+    )
+    parser.add_argument("query_file", type=Path, help="the .ACMQ file to run")
+    parser.add_argument(
+        "--credential",
+        help="the stored credential to connect with, by display name, username or server. "
+        "May be left out when only one is stored",
+    )
+    parser.add_argument(
+        "--repo",
+        type=int,
+        action="append",
+        dest="repos",
+        help="repository number to run against; repeat for several. Defaults to every repository",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="report the changes the action would make without writing any",
+    )
+    parser.add_argument(
+        "--journal", type=Path, help="journal the run's changes to this file"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue the interrupted run recorded in --journal",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=4, help="concurrent writes (default 4)"
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="narrow the candidates through the server's search index before downloading them. Faster, but the "
+        "index lags behind edits, so records changed since they were last indexed can be missed",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="read every record from the server rather than syncing a local copy",
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="don't report progress on stderr"
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="count",
+        default=0,
+        help="log more detail on stderr; repeat for debug output",
+    )
+    return parser
+
+
+def find_credential(credentials: list, name: Optional[str]):
+    """
+    The stored credential a --credential argument names, matched against display names, then usernames, then servers.
+
+    :raises LookupError: If none matches, or the name is ambiguous
+    """
+    if name is None:
+        if len(credentials) == 1:
+            return credentials[0]
+        raise LookupError(
+            f"{len(credentials)} credentials are stored; choose one with --credential"
+        )
+    for attribute in ("display_name", "username", "server"):
+        matches = [c for c in credentials if getattr(c, attribute) == name]
+        if len(matches) == 1:
+            return matches[0]
+        if len(matches) > 1:
+            raise LookupError(
+                f"{len(matches)} stored credentials have the {attribute} {name!r}"
+            )
+    raise LookupError(f"No stored credential is named {name!r}")
+
+
+def connect(credential_name: Optional[str]) -> ConnectionManager:
+    """
+    Open and test a connection with a stored credential.
+
+    :raises LookupError: If the credential isn't stored, or its password can't be read from the keyring
+    :raises ConnectionException: If the server can't be reached or refuses the credential
+    """
+    from model.credential_index_manager import credential_manager
+
+    credential = find_credential(
+        credential_manager.get_all_credentials(), credential_name
+    )
+    connection = credential_manager.load_credential(credential)
+    if connection is None:
+        raise LookupError(f"No password is stored for {credential.display_name}")
+    connection.test_connection()
+    connection_manager = ConnectionManager(None)
+    connection_manager.connection = connection
+    return connection_manager
+
+
+def _repo_number(repository: dict) -> int:
+    return int(repository["uri"].rstrip("/").rsplit("/", 1)[-1])
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    arguments = build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=(logging.WARNING, logging.INFO, logging.DEBUG)[min(arguments.verbose, 2)],
+        stream=sys.stderr,
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+
+    def status(message: str) -> None:
+        if not arguments.quiet:
+            print(message, file=sys.stderr, flush=True)
+
+    if arguments.resume and arguments.journal is None:
+        print("--resume needs a --journal to resume", file=sys.stderr)
+        return EXIT_USAGE
+    headless = Headless()
+    try:
+        text = arguments.query_file.read_text(encoding="utf-8")
+        query, action_text = QueryParser(
+            DataModel(headless), base_path=arguments.query_file.resolve().parent
+        ).parse_document(text)
+        action = parse_action(action_text)
+        transform = build_transform(action)
+    except OSError as e:
+        print(f"Cannot read {arguments.query_file}: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    except QueryParseError as e:
+        print(f"{arguments.query_file}: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    except ValueError as e:
+        print(f"{arguments.query_file}: invalid action: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    journal = None
+    if transform is not None and arguments.journal is not None and not arguments.dry_run:
+        try:
+            journal = UpdateJournal(arguments.journal, resume=arguments.resume)
+        except OSError as e:
+            print(e, file=sys.stderr)
+            return EXIT_USAGE
+
+    try:
+        connection_manager = headless.connection_manager = connect(arguments.credential)
+        repo_numbers = arguments.repos or [
+            _repo_number(repository)
+            for repository in connection_manager.get_repositories()
+        ]
+    except (LookupError, ConnectionException) as e:
+        print(f"Could not connect: {e}", file=sys.stderr)
+        if journal is not None:
+            journal.close()
+        return EXIT_CONNECTION
+
+    record_cache = None
+    if not arguments.no_cache:
+        try:
+            record_cache = RecordCache()
+        except (OSError, sqlite3.Error) as e:
+            logging.warning(
+                f"Record cache unavailable, every read will go to the server: {e}"
+            )
+    connection_manager.record_cache = record_cache
+
+    def on_progress(progress: RepositoryProgress) -> None:
+        if progress.state == RepositoryProgress.FAILED:
+            failed_repositories.add(progress.repo_number)
+        line = (
+            f"Repository {progress.repo_number}: {progress.state}, "
+            f"{progress.examined} examined, {progress.matched} matched"
+        )
+        status(line + (f" ({progress.error})" if progress.error else ""))
+
+    def on_result(result: UpdateResult) -> None:
+        print(
+            f"{result.status}\t{result.repo_number}\t{result.resource_id}\t{result.uri}"
+            + (f"\t{result.error}" if result.error else ""),
+            flush=True,
+        )
+
+    status(
+        f"Running {arguments.query_file.name} ({action.action_type.name}) "
+        f"on {len(repo_numbers)} repositories"
+    )
+    failed_repositories: set[int] = set()
+    matched = 0
+    report = BulkUpdateReport()
+    matches = QueryManager().run_query_across(
+        connection_manager,
+        repo_numbers,
+        query,
+        use_search=arguments.search,
+        on_progress=on_progress,
+    )
+    try:
+        if transform is None:
+            for repo, resource_id, record in matches:
+                matched += 1
+                print(
+                    f"{repo}\t{resource_id}\t{record.get('uri', '')}\t{record.get('title', '')}",
+                    flush=True,
+                )
+        else:
+            updater = BulkUpdater(
+                connection_manager,
+                transform,
+                max_workers=arguments.workers,
+                journal=journal,
+                dry_run=arguments.dry_run,
+            )
+            # Matches arrive a whole repository at a time, so each repository's run streams straight from the query
+            for repo, group in itertools.groupby(matches, key=lambda match: match[0]):
+                repo_report = updater.run(
+                    repo,
+                    ((resource_id, record) for _, resource_id, record in group),
+                    on_result=on_result,
+                )
+                report.results.extend(repo_report.results)
+                report.seconds += repo_report.seconds
+    except KeyboardInterrupt:
+        if journal is not None:
+            status(f"Interrupted; resume with --journal {arguments.journal} --resume")
+        else:
+            status("Interrupted")
+        return EXIT_INTERRUPTED
+    finally:
+        matches.close()
+        if journal is not None:
+            journal.close()
+        connection_manager.connection.close()
+        if record_cache is not None:
+            record_cache.close()
+
+    if transform is None:
+        status(f"{matched} records matched")
+    else:
+        status(report.summary())
+    return EXIT_FAILURES if report.failed or failed_repositories else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
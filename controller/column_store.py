@@ -0,0 +1,222 @@
+import logging
+from array import array
+from typing import Iterable, Iterator, Optional
+
+from model.field import Field
+from model.field_path import field_path
+from model.node import Node
+from model.operator_node import OperatorNode
+from model.operator_type import OperatorType
+from model.query_node import COMPARATORS, QueryNode, _as_text
+from model.query_type import QueryType
+from .record_cache import RecordCache, resource_id_from_uri
+
+# Query types answered by looking their values up in a column's dictionary, and those answered as the complement
+_LOOKUP_TYPES = {
+    QueryType.Equals: False,
+    QueryType.In: False,
+    QueryType.Not_Equals: True,
+    QueryType.Not_In: True,
+}
+
+
+def bitmap_rows(bitmap: int) -> Iterator[int]:
+    """The row numbers set in a bitmap, lowest first"""
+    bits = bin(bitmap)[:1:-1]
+    row = bits.find("1")
+    while row != -1:
+        yield row
+        row = bits.find("1", row + 1)
+
+
+def rows_bitmap(rows: Iterable[int], size: int) -> int:
+    """A bitmap with the given rows set"""
+    packed = bytearray((size + 7) >> 3)
+    for row in rows:
+        packed[row >> 3] |= 1 << (row & 7)
+    return int.from_bytes(packed, "little")
+
+
+class Column:
+    """
+    One field of every record, dictionary encoded: each distinct text value is stored once, and each row holds the
+    code of its value. For each code we also keep the rows holding it, so a comparison is made once per distinct
+    value rather than once per row, and the matching rows are collected from those lists.
+
+    Most fields hold a few distinct values (levels, statuses, flags). While a column has no more than 256, its codes
+    are also kept as one byte per row, and a comparison's bitmap is built entirely in C: the codes are translated to
+    "1" or "0" characters and parsed as a binary number.
+    """
+
+    def __init__(self, texts: Iterable[str]):
+        self.dictionary: list[str] = []
+        self.codes_by_value: dict[str, int] = {}
+        self.codes = array("I")
+        self.postings: list[array] = []
+        for row, text in enumerate(texts):
+            code = self.codes_by_value.get(text)
+            if code is None:
+                code = len(self.dictionary)
+                self.codes_by_value[text] = code
+                self.dictionary.append(text)
+                self.postings.append(array("I"))
+            self.codes.append(code)
+            self.postings[code].append(row)
+
+        self.code_bytes: Optional[bytes] = (
+            array("B", self.codes).tobytes() if len(self.dictionary) <= 256 else None
+        )
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def select(self, query_type: QueryType, compare_data) -> int:
+        """
+        Bitmap of the rows whose value passes a comparison. Every QueryType comparison depends only on the text of
+        the value, so testing each dictionary entry once gives exactly the answer testing each row would.
+        """
+        if query_type in _LOOKUP_TYPES:
+            if query_type in (QueryType.In, QueryType.Not_In):
+                values = compare_data
+            else:
+                values = (compare_data,)
+            codes = [
+                self.codes_by_value[value]
+                for value in values
+                if value in self.codes_by_value
+            ]
+            negate = _LOOKUP_TYPES[query_type]
+        else:
+            compare = COMPARATORS[query_type]
+            codes = [
+                code
+                for code, text in enumerate(self.dictionary)
+                if compare(text, compare_data)
+            ]
+            negate = False
+            # Collecting the rows that fail is cheaper when most of them pass
+            if len(codes) * 2 > len(self.dictionary):
+                matching = set(codes)
+                codes = [
+                    code for code in range(len(self.dictionary)) if code not in matching
+                ]
+                negate = True
+
+        bitmap = self._codes_bitmap(codes)
+        if negate:
+            return bitmap ^ ((1 << len(self.codes)) - 1)
+        return bitmap
+
+    def _codes_bitmap(self, codes: list[int]) -> int:
+        if not codes:
+            return 0
+        if self.code_bytes is not None:
+            table = bytearray(b"0" * 256)
+            for code in codes:
+                table[code] = ord("1")
+            # Row 0 is the lowest bit, so the digits are read in reverse
+            return int(self.code_bytes.translate(table)[::-1], 2)
+        return rows_bitmap(
+            (row for code in codes for row in self.postings[code]), len(self.codes)
+        )
+
+
+class ColumnStore:
+    """
+    An in-memory, column-per-field copy of a set of resource records, for evaluating whole query trees at once.
+
+    A query is answered as a bitmap with one bit per record: each leaf selects from its field's column, and AND, OR and
+    NOT become &, | and ^ over arbitrary-precision ints, which run at C speed however many records there are.
+    Columns are built the first time a query touches their field, so fields nobody queries cost nothing.
+
+    The store is a snapshot: build a new one after the records it was built from change.
+    """
+
+    def __init__(self, records: Iterable[dict]):
+        self.records: list[dict] = list(records)
+        self.ids: list[int] = [
+            resource_id_from_uri(record["uri"]) for record in self.records
+        ]
+        self.columns: dict[Field, Column] = {}
+        self._all_rows = (1 << len(self.records)) - 1
+
+    @classmethod
+    def from_cache(
+        cls, record_cache: RecordCache, server: str, repo: int
+    ) -> "ColumnStore":
+        """Build a store of every still-valid record cached for a repository"""
+        records = record_cache.get_many(
+            server, repo, sorted(record_cache.cached_ids(server, repo))
+        )
+        logging.debug(
+            f"Building column store over {len(records)} cached records of repository {repo}"
+        )
+        return cls(records.values())
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def column(self, field: Field) -> Column:
+        """
+        The column of a single-valued field or path, built on first use.
+
+        Raises:
+            ValueError: If the field is a multi-valued FieldPath, which has no single value per row
+        """
+        column = self.columns.get(field)
+        if column is None:
+            path = field_path(field)
+            if path.multi_valued:
+                raise ValueError(f"{path.name} holds several values per record")
+            get = path.get
+            column = Column(_as_text(get(record)) for record in self.records)
+            self.columns[field] = column
+        return column
+
+    def evaluate(self, query: Node) -> int:
+        """
+        Bitmap of the records matching a query, bit n standing for self.records[n].
+
+        Raises:
+            ValueError: If the tree fails validation
+        """
+        if not query.validate():
+            raise ValueError(f"Cannot evaluate invalid query: {query.to_string()}")
+        return self._evaluate(query)
+
+    def _evaluate(self, node: Node) -> int:
+        if isinstance(node, QueryNode):
+            if field_path(node.compare_field).multi_valued:
+                # No column to select from, so test the records one by one
+                predicate = node.compile()
+                return rows_bitmap(
+                    (row for row, record in enumerate(self.records) if predicate(record)),
+                    len(self.records),
+                )
+            return self.column(node.compare_field).select(
+                node.query_type, node.compare_data
+            )
+        if not isinstance(node, OperatorNode):
+            raise ValueError(f"Cannot evaluate {type(node).__name__} over columns")
+
+        if node.operator == OperatorType.NOT:
+            return self._evaluate(node.children[0]) ^ self._all_rows
+        if node.operator == OperatorType.AND:
+            bitmap = self._all_rows
+            for child in node.children:
+                bitmap &= self._evaluate(child)
+                if not bitmap:
+                    break
+            return bitmap
+        bitmap = 0
+        for child in node.children:
+            bitmap |= self._evaluate(child)
+            if bitmap == self._all_rows:
+                break
+        return bitmap
+
+    def matches(self, query: Node) -> Iterator[tuple[int, dict]]:
+        """The (resource id, record) pairs matching a query, in the order the store holds them"""
+        for row in bitmap_rows(self.evaluate(query)):
+            yield self.ids[row], self.records[row]
+
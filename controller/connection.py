@@ -3,14 +3,20 @@ import asnake.client.web_client
 
 import requests.exceptions
 from asnake.client import ASnakeClient
+import threading
 import time
+from typing import Optional
+
 from controller.connection_exceptions import (
     ConfigurationError,
     NetworkError,
     ServerError,
     AuthenticationError,
+    OperationCancelledError,
 )
 from controller.HttpRequestType import HttpRequestType
+from controller.http_session import PoolConfig, PoolStats, build_session, pool_stats
+from controller.rate_limiter import RateLimiter, parse_retry_after
 
 
 class Connection:
@@ -24,17 +30,52 @@ class Connection:
 
     TODO: Complete Query for different types
 
-    TODO: Add a ratelimit to avoid overloading the archivesspace server and getting API errors. Make it dynamic (opt)
-
     TODO: Add logging to this file
+
+    All HTTP traffic, including that of every client rebuilt by test_connection, goes through one pooled
+    requests.Session owned by the connection, so keep-alive sockets survive re-authentication and can be shared by
+    worker threads. Queries are paced by a single adaptive RateLimiter, so every caller of a connection shares the
+    same budget against the server.
     """
 
-    def __init__(self, s: str, u: str, p: str):
+    max_throttle_retries: int = 5
+
+    def __init__(
+        self,
+        s: str,
+        u: str,
+        p: str,
+        pool_config: Optional[PoolConfig] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
         self.server: str = s
         self.username: str = u
         self.password: str = p
         self.client = None
         self.validated = False
+        self.pool_config: PoolConfig = pool_config or PoolConfig()
+        self.http_session: Optional[requests.Session] = None
+        self.rate_limiter: RateLimiter = rate_limiter or RateLimiter()
+
+    def get_http_session(self) -> requests.Session:
+        """Return the pooled session shared by every client this connection creates, building it on first use"""
+        if self.http_session is None:
+            self.http_session = build_session(self.pool_config)
+        return self.http_session
+
+    def pool_stats(self) -> PoolStats:
+        """Report how many requests reused an open socket versus opening a new one"""
+        if self.http_session is None:
+            return PoolStats()
+        return pool_stats(self.http_session)
+
+    def close(self) -> None:
+        """Close every pooled socket. The connection must be tested again before further use."""
+        if self.http_session is not None:
+            self.http_session.close()
+            self.http_session = None
+        self.client = None
+        self.validated = False
 
     def create_session(self) -> ASnakeClient:
         """
@@ -56,6 +97,8 @@ class Connection:
             client = ASnakeClient(
                 baseurl=self.server, username=self.username, password=self.password
             )
+            # Swap in our pooled session before authorizing so the login and every later call share its sockets
+            client.session = self.get_http_session()
 
             # Attempt authorization
             logging.debug("Attempting authorization...")
@@ -108,15 +151,20 @@ class Connection:
     def __str__(self):
         return self.server + self.username + self.password
 
-    def test_connection(self) -> None:
+    def test_connection(self, cancel: Optional[threading.Event] = None) -> None:
         """
         Test connection validity with automatic retry for network errors.
         Raises appropriate exception on failure.
+
+        :param cancel: when set, the test gives up, without waiting out the rest of a retry delay, by raising
+            OperationCancelledError
         """
         self._validate_connection_config()
 
         max_attempts = 3
         for attempt in range(max_attempts):
+            if cancel is not None and cancel.is_set():
+                raise OperationCancelledError("Connection test cancelled")
             try:
                 self.client = self.create_session()
                 self._verify_connection()
@@ -127,7 +175,7 @@ class Connection:
                 raise
 
             except Exception as e:
-                self._handle_connection_error(e, attempt, max_attempts)
+                self._handle_connection_error(e, attempt, max_attempts, cancel)
 
     def _validate_connection_config(self) -> None:
         """Validate that required connection configuration is present."""
@@ -135,7 +183,11 @@ class Connection:
             raise ConfigurationError("Connection configuration is incomplete")
 
     def _handle_connection_error(
-        self, error: Exception, attempt: int, max_attempts: int
+        self,
+        error: Exception,
+        attempt: int,
+        max_attempts: int,
+        cancel: Optional[threading.Event] = None,
     ) -> None:
         """
         Handle connection errors with appropriate retry logic.
@@ -144,6 +196,7 @@ class Connection:
             error: The exception that occurred
             attempt: Current attempt number (0-based)
             max_attempts: Total number of attempts allowed
+            cancel: when set during the wait before a retry, the wait ends early with OperationCancelledError
         """
         logging.debug(
             f"_handle_connection_error called with: {type(error)}, attempt={attempt}"
@@ -193,7 +246,10 @@ class Connection:
             else:
                 # Wait before retry with exponential backoff
                 logging.debug(f"Not final attempt, sleeping {2**attempt} seconds")
-                time.sleep(2**attempt)
+                if cancel is None:
+                    time.sleep(2**attempt)
+                elif cancel.wait(2**attempt):
+                    raise OperationCancelledError("Connection test cancelled") from error
                 return
 
         # Handle unexpected errors
@@ -210,20 +266,61 @@ class Connection:
         except Exception as e:
             raise NetworkError("Connection test failed") from e
 
-    def query(self, http_request_type: HttpRequestType, endpoint: str):
+    def query(self, http_request_type: HttpRequestType, endpoint: str, **kwargs):
         """
         Actually makes a query of the archives_space server
         :param http_request_type: does what it says on the tin
         :param endpoint: it's not this classes job to tell you what to query, go talk to QueryManager
+        :param kwargs: passed through to the client, e.g. params
         :return: the result of the API Query
 
-        todo: complete this for different HTTP request types, and automatically manage a 429 error (too many requests)
+        Each request waits its turn on the shared rate limiter. 429 and 503 responses are retried after honouring
+        Retry-After, up to max_throttle_retries times, and slow the limiter down for every other caller too.
+
+        todo: complete this for different HTTP request types
         """
         if not self.validated:
             raise AuthenticationError("Connection not validated")
         match http_request_type:
             case HttpRequestType.GET:
-                return self.client.get(endpoint)
+                return self._throttled(self.client.get, endpoint, **kwargs)
 
             case _:
                 pass
+
+    def update(self, endpoint: str, record: dict):
+        """
+        Send an updated record to the server, paced and retried on throttling like query.
+
+        Writes have their own method, rather than a case of query, so that query keeps answering GETs only.
+
+        :return: the server's response
+        """
+        if not self.validated:
+            raise AuthenticationError("Connection not validated")
+        return self._throttled(self.client.put, endpoint, json=record)
+
+    def _throttled(self, method, endpoint: str, **kwargs):
+        """Run one client call under the rate limiter, retrying while the server says it is overloaded"""
+        for attempt in range(self.max_throttle_retries + 1):
+            self.rate_limiter.acquire()
+            started = time.monotonic()
+            response = method(endpoint, **kwargs)
+            status_code = getattr(response, "status_code", None)
+
+            if status_code in (429, 503):
+                retry_after = parse_retry_after(
+                    getattr(response, "headers", {}).get("Retry-After")
+                )
+                logging.debug(
+                    f"{endpoint} returned {status_code} (attempt {attempt + 1}), retry after {retry_after}"
+                )
+                self.rate_limiter.record_throttle(retry_after)
+                continue
+
+            self.rate_limiter.record_success(time.monotonic() - started)
+            return response
+
+        raise ServerError(
+            f"Server still throttling {endpoint} after {self.max_throttle_retries} retries"
+        )
@@ -20,6 +20,18 @@ class ServerError(ConnectionException):
     pass
 
 
+class ConflictError(ServerError):
+    """The record changed on the server since we fetched it, so our lock_version is stale"""
+
+    pass
+
+
+class OperationCancelledError(ConnectionException):
+    """The operation was cancelled before it finished"""
+
+    pass
+
+
 class AuthenticationError(ConnectionException):
     """Authentication error"""
 
@@ -1,64 +1,151 @@
 import json
 import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
 from json import JSONDecodeError
-from typing import Optional
+from typing import TYPE_CHECKING, Iterator, Optional
 
 from controller.HttpRequestType import HttpRequestType
 from observer.subject import SubjectMixin
 from observer.ui_event import UiEvent
 from view.ui_event_manager import UiEventManager
-from .connection import Connection
-from .connection_exceptions import NetworkError, ServerError
+from .connection_exceptions import ConflictError, NetworkError, ServerError
+from .record_cache import RecordCache, RecordMemo, resource_id_from_uri
+
+if TYPE_CHECKING:
+    from view.util.background_worker import Task
+
+    # Imported where a connection is made, since ArchivesSnake and requests take a good part of startup to load
+    from .connection import Connection
+
+_EXHAUSTED = object()
+
+# ArchivesSpace's default AppConfig[:max_page_size], which also caps how many ids an id_set request may carry
+ID_SET_BATCH_SIZE = 250
+
+# Seconds subtracted from a sync watermark to allow for clock drift between us and the server
+SYNC_CLOCK_MARGIN = 300
+
+
+@dataclass
+class SyncResult:
+    """Outcome of ConnectionManager.sync_repository"""
+
+    full: bool
+    fetched: int = 0
+    deleted: int = 0
+
+
+@dataclass
+class RetrievalStats:
+    """Where the records streamed by iter_resource_records came from"""
+
+    from_cache: int = 0
+    fetched: int = 0
+    requests: int = 0
 
 
 class ConnectionManager(SubjectMixin):
-    def __init__(self, main):
+    def __init__(self, main, record_cache: Optional[RecordCache] = None):
         super().__init__()  # Initialize the mixin
         self.main = main
-        self.connection: Optional[Connection] = None
+        self.connection: Optional["Connection"] = None
         self.event_manager: UiEventManager = UiEventManager()
+        # When set, resource reads are served locally while fresh, and our own writes invalidate them
+        self.record_cache: Optional[RecordCache] = record_cache
+        # Only set inside record_memo(), for the length of one run
+        self.active_memo: Optional[RecordMemo] = None
 
-    def set_connection(self, server: str, username: str, password: str):
-        """Set connection and notify observers"""
+    @contextmanager
+    def record_memo(self, max_size: int = 1024):
+        """
+        Within this block, each resource is fetched from the server at most once while it stays among the max_size
+        most recently seen. Records streamed by iter_resource_records are remembered too, so by-id lookups of the
+        record currently being processed never go back to the server. Nested blocks share the outermost memo.
+        """
+        if self.active_memo is not None:
+            yield self.active_memo
+            return
+        self.active_memo = RecordMemo(max_size)
+        try:
+            yield self.active_memo
+        finally:
+            logging.debug(
+                f"Record memo finished with {self.active_memo.hits} hits, {self.active_memo.misses} misses"
+            )
+            self.active_memo = None
+
+    def set_connection(
+        self, server: str, username: str, password: str, worker=None
+    ) -> Optional["Task"]:
+        """
+        Set connection and notify observers.
+
+        With a worker, the new connection is tested on one of the worker's threads and CONNECTION_CHANGED is published
+        on the Tk thread once the test finishes, so the retries against a slow or unreachable server never freeze the
+        window. Without one, the test runs on the calling thread.
+
+        :param worker: the view's BackgroundWorker, if any
+        :return: the worker's Task for the test, through which it can be cancelled, or None without a worker
+        """
         from controller.connection import Connection
+
+        connection = Connection(server, username, password)
+        self.connection: Connection = connection
+
+        def publish(outcome: tuple[bool, Optional[str]]) -> None:
+            if self.connection is not connection:
+                # Another connection was set while this one was being tested
+                return
+            is_valid, error_message = outcome
+            # Notify all interested components about the connection change
+            self.event_manager.publish_event(
+                UiEvent.CONNECTION_CHANGED,
+                {
+                    "connection": connection,
+                    "server": server,
+                    "username": username,
+                    "is_valid": is_valid,
+                    "error_message": error_message,
+                },
+            )
+
+        if worker is None:
+            publish(self._test_connection(connection))
+            return None
+        return worker.submit(
+            lambda task: self._test_connection(connection, task.cancel_event),
+            name=f"Connecting to {server}",
+            on_done=publish,
+        )
+
+    @staticmethod
+    def _test_connection(
+        connection: "Connection", cancel: Optional[threading.Event] = None
+    ) -> tuple[bool, Optional[str]]:
+        """Test a connection, returning whether it is valid and, if not, why"""
         from controller.connection_exceptions import (
             ConfigurationError,
-            NetworkError,
-            ServerError,
             AuthenticationError,
         )
 
-        self.connection: Connection = Connection(server, username, password)
-
-        # Test connection and determine validity
-        is_valid: bool = False
-        error_message: Optional[str] = None
-
         try:
-            self.connection.test_connection()
-            is_valid = True
+            connection.test_connection(cancel)
         except ConfigurationError as e:
-            error_message = f"Configuration error: {e}"
+            return False, f"Configuration error: {e}"
         except AuthenticationError as e:
-            error_message = f"Authentication failed: {e}"
+            return False, f"Authentication failed: {e}"
         except NetworkError as e:
-            error_message = f"Network error: {e}"
+            return False, f"Network error: {e}"
         except ServerError as e:
-            error_message = f"Server error: {e}"
+            return False, f"Server error: {e}"
         except Exception as e:
-            error_message = f"Unexpected error: {e}"
-
-        # Notify all interested components about the connection change
-        self.event_manager.publish_event(
-            UiEvent.CONNECTION_CHANGED,
-            {
-                "connection": self.connection,
-                "server": server,
-                "username": username,
-                "is_valid": is_valid,
-                "error_message": error_message,
-            },
-        )
+            return False, f"Unexpected error: {e}"
+        return True, None
 
     """def get_repository_list(self) -> dict:
         Get repositories and notify observers
@@ -104,31 +191,313 @@ class ConnectionManager(SubjectMixin):
             raise
 
     def get_resource_list(self, repo_number) -> list[int]:
-        """AI Generated. Double check especially lines 118, 119
-        todo: Add error handling
         """
-        resources = []
+        List the id of every resource in a repository with a single all_ids request.
+
+        :param repo_number: The repository number to list
+        :return: resource ids, as the server ordered them
+        :raises ServerError: If the server answers with an error or something other than a list of ids
+        """
         result = self.connection.query(
-            HttpRequestType.GET, f"/repositories/{repo_number}/resources"
+            HttpRequestType.GET,
+            f"/repositories/{repo_number}/resources",
+            params={"all_ids": "true"},
         ).json()
-        while "error" not in result:
-            resources.append(result["uri"])
+        if not isinstance(result, list):
+            raise ServerError(
+                f"Expected a list of resource ids from repository {repo_number}, got: {result}"
+            )
+        return result
+
+    def get_resource_batch(self, repo_number: int, resource_ids: list[int]) -> list:
+        """
+        Fetch up to one page of full resource records in a single id_set request.
+
+        :param repo_number: The repository number to query
+        :param resource_ids: ids to fetch. ArchivesSpace caps this at its max page size, 250 by default
+        :return: the resource JSONs the server returned, which omits any ids that no longer exist
+        :raises ServerError: If the server answers with an error instead of a list of records
+        """
+        result = self.connection.query(
+            HttpRequestType.GET,
+            f"/repositories/{repo_number}/resources",
+            params={"id_set": list(resource_ids)},
+        ).json()
+        if not isinstance(result, list):
+            raise ServerError(
+                f"Expected a list of resources from repository {repo_number}, got: {result}"
+            )
+        return result
+
+    def iter_resource_records(
+        self,
+        repo_number: int,
+        resource_ids: Optional[list[int]] = None,
+        batch_size: int = ID_SET_BATCH_SIZE,
+        stats: Optional[RetrievalStats] = None,
+    ) -> Iterator[tuple[int, dict]]:
+        """
+        Stream (resource id, resource JSON) pairs from a repository, one id_set batch at a time.
+
+        Only a single batch of records is held at once, so consumers that evaluate or act on each record and then
+        drop it run in bounded memory however large the repository is. Nothing is requested until iteration starts.
+        With a record cache, still-valid cached records in each batch are yielded first and only the rest are
+        requested.
+
+        Args:
+            repo_number: The repository number to query
+            resource_ids: ids to fetch. Defaults to every resource in the repository
+            batch_size: ids per id_set request. Must not exceed the server's max page size
+            stats: if given, counts how many records came from the cache and how many were fetched
+
+        Yields:
+            tuple: (resource id, resource data)
+        """
+        if not isinstance(repo_number, int) or repo_number <= 0:
+            raise ValueError(f"Invalid repository number: {repo_number}")
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1, not {batch_size}")
+
+        if resource_ids is None:
+            resource_ids = self.get_resource_list(repo_number)
+
+        for start in range(0, len(resource_ids), batch_size):
+            batch = resource_ids[start : start + batch_size]
+
+            if self.record_cache is not None:
+                cached = self.record_cache.get_many(
+                    self.connection.server, repo_number, batch
+                )
+                if stats is not None:
+                    stats.from_cache += len(cached)
+                for resource_id, record in cached.items():
+                    self._remember(repo_number, resource_id, record)
+                    yield resource_id, record
+                batch = [
+                    resource_id for resource_id in batch if resource_id not in cached
+                ]
+                if not batch:
+                    continue
+
+            records = self.get_resource_batch(repo_number, batch)
+            if stats is not None:
+                stats.fetched += len(records)
+                stats.requests += 1
+            if self.record_cache is not None:
+                self.record_cache.put_many(
+                    self.connection.server, repo_number, records
+                )
+            for record in records:
+                resource_id = resource_id_from_uri(record["uri"])
+                self._remember(repo_number, resource_id, record)
+                yield resource_id, record
+
+    def _remember(self, repo_number: int, resource_id: int, record: dict) -> None:
+        memo = self.active_memo
+        if memo is not None:
+            memo.put(repo_number, resource_id, record)
+
+    def get_all_resource_records(
+        self,
+        repo_number: int,
+        batch_size: int = ID_SET_BATCH_SIZE,
+        stats: Optional[RetrievalStats] = None,
+    ) -> dict:
+        """
+        Fetch every resource in a repository into memory. Prefer iter_resource_records for large repositories.
+
+        Args:
+            repo_number: The repository number to query
+            batch_size: ids per id_set request. Must not exceed the server's max page size
+            stats: if given, counts how many records came from the cache and how many were fetched
+
+        Returns:
+            dict: Mapping of resource id to resource data
+        """
+        if not isinstance(repo_number, int) or repo_number <= 0:
+            raise ValueError(f"Invalid repository number: {repo_number}")
+
+        resource_ids = self.get_resource_list(repo_number)
+        logging.info(
+            f"Fetching {len(resource_ids)} resources from repository {repo_number} "
+            f"in batches of {batch_size}"
+        )
+
+        resources = dict(
+            self.iter_resource_records(repo_number, resource_ids, batch_size, stats)
+        )
+
+        missing = len(resource_ids) - len(resources)
+        if missing > 0:
+            logging.warning(
+                f"{missing} resources in repository {repo_number} disappeared between listing and fetching"
+            )
+        return resources
+
+    def sync_repository(
+        self, repo_number: int, batch_size: int = ID_SET_BATCH_SIZE
+    ) -> SyncResult:
+        """
+        Bring the record cache's copy of a repository up to date.
+
+        The first sync of a repository downloads every resource. Later syncs ask only for resources modified since
+        the stored watermark (all_ids with modified_since) and for resources deleted since then (the delete feed),
+        so a nightly run fetches just the records archivists touched. The watermark is taken before any request is
+        made, less SYNC_CLOCK_MARGIN, so edits made while a sync runs are picked up by the next one.
+
+        Args:
+            repo_number: The repository number to sync
+            batch_size: ids per id_set request
+
+        Returns:
+            SyncResult: how many records were fetched and dropped, and whether this was a full sync
+
+        Raises:
+            ValueError: If there is no record cache to sync into, or repo_number is invalid
+        """
+        if self.record_cache is None:
+            raise ValueError("Incremental sync needs a record cache")
+        if not isinstance(repo_number, int) or repo_number <= 0:
+            raise ValueError(f"Invalid repository number: {repo_number}")
+
+        server = self.connection.server
+        started = time.time()
+        watermark = self.record_cache.get_watermark(server, repo_number)
+        result = SyncResult(full=watermark is None)
+
+        if watermark is None:
+            logging.info(f"No sync watermark for repository {repo_number}, syncing fully")
+            to_fetch = self.get_resource_list(repo_number)
+            to_drop = self.record_cache.cached_ids(server, repo_number) - set(to_fetch)
+        else:
+            since = int(watermark - SYNC_CLOCK_MARGIN)
+            to_fetch = self.get_modified_resource_ids(repo_number, since)
+            to_drop = self.get_deleted_resource_ids(repo_number, since)
+            logging.info(
+                f"Repository {repo_number}: {len(to_fetch)} resources modified and "
+                f"{len(to_drop)} deleted since {since}"
+            )
+
+        for start in range(0, len(to_fetch), batch_size):
+            records = self.get_resource_batch(
+                repo_number, to_fetch[start : start + batch_size]
+            )
+            self.record_cache.put_many(server, repo_number, records)
+            result.fetched += len(records)
+
+        if to_drop:
+            self.record_cache.invalidate_many(server, repo_number, to_drop)
+            result.deleted = len(to_drop)
+
+        self.record_cache.touch_repository(server, repo_number, started)
+        self.record_cache.set_watermark(server, repo_number, started)
+        logging.info(f"Synced repository {repo_number}: {result}")
+        return result
+
+    def get_modified_resource_ids(self, repo_number: int, since: int) -> list[int]:
+        """
+        List the ids of resources in a repository modified since a unix timestamp.
+
+        :raises ServerError: If the server answers with something other than a list of ids
+        """
+        result = self.connection.query(
+            HttpRequestType.GET,
+            f"/repositories/{repo_number}/resources",
+            params={"all_ids": "true", "modified_since": since},
+        ).json()
+        if not isinstance(result, list):
+            raise ServerError(
+                f"Expected a list of resource ids from repository {repo_number}, got: {result}"
+            )
+        return result
+
+    def get_deleted_resource_ids(self, repo_number: int, since: int) -> set[int]:
+        """
+        Walk the server's delete feed for resources of one repository deleted since a unix timestamp.
+
+        :raises ServerError: If the server answers with something other than a page of uris
+        """
+        prefix = f"/repositories/{repo_number}/resources/"
+        deleted = set()
+        page = 1
+        while True:
             result = self.connection.query(
                 HttpRequestType.GET,
-                f"/repositories/{repo_number}/resources?page={len(resources)}",
+                "/delete-feed",
+                params={"page": page, "modified_since": since},
             ).json()
-        return resources
+            if not isinstance(result, dict) or "results" not in result:
+                raise ServerError(f"Unexpected delete feed response: {result}")
+
+            for uri in result["results"]:
+                if uri.startswith(prefix):
+                    deleted.add(resource_id_from_uri(uri))
+
+            if result.get("this_page", page) >= result.get("last_page", page):
+                return deleted
+            page += 1
+
+    def search_resource_ids(
+        self, repo_number: int, solr_query: str, page_size: int = ID_SET_BATCH_SIZE
+    ) -> list[int]:
+        """
+        Ask the repository's search index which resources match a Solr query, paging through every hit.
+
+        Only the uri of each hit is requested, so this is far cheaper than downloading the records themselves.
+
+        :param repo_number: The repository number to search
+        :param solr_query: query in Solr's standard syntax, as built by SearchPushdown
+        :param page_size: hits per page. ArchivesSpace caps this at its max page size, 250 by default
+        :return: ids of the matching resources, in the order the index returned them
+        :raises ServerError: If the server answers with something other than a page of search results
+        """
+        found = []
+        page = 1
+        while True:
+            result = self.connection.query(
+                HttpRequestType.GET,
+                f"/repositories/{repo_number}/search",
+                params={
+                    "q": solr_query,
+                    "type": ["resource"],
+                    "fields": ["uri"],
+                    "page": page,
+                    "page_size": page_size,
+                },
+            ).json()
+            if not isinstance(result, dict) or "results" not in result:
+                raise ServerError(f"Unexpected search response: {result}")
+
+            for hit in result["results"]:
+                found.append(resource_id_from_uri(hit["uri"]))
 
-    def get_resource_records(self, repo_number: int, resources_to_get: list) -> dict:
+            if result.get("this_page", page) >= result.get("last_page", page):
+                logging.debug(
+                    f"Search of repository {repo_number} for {solr_query} matched {len(found)} resources"
+                )
+                return found
+            page += 1
+
+    def get_resource_records(
+        self,
+        repo_number: int,
+        resources_to_get: list,
+        max_workers: int = 1,
+        ordered: bool = True,
+        max_in_flight: Optional[int] = None,
+    ) -> dict:
         """
         Make the queries necessary to turn a list of resources in a repo into a dict of resource JSONs.
 
         Args:
             repo_number: The repository number to query
             resources_to_get: List of resource identifiers to retrieve
+            max_workers: Number of worker threads. 1 fetches serially on the calling thread
+            ordered: When concurrent, deliver results in request order rather than as they complete
+            max_in_flight: Most requests submitted but not yet delivered. Defaults to twice max_workers
 
         Returns:
-            dict: Mapping of resource identifier to resource data
+            dict: Mapping of resource identifier to resource data, in delivery order
 
         Raises:
             ValueError: If repo_number is invalid or resources_to_get is empty
@@ -148,37 +517,36 @@ class ConnectionManager(SubjectMixin):
         if not isinstance(resources_to_get, list):
             raise ValueError("resources_to_get must be a list")
 
+        if max_workers < 1:
+            raise ValueError(f"max_workers must be at least 1, not {max_workers}")
+
         logging.info(
             f"Fetching {len(resources_to_get)} resources from repository {repo_number}"
+            + (f" with {max_workers} workers" if max_workers > 1 else "")
         )
 
         resources = {}
         failed_resources = []
 
-        for resource_id in resources_to_get:
-            try:
-                logging.debug(
-                    f"Fetching resource {resource_id} from repository {repo_number}"
-                )
-                resource_data = self.get_resource_record(repo_number, resource_id)
+        if max_workers == 1:
+            fetched = (
+                (resource_id, self._fetch_classified(repo_number, resource_id))
+                for resource_id in resources_to_get
+            )
+        else:
+            fetched = self._fetch_concurrently(
+                repo_number,
+                resources_to_get,
+                max_workers,
+                ordered,
+                max_in_flight or max_workers * 2,
+            )
 
+        for resource_id, (resource_data, failure) in fetched:
+            if failure is not None:
+                failed_resources.append((resource_id, failure))
+            else:
                 resources[resource_id] = resource_data
-                logging.debug(f"Successfully fetched resource {resource_id}")
-
-            except (JSONDecodeError, ConnectionError, NetworkError, ServerError) as e:
-                # These are critical errors - propagate immediately with same type
-                error_msg = f"Critical error fetching resource {resource_id} from repository {repo_number}: {e}"
-                logging.warning(error_msg)
-                raise  # Re-raise the original exception with same type
-            except ValueError as e:
-                error_msg = f"Invalid resource ID {resource_id} in repository {repo_number}: {e}"
-                logging.warning(error_msg)
-                raise
-            except Exception as e:
-                # Unexpected errors - log and continue, but track the failure
-                error_msg = f"Unexpected error fetching resource {resource_id}: {e}"
-                logging.error(error_msg)
-                failed_resources.append((resource_id, f"Unexpected error: {str(e)}"))
 
         # Log summary of results
         success_count = len(resources)
@@ -198,6 +566,93 @@ class ConnectionManager(SubjectMixin):
 
         return resources
 
+    def _fetch_classified(
+        self, repo_number: int, resource_id
+    ) -> tuple[Optional[dict], Optional[str]]:
+        """
+        Fetch one resource, sorting failures the way get_resource_records expects.
+
+        Critical errors (bad JSON, network, server) and invalid IDs are re-raised so the whole fetch aborts. Anything
+        unexpected is logged and returned as a failure message instead, so one odd record doesn't sink the batch.
+
+        Returns:
+            tuple: (resource_data, None) on success, or (None, failure message)
+        """
+        try:
+            logging.debug(
+                f"Fetching resource {resource_id} from repository {repo_number}"
+            )
+            resource_data = self.get_resource_record(repo_number, resource_id)
+            logging.debug(f"Successfully fetched resource {resource_id}")
+            return resource_data, None
+
+        except (JSONDecodeError, ConnectionError, NetworkError, ServerError) as e:
+            # These are critical errors - propagate immediately with same type
+            error_msg = f"Critical error fetching resource {resource_id} from repository {repo_number}: {e}"
+            logging.warning(error_msg)
+            raise  # Re-raise the original exception with same type
+        except ValueError as e:
+            error_msg = f"Invalid resource ID {resource_id} in repository {repo_number}: {e}"
+            logging.warning(error_msg)
+            raise
+        except Exception as e:
+            # Unexpected errors - log and continue, but track the failure
+            error_msg = f"Unexpected error fetching resource {resource_id}: {e}"
+            logging.error(error_msg)
+            return None, f"Unexpected error: {str(e)}"
+
+    def _fetch_concurrently(
+        self,
+        repo_number: int,
+        resources_to_get: list,
+        max_workers: int,
+        ordered: bool,
+        max_in_flight: int,
+    ) -> Iterator[tuple]:
+        """
+        Yield (resource_id, (resource_data, failure)) pairs fetched on a thread pool.
+
+        At most max_in_flight requests are outstanding at once, so memory and server load stay bounded however long
+        resources_to_get is. A critical error cancels everything not yet started and is re-raised to the caller.
+        """
+        if max_in_flight < max_workers:
+            max_in_flight = max_workers
+
+        remaining = iter(resources_to_get)
+        executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="resource-fetch"
+        )
+        in_flight: dict[Future, object] = {}
+        submission_order: deque = deque()
+
+        def submit_next() -> bool:
+            resource_id = next(remaining, _EXHAUSTED)
+            if resource_id is _EXHAUSTED:
+                return False
+            future = executor.submit(self._fetch_classified, repo_number, resource_id)
+            in_flight[future] = resource_id
+            if ordered:
+                submission_order.append(future)
+            return True
+
+        try:
+            while len(in_flight) < max_in_flight and submit_next():
+                pass
+
+            while in_flight:
+                if ordered:
+                    done = [submission_order.popleft()]
+                    wait(done)
+                else:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    resource_id = in_flight.pop(future)
+                    yield resource_id, future.result()
+                    submit_next()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
     def get_resource_record(self, repo_number: int, resource_number: int) -> dict:
         """
         Fetches a specific resource record from a repository using its resource number.
@@ -206,6 +661,20 @@ class ConnectionManager(SubjectMixin):
         :param resource_number: The specific resource number to retrieve.
         :return: A dictionary containing the resource record data or an error message.
         """
+        memo = self.active_memo
+        if memo is not None:
+            remembered = memo.get(repo_number, resource_number)
+            if remembered is not None:
+                return remembered
+
+        if self.record_cache is not None:
+            cached = self.record_cache.get(
+                self.connection.server, repo_number, resource_number
+            )
+            if cached is not None:
+                self._remember(repo_number, resource_number, cached)
+                return cached
+
         try:
             # Query the specific resource record
             response = self.connection.query(
@@ -215,6 +684,16 @@ class ConnectionManager(SubjectMixin):
 
             # Parse the response JSON
             resource_data = response.json()
+            if (
+                isinstance(resource_data, dict)
+                and "uri" in resource_data
+                and "error" not in resource_data
+            ):
+                self._remember(repo_number, resource_number, resource_data)
+                if self.record_cache is not None:
+                    self.record_cache.put(
+                        self.connection.server, repo_number, resource_data
+                    )
             return resource_data
 
         except JSONDecodeError as e:
@@ -241,14 +720,24 @@ class ConnectionManager(SubjectMixin):
         :param resource_record:
         :return:
 
+        The write goes through the connection's rate limiter, and is retried like any other request when the server is
+        throttling. Any cached or memoised copy of the record is dropped before the PUT is sent, since a successful
+        update bumps its lock_version on the server.
+
         TODO: Test, log, add userlogging
         """
+        if self.active_memo is not None:
+            self.active_memo.discard(repo_number, resource_number)
+        if self.record_cache is not None:
+            self.record_cache.invalidate(
+                self.connection.server, repo_number, resource_number
+            )
         try:
             # Construct the URL for the specific resource
             url = f"/repositories/{repo_number}/resources/{resource_number}"
 
-            # Make the PUT request to update the resource - Fixed: use self.connection.client
-            response = self.connection.client.put(url, json=resource_record)
+            # Make the PUT request to update the resource
+            response = self.connection.update(url, resource_record)
 
             # Check if the update was successful based on the response status code
             if (
@@ -268,6 +757,56 @@ class ConnectionManager(SubjectMixin):
             logging.warning(f"An error occurred while updating the resource: {e}")
             return False
 
+    def update_resource_record(
+        self, repo_number: int, resource_number: int, resource_record: dict
+    ) -> dict:
+        """
+        Write an edited resource back to the server, telling a stale lock_version apart from other failures.
+
+        Unlike put_resource_record, which reports success as a bool, this raises, so callers such as BulkUpdater can
+        re-fetch and retry on a conflict. The write goes through the connection's rate limiter. Any cached or
+        memoised copy of the record is dropped first, so the next read of it goes to the server.
+
+        Args:
+            repo_number: The repository holding the resource
+            resource_number: The resource to update
+            resource_record: The complete edited record, carrying the lock_version it was fetched with
+
+        Returns:
+            dict: The server's response, e.g. {"status": "Updated", "id": 5, "lock_version": 3}
+
+        Raises:
+            ConflictError: If the record changed on the server since resource_record was fetched
+            ServerError: If the server rejects the update for any other reason
+            NetworkError: If the server can't be reached
+        """
+        if self.active_memo is not None:
+            self.active_memo.discard(repo_number, resource_number)
+        if self.record_cache is not None:
+            self.record_cache.invalidate(
+                self.connection.server, repo_number, resource_number
+            )
+        url = f"/repositories/{repo_number}/resources/{resource_number}"
+        try:
+            response = self.connection.update(url, resource_record)
+        except (ConnectionError, OSError) as e:
+            raise NetworkError(f"Could not reach the server to update {url}: {e}") from e
+
+        try:
+            body = response.json()
+        except (JSONDecodeError, ValueError):
+            body = None
+        if response.status_code == 200:
+            logging.debug(f"Updated {url}")
+            return body if isinstance(body, dict) else {}
+        if response.status_code == 409 or (
+            response.status_code == 400 and "lock_version" in json.dumps(body)
+        ):
+            raise ConflictError(
+                f"{url} changed on the server since lock_version {resource_record.get('lock_version')}"
+            )
+        raise ServerError(f"Updating {url} failed with status {response.status_code}: {body}")
+
     def get_repositories(self) -> dict:
         return json.loads(
             self.connection.query(HttpRequestType.GET, "repositories").content
@@ -0,0 +1,115 @@
+import logging
+from dataclasses import dataclass, asdict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+@dataclass
+class PoolConfig:
+    """
+    Settings for the HTTP connection pool a Connection keeps open to its ArchivesSpace server.
+
+    pool_connections is how many per-host pools are cached, pool_maxsize is how many keep-alive sockets each host
+    pool may hold, and pool_block makes extra workers wait for a free socket rather than opening throwaway ones.
+    """
+
+    pool_connections: int = 4
+    pool_maxsize: int = 16
+    pool_block: bool = True
+    keep_alive: bool = True
+    max_retries: int = 0
+
+    def __post_init__(self):
+        if self.pool_connections < 1:
+            raise ValueError("pool_connections must be at least 1")
+        if self.pool_maxsize < 1:
+            raise ValueError("pool_maxsize must be at least 1")
+        if self.max_retries < 0:
+            raise ValueError("max_retries cannot be negative")
+
+
+@dataclass
+class PoolStats:
+    """Snapshot of how a pooled session has been using its sockets"""
+
+    hosts: int = 0
+    connections_opened: int = 0
+    requests_sent: int = 0
+    idle_connections: int = 0
+
+    @property
+    def connections_reused(self) -> int:
+        """Requests that rode on an already open socket instead of a new handshake"""
+        return max(self.requests_sent - self.connections_opened, 0)
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["connections_reused"] = self.connections_reused
+        return data
+
+
+def build_session(config: PoolConfig) -> requests.Session:
+    """
+    Build a requests Session with an explicitly sized connection pool mounted for http and https.
+
+    Args:
+        config: Pool sizing and keep-alive settings
+
+    Returns:
+        requests.Session: Session suitable for sharing between an ASnakeClient and worker threads
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=config.pool_connections,
+        pool_maxsize=config.pool_maxsize,
+        pool_block=config.pool_block,
+        max_retries=config.max_retries,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    # These mirror the defaults ASnakeClient puts on the session it would otherwise build for itself
+    session.headers.update(
+        {"Accept": "application/json", "User-Agent": "ArchivesSnake/0.1"}
+    )
+    if not config.keep_alive:
+        session.headers["Connection"] = "close"
+
+    logging.debug(
+        f"Built pooled HTTP session: {config.pool_connections} host pools, "
+        f"{config.pool_maxsize} connections per host"
+    )
+    return session
+
+
+def pool_stats(session: requests.Session) -> PoolStats:
+    """
+    Collect connection reuse figures from every adapter mounted on a session.
+
+    Args:
+        session: A session created by build_session
+
+    Returns:
+        PoolStats: Totals across all host pools currently held by the session
+    """
+    stats = PoolStats()
+    seen_adapters = set()
+    for adapter in session.adapters.values():
+        if id(adapter) in seen_adapters or not isinstance(adapter, HTTPAdapter):
+            continue
+        seen_adapters.add(id(adapter))
+
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats.hosts += 1
+            stats.connections_opened += pool.num_connections
+            stats.requests_sent += pool.num_requests
+            if pool.pool is not None:
+                stats.idle_connections += sum(
+                    1 for conn in list(pool.pool.queue) if conn is not None
+                )
+    return stats
@@ -0,0 +1,127 @@
+import copy
+import json
+from difflib import SequenceMatcher
+from typing import Any
+
+
+def _escape(key: str) -> str:
+    """Escape one object key for a JSON Pointer (RFC 6901)"""
+    return key.replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def _fingerprint(value: Any) -> str:
+    """A hashable stand-in for a JSON value, equal for equal values"""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+def diff(before: Any, after: Any) -> list[dict]:
+    """
+    The structural differences between two JSON documents, as JSON Patch (RFC 6902) add, remove and replace operations
+    that turn before into after when applied in order.
+
+    Objects are compared key by key and lists are aligned on their unchanged items, so adding, dropping or editing one
+    note of a resource yields one small operation at that note's path rather than a rewrite of the notes list. Equal
+    documents give an empty list.
+    """
+    operations: list[dict] = []
+    # Each entry is (path, before, after) for a pair of values still to compare
+    pending = [("", before, after)]
+    while pending:
+        path, old, new = pending.pop()
+        if isinstance(old, dict) and isinstance(new, dict):
+            nested = []
+            for key in old:
+                if key not in new:
+                    operations.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+                elif old[key] is not new[key]:
+                    nested.append((f"{path}/{_escape(key)}", old[key], new[key]))
+            for key in new:
+                if key not in old:
+                    operations.append(
+                        {"op": "add", "path": f"{path}/{_escape(key)}", "value": new[key]}
+                    )
+            pending.extend(reversed(nested))
+        elif isinstance(old, list) and isinstance(new, list):
+            operations.extend(_diff_lists(path, old, new))
+        # Compared by type too, since 1 == True but JSON tells them apart
+        elif type(old) is not type(new) or old != new:
+            operations.append({"op": "replace", "path": path, "value": new})
+    return operations
+
+
+def _diff_lists(path: str, old: list, new: list) -> list[dict]:
+    operations: list[dict] = []
+    matcher = SequenceMatcher(
+        None,
+        [_fingerprint(item) for item in old],
+        [_fingerprint(item) for item in new],
+        autojunk=False,
+    )
+    # Once the operations for earlier blocks are applied, the list reads new[:new_start] + old[old_start:], so each
+    # block starts at new_start in the list being patched
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        if tag == "replace" and old_end - old_start == new_end - new_start:
+            # Edited in place, so describe just the edits within each item
+            for index in range(old_end - old_start):
+                for operation in diff(old[old_start + index], new[new_start + index]):
+                    operation["path"] = f"{path}/{new_start + index}{operation['path']}"
+                    operations.append(operation)
+            continue
+        for _ in range(old_start, old_end):
+            operations.append({"op": "remove", "path": f"{path}/{new_start}"})
+        for index in range(new_start, new_end):
+            operations.append(
+                {"op": "add", "path": f"{path}/{index}", "value": new[index]}
+            )
+    return operations
+
+
+def patch(document: Any, operations: list[dict]) -> Any:
+    """
+    Apply JSON Patch add, remove and replace operations, such as diff produces, to a copy of document.
+
+    Raises:
+        ValueError: If an operation's path doesn't exist in the document, or its op isn't supported
+    """
+    document = copy.deepcopy(document)
+    for operation in operations:
+        op, path = operation.get("op"), operation.get("path", "")
+        if op not in ("add", "remove", "replace"):
+            raise ValueError(f"Unsupported patch operation: {operation}")
+        if path == "":
+            if op == "remove":
+                raise ValueError("Cannot remove the whole document")
+            document = copy.deepcopy(operation["value"])
+            continue
+
+        *parents, last = [_unescape(token) for token in path.split("/")[1:]]
+        target = document
+        try:
+            for token in parents:
+                target = target[int(token)] if isinstance(target, list) else target[token]
+            if isinstance(target, list):
+                index = len(target) if last == "-" else int(last)
+                if op == "add":
+                    if not 0 <= index <= len(target):
+                        raise IndexError(index)
+                    target.insert(index, copy.deepcopy(operation["value"]))
+                elif op == "remove":
+                    del target[index]
+                else:
+                    target[index] = copy.deepcopy(operation["value"])
+            else:
+                if op != "add" and last not in target:
+                    raise KeyError(last)
+                if op == "remove":
+                    del target[last]
+                else:
+                    target[last] = copy.deepcopy(operation["value"])
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            raise ValueError(f"Cannot apply {operation}: no such location ({e})") from e
+    return document
@@ -0,0 +1,204 @@
+import copy
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from model.action_type import ActionType
+from model.note import Note
+from model.note_type import NoteType
+
+from .bulk_updater import Transform
+
+# The type codes ArchivesSpace stores in a note's "type" for each NoteType
+NOTE_TYPE_CODES: dict[NoteType, str] = {
+    NoteType.Abstract: "abstract",
+    NoteType.Accruals: "accruals",
+    NoteType.Appraisal: "appraisal",
+    NoteType.Arrangement: "arrangement",
+    NoteType.Bibliography: "bibliography",
+    NoteType.Biographical_Historical: "bioghist",
+    NoteType.Conditions_Governing_Access: "accessrestrict",
+    NoteType.Conditions_Governing_Use: "userestrict",
+    NoteType.Custodial_History: "custodhist",
+    NoteType.Dimensions: "dimensions",
+    NoteType.Existence_and_Location_of_Copies: "altformavail",
+    NoteType.Existence_and_Location_of_Originals: "originalsloc",
+    NoteType.File_Plan: "fileplan",
+    NoteType.General: "odd",
+    NoteType.Immediate_Source_of_Acquisition: "acqinfo",
+    NoteType.Index: "index",
+    NoteType.Legal_Status: "legalstatus",
+    NoteType.Materials_Specific_Details: "materialspec",
+    NoteType.Other_Finding_Aids: "otherfindaid",
+    NoteType.Physical_Characteristics_and_Technical_Requirements: "phystech",
+    NoteType.Physical_Description: "physdesc",
+    NoteType.Physical_Facet: "physfacet",
+    NoteType.Physical_Location: "physloc",
+    NoteType.Preferred_Citation: "prefercite",
+    NoteType.Processing_Information: "processinfo",
+    NoteType.Related_Materials: "relatedmaterial",
+    NoteType.Scope_and_Contents: "scopecontent",
+    NoteType.Separated_Materials: "separatedmaterial",
+}
+_NOTE_TYPES = {note_type.name.lower(): note_type for note_type in NoteType} | {
+    code: note_type for note_type, code in NOTE_TYPE_CODES.items()
+}
+_ACTION_TYPES = {action_type.name.lower(): action_type for action_type in ActionType}
+
+# The action's name, then flags written -name=value, where the value is a bare word or double quoted
+_FLAG = re.compile(
+    r'\s*-(?P<name>\w+)\s*=\s*(?:"(?P<quoted>(?:[^"\\]|\\.)*)"|(?P<bare>[^\s"]+))',
+    re.DOTALL,
+)
+_ESCAPE = re.compile(r"\\(.)", re.DOTALL)
+_NOTE_ACTIONS = (ActionType.Delete_Note, ActionType.Create_Note, ActionType.Replace_Note)
+
+
+@dataclass
+class NoteAction:
+    """An action parsed from the text after THEN in a .ACMQ file"""
+
+    action_type: ActionType
+    note_type: Optional[NoteType] = None
+    content: Optional[str] = None
+    label: Optional[str] = None
+    publish: bool = False
+
+
+def parse_action(text: str) -> NoteAction:
+    """
+    Parse the action of a .ACMQ file, such as LOG or CREATE_NOTE -type=Scope_and_Contents -publish=true -content="...".
+    An empty action means Log.
+
+    :raises ValueError: If the action or one of its flags is unknown, or a note action is missing its -type or -content
+    """
+    text = text.strip()
+    if not text:
+        return NoteAction(ActionType.Log)
+    name, _, rest = text.partition(" ")
+    action_type = _ACTION_TYPES.get(name.strip().lower())
+    if action_type is None:
+        raise ValueError(f"Unknown action {name!r}")
+    action = NoteAction(action_type)
+
+    position = 0
+    rest = rest.strip()
+    while position < len(rest):
+        match = _FLAG.match(rest, position)
+        if match is None:
+            raise ValueError(f"Expected a -flag=value at {rest[position:]!r}")
+        position = match.end()
+        flag = match.group("name").lower()
+        value = (
+            _ESCAPE.sub(r"\1", match.group("quoted"))
+            if match.group("quoted") is not None
+            else match.group("bare")
+        )
+        if flag == "type":
+            action.note_type = _NOTE_TYPES.get(value.lower())
+            if action.note_type is None:
+                raise ValueError(f"Unknown note type {value!r}")
+        elif flag == "content":
+            action.content = value
+        elif flag == "label":
+            action.label = value
+        elif flag == "publish":
+            if value.lower() not in ("true", "false"):
+                raise ValueError(f"-publish must be true or false, not {value!r}")
+            action.publish = value.lower() == "true"
+        elif flag not in ("part", "subtype"):
+            # -part follows from the note type, and subtypes aren't used in our workflows
+            raise ValueError(f"Unknown flag -{flag}")
+
+    if action_type in _NOTE_ACTIONS and action.note_type is None:
+        raise ValueError(f"{action_type.name} needs a -type")
+    if action_type in (ActionType.Create_Note, ActionType.Replace_Note) and action.content is None:
+        raise ValueError(f"{action_type.name} needs a -content")
+    return action
+
+
+def note_json(action: NoteAction) -> dict:
+    """The ArchivesSpace JSON for the note a Create_Note or Replace_Note action adds"""
+    note = {
+        "type": NOTE_TYPE_CODES[action.note_type],
+        "publish": action.publish,
+    }
+    if action.label:
+        note["label"] = action.label
+    if Note.is_multipart(action.note_type):
+        note["jsonmodel_type"] = "note_multipart"
+        note["subnotes"] = [
+            {
+                "jsonmodel_type": "note_text",
+                "content": action.content,
+                "publish": action.publish,
+            }
+        ]
+    else:
+        note["jsonmodel_type"] = "note_singlepart"
+        note["content"] = [action.content]
+    return note
+
+
+def build_transform(action: NoteAction) -> Optional[Transform]:
+    """
+    The BulkUpdater transform that carries out an action on a resource, or None for Log, which changes nothing.
+
+    Each transform is idempotent: creating a note the record already has, or deleting a note type it doesn't have,
+    leaves the record as it was, so BulkUpdater sees no change and writes nothing.
+
+    :raises ValueError: If the action can't be carried out as a bulk update
+    """
+    if action.action_type == ActionType.Log:
+        return None
+    if action.action_type not in _NOTE_ACTIONS:
+        raise ValueError(f"{action.action_type.name} is not supported yet")
+
+    code = NOTE_TYPE_CODES[action.note_type]
+    new_note = note_json(action) if action.content is not None else None
+
+    def other_notes(record: dict) -> list:
+        return [note for note in record.get("notes", []) if note.get("type") != code]
+
+    if action.action_type == ActionType.Delete_Note:
+
+        def transform(record: dict) -> dict:
+            if "notes" in record:
+                record["notes"] = other_notes(record)
+            return record
+
+    elif action.action_type == ActionType.Create_Note:
+
+        def transform(record: dict) -> dict:
+            notes = record.setdefault("notes", [])
+            if not any(_same_note(note, new_note) for note in notes):
+                notes.append(copy.deepcopy(new_note))
+            return record
+
+    else:
+
+        def transform(record: dict) -> dict:
+            kept = other_notes(record)
+            replaced = [note for note in record.get("notes", []) if note.get("type") == code]
+            if len(replaced) == 1 and _same_note(replaced[0], new_note):
+                return record
+            record["notes"] = kept + [copy.deepcopy(new_note)]
+            return record
+
+    return transform
+
+
+def _note_text(note: dict) -> list:
+    if "subnotes" in note:
+        return [subnote.get("content") for subnote in note["subnotes"]]
+    return list(note.get("content", []))
+
+
+def _same_note(existing: dict, new: dict) -> bool:
+    """Whether an existing note already says what new does, ignoring the ids and metadata the server fills in"""
+    return (
+        existing.get("type") == new["type"]
+        and existing.get("label") == new.get("label")
+        and bool(existing.get("publish")) == new["publish"]
+        and _note_text(existing) == _note_text(new)
+    )
@@ -1,5 +1,18 @@
-from requests import Response
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Optional
 
+from controller.column_store import ColumnStore
+from controller.connection_exceptions import NetworkError, ServerError
+from controller.connection_manager import RetrievalStats
+from controller.query_optimizer import QueryOptimizer, SampleStatistics
+from controller.query_parser import QueryParser
+from controller.query_profiler import QueryProfile, finish, instrument
+from controller.search_pushdown import SearchPushdown
 from model.data_model import DataModel
 from model.node import Node
 from model.note import Note
@@ -8,6 +21,30 @@ from model.query_node import QueryNode
 from model.query_type import QueryType
 from model.resource_field import ResourceField
 
+if TYPE_CHECKING:
+    from requests import Response
+
+# Markers a repository's worker sends in place of a resource id
+_STARTED = object()
+_FINISHED = object()
+_FAILED = object()
+
+
+@dataclass
+class RepositoryProgress:
+    """How far one repository of a QueryManager.run_query_across run has got"""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    FINISHED = "finished"
+    FAILED = "failed"
+
+    repo_number: int
+    state: str = QUEUED
+    examined: int = 0
+    matched: int = 0
+    error: Optional[str] = None
+
 
 def singleton(cls):
     """Decorator to implement singleton pattern."""
@@ -34,14 +71,33 @@ class QueryManager:
 
     def __init__(self):
         self.loaded_query = None
+        self.optimizer = QueryOptimizer()
+        self.pushdown = SearchPushdown()
 
-    def place_query(self, query) -> Response:
+    def place_query(self, query) -> "Response":
         """todo"""
         raise NotImplementedError
 
     def render_query(self, query: Node) -> str:
         return query.to_string()
 
+    def construct_from_string(
+        self,
+        query_string: str,
+        data_model: Optional[DataModel] = None,
+        base_path: Optional[str] = None,
+    ) -> Node:
+        """
+        Parse a query written in the .ACMQ format, the inverse of render_query.
+
+        :param query_string: the query, optionally wrapped as IF {query} THEN
+        :param data_model: passed to every QueryNode built. Defaults to the application's DataModel
+        :param base_path: directory that relative @"file" value lists are read from
+        :return: root of the query tree
+        :raises QueryParseError: If the string is malformed, giving the line and column of the problem
+        """
+        return QueryParser(data_model, base_path).parse(query_string)
+
     def set_loaded_query(self, query: QueryNode):
         self.loaded_query = query
 
@@ -61,8 +117,369 @@ class QueryManager:
     def get_loaded_query(self) -> QueryNode:
         return self.loaded_query
 
+    def evaluate(
+        self,
+        query: Node,
+        records: Iterable[tuple[int, dict]],
+        statistics: Optional[SampleStatistics] = None,
+    ) -> Iterator[tuple[int, dict]]:
+        """
+        Stream the records that match a query.
+
+        The query is optimized and compiled to a single predicate once, up front, and then applied to each record as
+        it arrives, so this pairs with ConnectionManager.iter_resource_records to filter a repository without holding
+        it all.
+
+        :param query: root of the query tree
+        :param records: (resource id, resource JSON) pairs
+        :param statistics: sampled records the optimizer orders clauses by, if any
+        :return: the matching pairs, in input order
+        """
+        predicate = self.optimizer.optimize(query, statistics).compile()
+        for resource_id, record in records:
+            if predicate(record):
+                yield resource_id, record
+
+    def evaluate_columns(
+        self, query: Node, store: ColumnStore
+    ) -> Iterator[tuple[int, dict]]:
+        """
+        Find the records in a ColumnStore that match a query, evaluating every clause over whole columns at once.
+
+        Far faster than evaluate once records are local, e.g. for repeated interactive queries against a repository
+        held in the record cache (see ColumnStore.from_cache).
+
+        :return: the matching (resource id, resource JSON) pairs, in the order the store holds them
+        """
+        return store.matches(self.optimizer.collapse_membership(query))
+
+    def explain(
+        self, query: Node, statistics: Optional[SampleStatistics] = None
+    ) -> str:
+        """The optimized plan for a query, in evaluation order, with the optimizer's cost and selectivity estimates"""
+        return self.optimizer.explain(query, statistics)
+
+    @staticmethod
+    def sync_repository(connection_manager, repo_number: int) -> bool:
+        """
+        Sync a repository into the record cache, if there is one, logging rather than raising should it fail.
+
+        :return: whether the cache now holds a current copy of the repository
+        """
+        if connection_manager.record_cache is None:
+            return False
+        try:
+            connection_manager.sync_repository(repo_number)
+        except (ServerError, NetworkError, OSError, ValueError) as e:
+            logging.warning(
+                f"Could not sync repository {repo_number}, cached records will be used until they expire: {e}"
+            )
+            return False
+        return True
+
+    @staticmethod
+    def repository_statistics(
+        connection_manager, repo_number: int
+    ) -> Optional[SampleStatistics]:
+        """Statistics sampled from a repository's cached records, or None without a cache or any cached records"""
+        cache = connection_manager.record_cache
+        if cache is None:
+            return None
+        statistics = SampleStatistics.from_cache(
+            cache, connection_manager.connection.server, repo_number
+        )
+        return statistics if len(statistics) else None
+
+    def run_query(
+        self,
+        connection_manager,
+        repo_number: int,
+        query: Node,
+        resource_ids: Optional[list[int]] = None,
+        use_search: bool = False,
+        profile: Optional[QueryProfile] = None,
+        retrieval: Optional[RetrievalStats] = None,
+        cancel: Optional[threading.Event] = None,
+        sync: bool = True,
+    ) -> Iterator[tuple[int, dict]]:
+        """
+        Stream the resources of a repository that match a query, fetching each record once.
+
+        With a record cache, the repository is synced first, so records other users have changed or deleted since
+        the last sync are refreshed before anything is read from the cache. Only the first sync downloads the whole
+        repository. Should the sync fail, cached records are still served until they expire.
+
+        Once that sync has succeeded, the record cache holds every resource of the repository, so its secondary indexes
+        narrow the candidates without any further request. Otherwise, with use_search, where part of the query tests indexed fields, that
+        part is first sent to the repository's search endpoint and only the resources it returns are downloaded. The
+        whole query is still evaluated against each downloaded record, so the search only has to narrow the
+        candidates. Should the search fail, the run falls back to scanning the repository.
+
+        Records are streamed in batches and evaluated in place. A per-run record memo is held open for the duration,
+        so anything that still looks a record up by id while the run is in progress is served from memory. With a
+        record cache, clauses are ordered using statistics sampled from the repository's cached records.
+
+        :param connection_manager: the ConnectionManager to fetch through
+        :param repo_number: repository to search
+        :param query: root of the query tree
+        :param resource_ids: restrict the run to these resources. Defaults to the whole repository
+        :param use_search: narrow the candidates through the search index first. Off by default, because the index is
+            updated some time after each change: a record edited since it was last indexed is judged by its old
+            values, and silently left out of the results if those didn't match
+        :param profile: if given, filled in with per-node counts and timings as the run goes. This slows evaluation
+        :param retrieval: if given (and there is no profile, which has its own), counts the records examined as the run
+            goes
+        :param cancel: when set, the run stops before examining its next record
+        :param sync: bring the record cache's copy of the repository up to date first
+        :return: matching (resource id, resource JSON) pairs
+        """
+        started = time.perf_counter()
+        synced = sync and self.sync_repository(connection_manager, repo_number)
+        statistics = self.repository_statistics(connection_manager, repo_number)
+        plan = self.optimizer.optimize(query, statistics)
+        candidates = (
+            self._index_candidates(connection_manager, repo_number, plan, resource_ids, profile)
+            if synced
+            else None
+        )
+        if candidates is not None:
+            resource_ids = candidates
+        elif use_search:
+            resource_ids = self._search_candidates(
+                connection_manager, repo_number, plan, resource_ids, profile
+            )
+
+        if profile is None:
+            predicate = plan.compile()
+        else:
+            pushed = (
+                self.pushdown.pushed_down_nodes(plan)
+                if profile.search_query is not None
+                else set()
+            )
+            predicate, profile.root = instrument(
+                plan,
+                lambda node: id(node) in pushed,
+                lambda node: self.optimizer.estimate(node, statistics),
+            )
+            retrieval = profile.retrieval
+
+        with connection_manager.record_memo():
+            try:
+                for resource_id, record in connection_manager.iter_resource_records(
+                    repo_number, resource_ids, stats=retrieval
+                ):
+                    if cancel is not None and cancel.is_set():
+                        logging.debug(f"Query of repository {repo_number} cancelled")
+                        return
+                    if predicate(record):
+                        if profile is not None:
+                            profile.matched += 1
+                        yield resource_id, record
+            finally:
+                if profile is not None:
+                    finish(profile.root)
+                    profile.seconds = time.perf_counter() - started
+
+    def run_query_across(
+        self,
+        connection_manager,
+        repo_numbers: Iterable[int],
+        query: Node,
+        use_search: bool = False,
+        ordered: bool = True,
+        max_workers: Optional[int] = None,
+        on_progress: Optional[Callable[[RepositoryProgress], None]] = None,
+        progress_interval: float = 0.2,
+    ) -> Iterator[tuple[int, int, dict]]:
+        """
+        Run a query over several repositories at once, merging their matches into one stream.
+
+        Each repository is synced and streamed by run_query on its own worker thread, so an institution-wide audit
+        takes about as long as its largest repository rather than the sum of them all. The workers share the connection, and with
+        it the connection's rate limiter, so together they never press the server harder than one caller would.
+
+        Progress and matches are handed back to the calling thread, which is the only one that calls on_progress or
+        sees results, so both are safe to pass straight to the UI. A repository whose run fails is reported as failed
+        (and logged) while the others carry on. Closing the stream early stops every worker before its next record.
+
+        :param connection_manager: the ConnectionManager to fetch through
+        :param repo_numbers: repositories to search. Duplicates are searched once
+        :param query: root of the query tree
+        :param use_search: as for run_query
+        :param ordered: deliver every match of one repository before any of the next, in the order repo_numbers gives
+            them. The first unfinished repository streams as it goes while later ones are held back. When False,
+            matches are delivered as soon as they are found
+        :param max_workers: most repositories searched at once. Defaults to all of them
+        :param on_progress: called with a repository's RepositoryProgress whenever it changes
+        :param progress_interval: most seconds between progress checks while no matches are arriving
+        :return: matching (repository number, resource id, resource JSON) triples
+        """
+        repo_numbers = list(dict.fromkeys(repo_numbers))
+        if not repo_numbers:
+            return
+        progress = {repo: RepositoryProgress(repo) for repo in repo_numbers}
+        retrievals = {repo: RetrievalStats() for repo in repo_numbers}
+        reported: dict[int, tuple] = {}
+        held_back: dict[int, list] = {repo: [] for repo in repo_numbers}
+        results: queue.Queue = queue.Queue()
+        cancel = threading.Event()
 
+        def search(repo: int) -> None:
+            results.put((repo, _STARTED, None))
+            try:
+                for resource_id, record in self.run_query(
+                    connection_manager,
+                    repo,
+                    query,
+                    use_search=use_search,
+                    retrieval=retrievals[repo],
+                    cancel=cancel,
+                ):
+                    results.put((repo, resource_id, record))
+            except Exception as e:
+                results.put((repo, _FAILED, e))
+            else:
+                results.put((repo, _FINISHED, None))
 
+        def report() -> None:
+            for repo, entry in progress.items():
+                entry.examined = retrievals[repo].from_cache + retrievals[repo].fetched
+                snapshot = (entry.state, entry.examined, entry.matched)
+                if reported.get(repo) != snapshot:
+                    reported[repo] = snapshot
+                    if on_progress is not None:
+                        on_progress(entry)
+
+        executor = ThreadPoolExecutor(
+            max_workers=max_workers or len(repo_numbers),
+            thread_name_prefix="repository-query",
+        )
+        # Opened here, so every worker's run shares this memo rather than racing to open its own
+        with connection_manager.record_memo():
+            try:
+                for repo in repo_numbers:
+                    executor.submit(search, repo)
+                head = 0
+                unfinished = len(repo_numbers)
+                while unfinished:
+                    try:
+                        repo, resource_id, record = results.get(timeout=progress_interval)
+                    except queue.Empty:
+                        report()
+                        continue
+
+                    entry = progress[repo]
+                    if resource_id is _STARTED:
+                        entry.state = RepositoryProgress.RUNNING
+                    elif resource_id is _FINISHED:
+                        entry.state = RepositoryProgress.FINISHED
+                        unfinished -= 1
+                    elif resource_id is _FAILED:
+                        entry.state = RepositoryProgress.FAILED
+                        entry.error = str(record)
+                        unfinished -= 1
+                        logging.warning(f"Query of repository {repo} failed: {record}")
+                    else:
+                        entry.matched += 1
+                        if not ordered or repo == repo_numbers[head]:
+                            yield repo, resource_id, record
+                        else:
+                            held_back[repo].append((resource_id, record))
+
+                    # Once the repository being streamed is done, release whatever the next ones have found
+                    while ordered and head < len(repo_numbers) and progress[
+                        repo_numbers[head]
+                    ].state in (RepositoryProgress.FINISHED, RepositoryProgress.FAILED):
+                        head += 1
+                        if head < len(repo_numbers):
+                            next_repo = repo_numbers[head]
+                            for resource_id, record in held_back.pop(next_repo):
+                                yield next_repo, resource_id, record
+                    report()
+            finally:
+                cancel.set()
+                executor.shutdown(wait=True, cancel_futures=True)
+
+    def profile_query(
+        self,
+        connection_manager,
+        repo_number: int,
+        query: Node,
+        resource_ids: Optional[list[int]] = None,
+        use_search: bool = False,
+    ) -> QueryProfile:
+        """
+        Run a query to completion only to see where its time goes.
+
+        :return: the profile, whose render() prints the plan as a tree and to_json() exports it
+        """
+        profile = QueryProfile()
+        for _ in self.run_query(
+            connection_manager, repo_number, query, resource_ids, use_search, profile
+        ):
+            pass
+        return profile
+
+    @staticmethod
+    def _index_candidates(
+        connection_manager,
+        repo_number: int,
+        query: Node,
+        resource_ids: Optional[list[int]],
+        profile: Optional[QueryProfile] = None,
+    ) -> Optional[list[int]]:
+        """
+        The resource ids the record cache's indexes say are worth evaluating for query, or None if they can't say.
+
+        The indexes only cover what is cached, and a resource created since the last sync isn't, so callers must only
+        ask straight after syncing the repository.
+        """
+        record_cache = connection_manager.record_cache
+        if record_cache is None:
+            return None
+        server = connection_manager.connection.server
+        candidate_set = record_cache.index(server, repo_number).candidates(query)
+        if candidate_set is None:
+            return None
+        if resource_ids is None:
+            candidates = sorted(candidate_set)
+        else:
+            candidates = [
+                resource_id for resource_id in resource_ids if resource_id in candidate_set
+            ]
+        if profile is not None:
+            profile.index_candidates = len(candidates)
+        logging.debug(f"Cached indexes narrowed the run to {len(candidates)} resources")
+        return candidates
+
+    def _search_candidates(
+        self,
+        connection_manager,
+        repo_number: int,
+        query: Node,
+        resource_ids: Optional[list[int]],
+        profile: Optional[QueryProfile] = None,
+    ) -> Optional[list[int]]:
+        """The resource ids worth downloading for query, or resource_ids unchanged if nothing could be pushed down"""
+        solr_query = self.pushdown.translate(query)
+        if solr_query is None:
+            return resource_ids
+        try:
+            candidates = connection_manager.search_resource_ids(repo_number, solr_query)
+        except ServerError as e:
+            logging.warning(f"Search pushdown failed, scanning the repository instead: {e}")
+            return resource_ids
+        if resource_ids is not None:
+            candidate_set = set(candidates)
+            candidates = [
+                resource_id for resource_id in resource_ids if resource_id in candidate_set
+            ]
+        if profile is not None:
+            profile.search_query = solr_query
+            profile.search_candidates = len(candidates)
+        logging.debug(f"Search pushdown narrowed the run to {len(candidates)} resources")
+        return candidates
 
     def construct_query_segment(self,resource_field:ResourceField,query_type:QueryType, data:str):
         dm = DataModel()
@@ -0,0 +1,330 @@
+import logging
+import random
+from typing import Iterable, Optional
+
+from model.field import Field
+from model.field_path import field_path
+from model.node import Node
+from model.operator_node import OperatorNode
+from model.operator_type import OperatorType
+from model.query_node import QueryNode, _as_text
+from model.query_type import QueryType
+from model.resource_field import ResourceField
+
+# Relative cost of one comparison of each type against a short string
+QUERY_TYPE_COSTS: dict[QueryType, float] = {
+    QueryType.Empty: 0.5,
+    QueryType.Not_Empty: 0.5,
+    QueryType.Equals: 1.0,
+    QueryType.Not_Equals: 1.0,
+    QueryType.In: 1.0,
+    QueryType.Not_In: 1.0,
+    QueryType.Starts_With: 1.5,
+    QueryType.Not_Starts_With: 1.5,
+    QueryType.Ends_With: 1.5,
+    QueryType.Not_Ends_With: 1.5,
+    QueryType.Contains: 3.0,
+    QueryType.Not_Contains: 3.0,
+}
+
+# Fraction of records each comparison type is assumed to pass when there are no statistics to go on
+QUERY_TYPE_SELECTIVITY: dict[QueryType, float] = {
+    QueryType.Empty: 0.2,
+    QueryType.Not_Empty: 0.8,
+    QueryType.Equals: 0.1,
+    QueryType.Not_Equals: 0.9,
+    QueryType.In: 0.2,
+    QueryType.Not_In: 0.8,
+    QueryType.Starts_With: 0.2,
+    QueryType.Not_Starts_With: 0.8,
+    QueryType.Ends_With: 0.2,
+    QueryType.Not_Ends_With: 0.8,
+    QueryType.Contains: 0.3,
+    QueryType.Not_Contains: 0.7,
+}
+
+# Fields holding lists of subrecords are compared as their whole text, so they cost far more than a scalar field
+STRUCTURED_FIELD_COSTS: dict[Field, float] = {
+    ResourceField.notes: 50.0,
+    ResourceField.instances: 20.0,
+    ResourceField.dates: 10.0,
+    ResourceField.extents: 10.0,
+    ResourceField.lang_materials: 10.0,
+    ResourceField.revision_statements: 5.0,
+    ResourceField.related_accessions: 5.0,
+    ResourceField.deaccessions: 5.0,
+    ResourceField.classifications: 5.0,
+    ResourceField.collection_management: 5.0,
+    ResourceField.user_defined: 5.0,
+    ResourceField.metadata_rights_declarations: 5.0,
+    ResourceField.tree: 2.0,
+}
+
+# Characters of field text that cost about as much to scan as one short comparison
+_CHARACTERS_PER_COST_UNIT = 64
+
+
+class SampleStatistics:
+    """
+    Cost and selectivity estimates measured on a sample of real records, e.g. drawn from the record cache.
+
+    A leaf's selectivity is the fraction of the sample it passes, and a field's cost grows with the average length of
+    its text in the sample. Both are worked out once per leaf or field and remembered.
+    """
+
+    def __init__(self, records: Iterable[dict], max_sample: int = 500):
+        self.sample = list(records)
+        if len(self.sample) > max_sample:
+            self.sample = random.sample(self.sample, max_sample)
+        self._field_costs: dict = {}
+        self._selectivities: dict = {}
+
+    @classmethod
+    def from_cache(
+        cls, record_cache, server: str, repo: int, max_sample: int = 500
+    ) -> "SampleStatistics":
+        """Sample up to max_sample of the records cached for a repository"""
+        return cls(record_cache.sample(server, repo, max_sample), max_sample)
+
+    def __len__(self) -> int:
+        return len(self.sample)
+
+    def field_cost(self, field: Field) -> float:
+        if field not in self._field_costs:
+            get = field_path(field).get
+            total = sum(len(_as_text(get(record))) for record in self.sample)
+            self._field_costs[field] = 1.0 + total / (
+                len(self.sample) * _CHARACTERS_PER_COST_UNIT
+            )
+        return self._field_costs[field]
+
+    def selectivity(self, leaf: QueryNode) -> float:
+        key = (leaf.compare_field, leaf.query_type, leaf.compare_data)
+        if key not in self._selectivities:
+            predicate = leaf.compile()
+            passed = sum(1 for record in self.sample if predicate(record))
+            # Smoothed so a leaf no sampled record passes still ranks by cost rather than being treated as certain
+            self._selectivities[key] = (passed + 0.5) / (len(self.sample) + 1)
+        return self._selectivities[key]
+
+
+class QueryOptimizer:
+    """
+    Rewrites query trees into cheaper equivalents before they are compiled. The user's tree is never modified: passes
+    build new operator nodes and share the leaves they leave alone.
+
+    collapse_membership turns exception lists into set lookups: an AND of Not_Equals (or NOT Equals) leaves on one
+    field becomes a single Not_In leaf, and an OR of Equals leaves on one field becomes a single In leaf. "All finding
+    aids except these 40 identifiers" then costs one hash lookup per record instead of 40 string compares.
+
+    reorder_by_cost sorts the children of every AND and OR so the evaluation short-circuits as early and as cheaply
+    as possible. Each node gets an estimated cost per record and selectivity (the fraction of records it passes),
+    from SampleStatistics when given and from the fixed tables above otherwise. AND children are ordered by cost over
+    chance of failing, OR children by cost over chance of passing, which minimises the expected cost of the loop.
+    """
+
+    def __init__(
+        self, min_members: int = 2, statistics: Optional[SampleStatistics] = None
+    ):
+        # Below this many leaves on a field, a set gains nothing over comparing directly
+        self.min_members = min_members
+        self.statistics = statistics
+
+    def optimize(
+        self, query: Node, statistics: Optional[SampleStatistics] = None
+    ) -> Node:
+        """
+        :param query: root of the query tree
+        :param statistics: sampled records to estimate with. Defaults to the optimizer's own, if it has any
+        :return: an equivalent tree, cheaper to evaluate
+        """
+        return self.reorder_by_cost(self.collapse_membership(query), statistics)
+
+    def explain(
+        self, query: Node, statistics: Optional[SampleStatistics] = None
+    ) -> str:
+        """
+        Describe the plan optimize would choose: the optimized tree, one node per line in evaluation order, with each
+        node's estimated cost per record and selectivity.
+        """
+        plan = self.optimize(query, statistics)
+        statistics = statistics or self.statistics
+        lines = []
+        self._explain(plan, statistics, 0, lines)
+        return "\n".join(lines)
+
+    def _explain(
+        self,
+        node: Node,
+        statistics: Optional[SampleStatistics],
+        depth: int,
+        lines: list,
+    ) -> None:
+        cost, selectivity = self.estimate(node, statistics)
+        label = node.operator.name if isinstance(node, OperatorNode) else node.to_string()
+        lines.append(
+            f"{'  ' * depth}{label}  (cost={cost:.2f}, selectivity={selectivity:.3f})"
+        )
+        if isinstance(node, OperatorNode):
+            for child in node.children:
+                self._explain(child, statistics, depth + 1, lines)
+
+    def reorder_by_cost(
+        self, node: Node, statistics: Optional[SampleStatistics] = None
+    ) -> Node:
+        if not isinstance(node, OperatorNode):
+            return node
+        statistics = statistics or self.statistics
+
+        if node.operator == OperatorType.NOT:
+            return OperatorNode(
+                node.operator, [self.reorder_by_cost(node.children[0], statistics)]
+            )
+
+        # Nested same-operator groups are flattened first, so their members compete for position individually
+        children = [
+            self.reorder_by_cost(child, statistics)
+            for child in node._flattened_children(node.operator)
+        ]
+        estimates = {id(child): self.estimate(child, statistics) for child in children}
+        passing = node.operator == OperatorType.OR
+        # sorted is stable, so equally ranked children keep the order the user wrote them in
+        return OperatorNode(
+            node.operator,
+            sorted(
+                children, key=lambda child: self._rank(*estimates[id(child)], passing)
+            ),
+        )
+
+    @staticmethod
+    def _rank(cost: float, selectivity: float, passing: bool) -> float:
+        """Cost paid per record the child settles the loop for: by passing it under OR, by failing it under AND"""
+        settles = selectivity if passing else 1.0 - selectivity
+        return cost / max(settles, 1e-9)
+
+    def estimate(
+        self, node: Node, statistics: Optional[SampleStatistics] = None
+    ) -> tuple[float, float]:
+        """
+        Estimate a node's expected cost per record and its selectivity, taking its children in their current order.
+        Children are assumed independent of each other.
+        """
+        statistics = statistics or self.statistics
+        if isinstance(node, QueryNode):
+            return self._estimate_leaf(node, statistics)
+        if not isinstance(node, OperatorNode):
+            return 1.0, 0.5
+
+        if node.operator == OperatorType.NOT:
+            cost, selectivity = self.estimate(node.children[0], statistics)
+            return cost, 1.0 - selectivity
+
+        total_cost = 0.0
+        # Chance that evaluation gets as far as the next child
+        reached = 1.0
+        for child in node._flattened_children(node.operator):
+            cost, selectivity = self.estimate(child, statistics)
+            total_cost += reached * cost
+            reached *= selectivity if node.operator == OperatorType.AND else 1.0 - selectivity
+        if node.operator == OperatorType.AND:
+            return total_cost, reached
+        return total_cost, 1.0 - reached
+
+    @staticmethod
+    def _estimate_leaf(
+        leaf: QueryNode, statistics: Optional[SampleStatistics]
+    ) -> tuple[float, float]:
+        type_cost = QUERY_TYPE_COSTS.get(leaf.query_type, 1.0)
+        # Statistics can only be gathered for leaves that compile; anything else falls back to the tables
+        if statistics is not None and len(statistics) and leaf.validate():
+            return (
+                type_cost * statistics.field_cost(leaf.compare_field),
+                statistics.selectivity(leaf),
+            )
+        return (
+            type_cost * STRUCTURED_FIELD_COSTS.get(leaf.compare_field, 1.0),
+            QUERY_TYPE_SELECTIVITY.get(leaf.query_type, 0.5),
+        )
+
+    def collapse_membership(self, node: Node) -> Node:
+        if not isinstance(node, OperatorNode):
+            return node
+
+        children = [self.collapse_membership(child) for child in node.children]
+        if node.operator == OperatorType.NOT:
+            return OperatorNode(node.operator, children)
+
+        if node.operator == OperatorType.AND:
+            scalar_type, set_type = QueryType.Not_Equals, QueryType.Not_In
+        else:
+            scalar_type, set_type = QueryType.Equals, QueryType.In
+
+        groups: dict = {}
+        for child in children:
+            leaf = self._membership_leaf(child, scalar_type, set_type)
+            if leaf is not None:
+                groups.setdefault(leaf.compare_field, []).append(child)
+
+        collapsible = {
+            field: members
+            for field, members in groups.items()
+            if len(members) >= self.min_members
+        }
+        if not collapsible:
+            return OperatorNode(node.operator, children)
+
+        rewritten = []
+        merged_fields = set()
+        for child in children:
+            leaf = self._membership_leaf(child, scalar_type, set_type)
+            if leaf is None or leaf.compare_field not in collapsible:
+                rewritten.append(child)
+            elif leaf.compare_field not in merged_fields:
+                # The set leaf goes where the field's first member was; later members are folded into it
+                merged_fields.add(leaf.compare_field)
+                rewritten.append(
+                    self._merge(collapsible[leaf.compare_field], scalar_type, set_type)
+                )
+
+        logging.debug(
+            f"Collapsed {len(children) - len(rewritten)} {node.operator.name} children into set lookups"
+        )
+        if len(rewritten) == 1:
+            return rewritten[0]
+        return OperatorNode(node.operator, rewritten)
+
+    @staticmethod
+    def _membership_leaf(
+        node: Node, scalar_type: QueryType, set_type: QueryType
+    ) -> Optional[QueryNode]:
+        """The leaf node carrying the field and values if node is a candidate for collapsing, else None"""
+        if isinstance(node, QueryNode) and node.query_type in (scalar_type, set_type):
+            return node if node.compare_data else None
+        # NOT Equals, as written in the documented exception-list example, is the same test as Not_Equals
+        if (
+            scalar_type == QueryType.Not_Equals
+            and isinstance(node, OperatorNode)
+            and node.operator == OperatorType.NOT
+            and len(node.children) == 1
+            and isinstance(node.children[0], QueryNode)
+            and node.children[0].query_type == QueryType.Equals
+            and node.children[0].compare_data
+        ):
+            return node.children[0]
+        return None
+
+    def _merge(
+        self, members: list, scalar_type: QueryType, set_type: QueryType
+    ) -> QueryNode:
+        values = set()
+        first_leaf = None
+        for member in members:
+            leaf = self._membership_leaf(member, scalar_type, set_type)
+            first_leaf = first_leaf or leaf
+            if leaf.query_type == set_type:
+                values.update(leaf.compare_data)
+            else:
+                values.add(leaf.compare_data)
+        return QueryNode(
+            first_leaf.data_model, first_leaf.compare_field, set_type, values
+        )
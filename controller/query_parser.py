@@ -0,0 +1,374 @@
+import re
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+from model.data_model import DataModel
+from model.field_path import FieldPath
+from model.node import Node
+from model.operator_node import OperatorNode
+from model.operator_type import OperatorType
+from model.query_node import (
+    NO_DATA_QUERY_TYPES,
+    SET_QUERY_TYPES,
+    QueryNode,
+    load_value_list,
+)
+from model.query_type import QueryType
+from model.resource_field import ResourceField
+
+# One alternative per token kind, each skipping the whitespace before it; the name of the group that matched is the
+# kind. A whole leaf with a quoted value is matched as one clause token, since that is what most of a query consists of
+_TOKEN = re.compile(
+    r"""
+    \s*(?:
+    (?P<open_brace>\{)
+    |(?P<close_brace>\})
+    |(?P<open_bracket>\[)
+    |(?P<close_bracket>\])
+    |(?P<comma>,)
+    |\$(?P<operator>\w+)
+    |(?P<clause>
+        %(?P<clause_field>\w+(?:\.\w+|\[(?:\*|-?\d+)\])*)\s*
+        &(?P<clause_type>\w+)
+        (?:\s*"(?P<clause_value>(?:[^"\\]|\\.)*)")?
+    )
+    |%(?P<field>\w+(?:\.\w+|\[(?:\*|-?\d+)\])*)
+    |&(?P<query_type>\w+)
+    |@"(?P<file>(?:[^"\\]|\\.)*)"
+    |"(?P<string>(?:[^"\\]|\\.)*)"
+    |(?P<word>[A-Za-z_]\w*)
+    |(?P<end>\Z)
+    )
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+# Characters before the captured value of each token kind, so positions point at the token's first character
+_SIGIL_LENGTHS = {"operator": 1, "field": 1, "query_type": 1, "file": 2, "string": 1}
+_ESCAPE = re.compile(r"\\(.)", re.DOTALL)
+
+_OPERATORS = {operator.name.lower(): operator for operator in OperatorType}
+_FIELDS = {field.name.lower(): field for field in ResourceField}
+_QUERY_TYPES = {query_type.name.lower(): query_type for query_type in QueryType}
+
+
+def _location(text: str, position: int) -> str:
+    line = text.count("\n", 0, position) + 1
+    column = position - text.rfind("\n", 0, position)
+    return f"line {line}, column {column}"
+
+
+def _unescape(text: str) -> str:
+    return _ESCAPE.sub(r"\1", text) if "\\" in text else text
+
+
+class QueryParseError(ValueError):
+    """Raised when a .ACMQ query string is malformed. Carries where in the text the problem was found."""
+
+    def __init__(self, message: str, text: str, position: int):
+        self.position = position
+        self.line = text.count("\n", 0, position) + 1
+        self.column = position - text.rfind("\n", 0, position)
+        super().__init__(f"{message} at {_location(text, position)}")
+
+
+class QueryParser:
+    """
+    Parses the .ACMQ format described in docs/QueryFormat.md into a tree of QueryNodes and OperatorNodes.
+
+    The text is tokenized lazily in a single pass, and the tree is built with an explicit stack rather than by
+    recursion, so neither the size nor the nesting depth of a query is limited by Python's recursion limit.
+
+    A clause is a leaf, %field &QueryType followed by a quoted value, a [list] of quoted values or an @"file" of values
+    depending on the query type; an operator, $AND, $OR or $NOT followed by each of its clauses in braces; or any
+    clause wrapped in braces. A whole query may be written as IF {clause} THEN action, in which case everything after
+    THEN is handed back untouched as the action.
+    """
+
+    def __init__(
+        self,
+        data_model: Optional[DataModel] = None,
+        base_path: Optional[Union[str, Path]] = None,
+    ):
+        """
+        :param data_model: passed to every QueryNode built. Defaults to the application's DataModel
+        :param base_path: directory that relative @"file" paths are resolved against, e.g. that of the query file.
+            Defaults to the working directory
+        """
+        self.data_model = data_model if data_model is not None else DataModel()
+        self.base_path = Path(base_path) if base_path is not None else None
+
+    def parse(self, text: str) -> Node:
+        """
+        Parse a query with no action.
+
+        :raises QueryParseError: If the text is not a single well-formed query, or has an action after THEN
+        """
+        query, action = self.parse_document(text)
+        if action:
+            raise QueryParseError(
+                "Unexpected action after THEN", text, text.rindex(action)
+            )
+        return query
+
+    def parse_document(self, text: str) -> tuple[Node, str]:
+        """
+        Parse a query that may be followed by THEN and an action.
+
+        :return: the query tree, and the text after THEN, stripped, which is empty if there was none
+        :raises QueryParseError: If the query part is malformed
+        """
+        tokens = self._tokenize(text)
+        kind, value, position = next(tokens)
+        if kind == "word" and value.upper() == "IF":
+            kind, value, position = next(tokens)
+
+        query, (kind, value, position) = self._parse_clause(text, tokens, kind, value, position)
+
+        if kind == "word" and value.upper() == "THEN":
+            return query, text[position + len(value) :].strip()
+        if kind != "end":
+            raise QueryParseError(f"Unexpected {self._describe(kind, value)}", text, position)
+        return query, ""
+
+    @staticmethod
+    def _tokenize(text: str) -> Iterator[tuple[str, object, int]]:
+        """
+        Yield (kind, value, position) for each token, then ("end", "", len(text)) forever.
+
+        The value of a clause token is its match, so the field, query type and quoted value can be read from it.
+        """
+        position = 0
+        match = _TOKEN.match
+        while True:
+            token = match(text, position)
+            if token is None:
+                position += len(text[position:]) - len(text[position:].lstrip())
+                if text[position] == '"' or text.startswith('@"', position):
+                    raise QueryParseError("Unterminated string", text, position)
+                raise QueryParseError(
+                    f"Unexpected character {text[position]!r}", text, position
+                )
+            kind = token.lastgroup
+            if kind == "end":
+                break
+            if kind == "clause":
+                yield kind, token, token.start(kind)
+            else:
+                yield kind, token.group(kind), token.start(kind) - _SIGIL_LENGTHS.get(kind, 0)
+            position = token.end()
+        while True:
+            yield "end", "", len(text)
+
+    def _parse_clause(self, text: str, tokens, kind: str, value: str, position: int):
+        """
+        Parse one clause starting at the given token.
+
+        :return: the clause's node, and the first token after it
+        """
+        # Each entry is either [position] for an open brace, or [position, operator, children] for an operator whose
+        # children are still being read
+        stack: list = []
+        while True:
+            # Descend until a leaf is reached
+            if kind == "open_brace":
+                stack.append([position])
+                kind, value, position = next(tokens)
+                continue
+            if kind == "operator":
+                operator = _OPERATORS.get(value.lower())
+                if operator is None:
+                    raise QueryParseError(f"Unknown operator ${value}", text, position)
+                stack.append([position, operator, []])
+                kind, value, position = next(tokens)
+                if kind != "open_brace":
+                    raise QueryParseError(
+                        f"Expected {{ after ${operator.name}", text, position
+                    )
+                continue
+            if kind == "clause":
+                node, (kind, value, position) = self._parse_clause_token(
+                    text, tokens, value
+                )
+            elif kind == "field":
+                node, (kind, value, position) = self._parse_leaf(
+                    text, tokens, value, position
+                )
+            else:
+                raise QueryParseError(
+                    f"Expected a clause but found {self._describe(kind, value)}",
+                    text,
+                    position,
+                )
+
+            # Climb back up, closing braces and finishing operators, until another child is due or the clause ends
+            while stack:
+                top = stack[-1]
+                if len(top) == 3:
+                    top[2].append(node)
+                    if kind == "open_brace":
+                        break
+                    stack.pop()
+                    node = self._build_operator(text, *top)
+                    continue
+                if kind != "close_brace":
+                    raise QueryParseError(
+                        f"Expected }} to close the {{ at {_location(text, top[0])}, "
+                        f"but found {self._describe(kind, value)}",
+                        text,
+                        position,
+                    )
+                stack.pop()
+                kind, value, position = next(tokens)
+                if stack and len(stack[-1]) == 3:
+                    # This brace held one child of the operator below it
+                    continue
+            else:
+                return node, (kind, value, position)
+
+            # The operator on top of the stack has another child
+            stack.append([position])
+            kind, value, position = next(tokens)
+
+    @staticmethod
+    def _build_operator(
+        text: str, position: int, operator: OperatorType, children: list
+    ) -> OperatorNode:
+        if operator == OperatorType.NOT and len(children) != 1:
+            raise QueryParseError("$NOT takes exactly one clause", text, position)
+        if operator != OperatorType.NOT and len(children) < 2:
+            raise QueryParseError(
+                f"${operator.name} needs at least two clauses", text, position
+            )
+        return OperatorNode(operator, children)
+
+    def _parse_clause_token(self, text: str, tokens, token: re.Match):
+        """Build the leaf for a clause token, reading on for its values if they aren't a single quoted string"""
+        field_name, type_name, value = token.group(
+            "clause_field", "clause_type", "clause_value"
+        )
+        field = _FIELDS.get(field_name.lower())
+        if field is None:
+            field = self._field(text, field_name, token.start("clause"))
+        query_type = _QUERY_TYPES.get(type_name.lower())
+        if query_type is None:
+            query_type = self._query_type(
+                text, type_name, token.start("clause_type") - 1
+            )
+        if value is None:
+            return self._parse_leaf_data(text, tokens, field, query_type)
+
+        if query_type in NO_DATA_QUERY_TYPES:
+            raise QueryParseError(
+                f"{query_type.name} does not take a value",
+                text,
+                token.start("clause_value") - 1,
+            )
+        if "\\" in value:
+            value = _unescape(value)
+        return QueryNode(self.data_model, field, query_type, value), next(tokens)
+
+    def _parse_leaf(self, text: str, tokens, field_name: str, field_position: int):
+        """Parse a leaf whose field and query type weren't matched together, which is only ever the case in error"""
+        field = self._field(text, field_name, field_position)
+        kind, value, position = next(tokens)
+        if kind != "query_type":
+            raise QueryParseError(
+                f"Expected a &QueryType after %{field.name}", text, position
+            )
+        query_type = self._query_type(text, value, position)
+        return self._parse_leaf_data(text, tokens, field, query_type)
+
+    @staticmethod
+    def _field(text: str, name: str, position: int) -> Union[ResourceField, FieldPath]:
+        """A ResourceField, or a FieldPath into a nested value of one, like %dates[*].expression"""
+        field = _FIELDS.get(name.lower())
+        if field is not None:
+            return field
+        # The token pattern only matches well-formed paths, so this can't fail
+        path = FieldPath(name)
+        if len(path.steps) == 1 or path.root.lower() not in _FIELDS:
+            raise QueryParseError(f"Unknown field %{name}", text, position)
+        # Field names are case-insensitive, but record keys aren't, so the path must start from the field's own name
+        canonical = _FIELDS[path.root.lower()].name
+        if canonical != path.root:
+            path = FieldPath(canonical + name[len(path.root) :])
+        return path
+
+    @staticmethod
+    def _query_type(text: str, name: str, position: int) -> QueryType:
+        query_type = _QUERY_TYPES.get(name.lower())
+        if query_type is None:
+            raise QueryParseError(f"Unknown query type &{name}", text, position)
+        return query_type
+
+    def _parse_leaf_data(self, text: str, tokens, field, query_type: QueryType):
+        """Read whatever follows a leaf's query type, and build the leaf"""
+        kind, value, position = next(tokens)
+        if query_type in NO_DATA_QUERY_TYPES:
+            if kind in ("string", "open_bracket", "file"):
+                raise QueryParseError(
+                    f"{query_type.name} does not take a value", text, position
+                )
+            return QueryNode(self.data_model, field, query_type), (kind, value, position)
+
+        if query_type in SET_QUERY_TYPES:
+            if kind == "file":
+                node = self._load_value_file(text, field, query_type, _unescape(value), position)
+                return node, next(tokens)
+            if kind == "open_bracket":
+                values, after = self._parse_list(text, tokens, query_type, position)
+                return QueryNode(self.data_model, field, query_type, values), after
+            if kind != "string":
+                raise QueryParseError(
+                    f"{query_type.name} needs a quoted value, a [list] or an @\"file\"",
+                    text,
+                    position,
+                )
+        elif kind != "string":
+            raise QueryParseError(
+                f"{query_type.name} needs a quoted value", text, position
+            )
+        return (
+            QueryNode(self.data_model, field, query_type, _unescape(value)),
+            next(tokens),
+        )
+
+    def _parse_list(self, text: str, tokens, query_type: QueryType, open_position: int):
+        """Read the values of a [list] up to its closing bracket. An empty list is refused, since nothing is In it"""
+        values = []
+        kind, value, position = next(tokens)
+        if kind == "close_bracket":
+            raise QueryParseError(
+                f"{query_type.name} needs at least one value in its list", text, open_position
+            )
+        while True:
+            if kind != "string":
+                raise QueryParseError("Expected a quoted value in list", text, position)
+            values.append(_unescape(value))
+            kind, value, position = next(tokens)
+            if kind == "close_bracket":
+                return values, next(tokens)
+            if kind != "comma":
+                raise QueryParseError("Expected , or ] in list", text, position)
+            kind, value, position = next(tokens)
+
+    def _load_value_file(
+        self, text: str, field, query_type: QueryType, path: str, position: int
+    ) -> QueryNode:
+        resolved = Path(path)
+        if self.base_path is not None and not resolved.is_absolute():
+            resolved = self.base_path / resolved
+        try:
+            values = load_value_list(resolved)
+        except OSError as e:
+            raise QueryParseError(
+                f"Could not read value file {path}: {e.strerror}", text, position
+            ) from e
+        # Keep the path as written, so the query saves back the way it was loaded
+        return QueryNode(self.data_model, field, query_type, values, source_path=path)
+
+    @staticmethod
+    def _describe(kind: str, value: str) -> str:
+        if kind == "end":
+            return "end of query"
+        return f"{kind.replace('_', ' ')} {value!r}"
@@ -0,0 +1,175 @@
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from controller.connection_manager import RetrievalStats
+from model.node import Node
+from model.operator_node import OperatorNode
+from model.operator_type import OperatorType
+
+
+@dataclass
+class NodeProfile:
+    """
+    What happened at one node of a query plan during a profiled run.
+
+    seconds is inclusive of the node's children. short_circuited counts the records that reached the parent operator
+    but were settled by an earlier sibling, so never reached this node.
+    """
+
+    label: str
+    reached: int = 0
+    passed: int = 0
+    seconds: float = 0.0
+    short_circuited: int = 0
+    pushed_down: bool = False
+    estimated_cost: Optional[float] = None
+    estimated_selectivity: Optional[float] = None
+    children: list["NodeProfile"] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "label": self.label,
+            "reached": self.reached,
+            "passed": self.passed,
+            "seconds": self.seconds,
+            "short_circuited": self.short_circuited,
+            "pushed_down": self.pushed_down,
+            "estimated_cost": self.estimated_cost,
+            "estimated_selectivity": self.estimated_selectivity,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+@dataclass
+class QueryProfile:
+    """
+    A profiled run of a query: the plan that was evaluated, annotated with per-node counts and timings, plus how the
+    records were found and fetched. Pass one to QueryManager.run_query to fill it in.
+    """
+
+    root: Optional[NodeProfile] = None
+    search_query: Optional[str] = None
+    search_candidates: Optional[int] = None
+    index_candidates: Optional[int] = None
+    retrieval: RetrievalStats = field(default_factory=RetrievalStats)
+    matched: int = 0
+    seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "search_query": self.search_query,
+            "search_candidates": self.search_candidates,
+            "index_candidates": self.index_candidates,
+            "records_from_cache": self.retrieval.from_cache,
+            "records_fetched": self.retrieval.fetched,
+            "fetch_requests": self.retrieval.requests,
+            "matched": self.matched,
+            "seconds": self.seconds,
+            "plan": self.root.to_dict() if self.root is not None else None,
+        }
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def render(self) -> str:
+        """The profile as an indented tree, one plan node per line"""
+        if self.index_candidates is not None:
+            lines = [f"Index: {self.index_candidates} candidates from the cached indexes"]
+        elif self.search_query is not None:
+            lines = [f"Search: {self.search_query} -> {self.search_candidates} candidates"]
+        else:
+            lines = ["Search: not used"]
+        lines.append(
+            f"Records: {self.retrieval.from_cache} from cache, {self.retrieval.fetched} fetched in "
+            f"{self.retrieval.requests} requests; {self.matched} matched in {self.seconds:.3f}s"
+        )
+        # Walked with a stack so deep plans print without recursing
+        pending = [(self.root, 0)] if self.root is not None else []
+        while pending:
+            profile, depth = pending.pop()
+            flags = []
+            if profile.pushed_down:
+                flags.append("pushed down")
+            if profile.short_circuited:
+                flags.append(f"short-circuited {profile.short_circuited}")
+            if profile.estimated_selectivity is not None:
+                flags.append(f"est. selectivity {profile.estimated_selectivity:.3f}")
+            lines.append(
+                f"{'  ' * depth}{profile.label}  "
+                f"[reached {profile.reached}, passed {profile.passed}, {profile.seconds * 1000:.2f} ms"
+                + "".join(f", {flag}" for flag in flags)
+                + "]"
+            )
+            for child in reversed(profile.children):
+                pending.append((child, depth + 1))
+        return "\n".join(lines)
+
+
+def instrument(
+    plan: Node,
+    pushed_down: Callable[[Node], bool] = lambda node: False,
+    estimate: Optional[Callable[[Node], tuple[float, float]]] = None,
+) -> tuple[Callable[[dict], bool], NodeProfile]:
+    """
+    Build a predicate equivalent to plan.compile() that also counts and times every node it evaluates.
+
+    Operator children are evaluated in the plan's order, without flattening, so each profile matches a node of plan.
+
+    :param plan: an optimized query tree
+    :param pushed_down: tells whether a node's condition was answered by the search index
+    :param estimate: the optimizer's (cost, selectivity) estimate for a node, to show next to the measurements
+    :return: the predicate, and the profile tree it fills in as it runs
+    """
+    if not isinstance(plan, OperatorNode):
+        predicate = plan.compile()
+        profile = _profile_for(plan, pushed_down, estimate)
+    else:
+        if not plan.validate():
+            raise ValueError(f"Cannot compile invalid query: {plan.to_string()}")
+        children = [instrument(child, pushed_down, estimate) for child in plan.children]
+        child_predicates = tuple(child_predicate for child_predicate, _ in children)
+        profile = _profile_for(plan, pushed_down, estimate)
+        profile.children = [child_profile for _, child_profile in children]
+        predicate = _operator_predicate(plan.operator, child_predicates)
+
+    perf_counter = time.perf_counter
+
+    def profiled(record: dict) -> bool:
+        profile.reached += 1
+        started = perf_counter()
+        result = predicate(record)
+        profile.seconds += perf_counter() - started
+        if result:
+            profile.passed += 1
+        return result
+
+    return profiled, profile
+
+
+def finish(profile: NodeProfile) -> None:
+    """Work out short_circuited for every node once a run is over"""
+    pending = [profile]
+    while pending:
+        parent = pending.pop()
+        for child in parent.children:
+            child.short_circuited = parent.reached - child.reached
+            pending.append(child)
+
+
+def _profile_for(node: Node, pushed_down, estimate) -> NodeProfile:
+    label = node.operator.name if isinstance(node, OperatorNode) else node.to_string()
+    profile = NodeProfile(label, pushed_down=pushed_down(node))
+    if estimate is not None:
+        profile.estimated_cost, profile.estimated_selectivity = estimate(node)
+    return profile
+
+
+def _operator_predicate(operator: OperatorType, predicates: tuple) -> Callable[[dict], bool]:
+    if operator == OperatorType.NOT:
+        child = predicates[0]
+        return lambda record: not child(record)
+    if operator == OperatorType.AND:
+        return lambda record: all(predicate(record) for predicate in predicates)
+    return lambda record: any(predicate(record) for predicate in predicates)
@@ -0,0 +1,131 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """
+    Turn a Retry-After header into a number of seconds to wait.
+
+    :param value: the raw header, either delta-seconds or an HTTP date
+    :return: seconds to wait, or None if the header is missing or unreadable
+    """
+    if not isinstance(value, str) or not value.strip():
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class RateLimiter:
+    """
+    A thread-safe token bucket that paces requests to an ArchivesSpace server, and adapts its rate AIMD-style.
+
+    Every successful, fast response raises the rate additively (roughly increase_step requests/second for each second
+    of traffic), while throttling responses (429/503) or responses slower than latency_target cut it
+    multiplicatively. A Retry-After from the server blocks every caller until it has passed, after which they resume at the current rate.
+
+    Callers reserve a token under the lock and then sleep outside it, so many workers can share one limiter without
+    serialising on each other's waits.
+    """
+
+    def __init__(
+        self,
+        rate: float = 10.0,
+        burst: float = 10.0,
+        min_rate: float = 0.5,
+        max_rate: float = 50.0,
+        increase_step: float = 1.0,
+        decrease_factor: float = 0.5,
+        latency_target: float = 2.0,
+        slow_decrease_factor: float = 0.9,
+    ):
+        if not 0 < min_rate <= rate <= max_rate:
+            raise ValueError("Rates must satisfy 0 < min_rate <= rate <= max_rate")
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+        if not 0 < decrease_factor < 1 or not 0 < slow_decrease_factor <= 1:
+            raise ValueError("Decrease factors must be between 0 and 1")
+
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.latency_target = latency_target
+        self.slow_decrease_factor = slow_decrease_factor
+
+        self._rate = rate
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self.throttled_count = 0
+
+    @property
+    def rate(self) -> float:
+        """Current allowed requests per second"""
+        return self._rate
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(now - self._last, 0.0)
+        self._last = max(self._last, now)
+        self._tokens = min(self.burst, self._tokens + elapsed * self._rate)
+
+    def acquire(self) -> float:
+        """
+        Take one token, sleeping until it is available or any Retry-After block has passed.
+
+        :return: how long the caller waited, in seconds
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            # Callers queued behind a Retry-After block are paced out after it, rather than all waking as it ends
+            wait = max(self._blocked_until - now, 0.0) + max(-self._tokens, 0.0) / self._rate
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def record_success(self, latency: float) -> None:
+        """Feed back a completed request's latency to grow (or gently shrink) the rate"""
+        with self._lock:
+            if latency > self.latency_target:
+                self._rate = max(self.min_rate, self._rate * self.slow_decrease_factor)
+            else:
+                self._rate = min(
+                    self.max_rate, self._rate + self.increase_step / self._rate
+                )
+
+    def record_throttle(self, retry_after: Optional[float] = None) -> None:
+        """
+        Back off after the server refused a request for load reasons.
+
+        :param retry_after: seconds the server asked us to wait, if it said
+        """
+        with self._lock:
+            self.throttled_count += 1
+            self._rate = max(self.min_rate, self._rate * self.decrease_factor)
+            now = time.monotonic()
+            if retry_after is not None:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+            # Drop any saved-up burst so the first requests after a throttle are paced at the reduced rate
+            self._tokens = min(self._tokens, 0.0)
+            self._last = max(self._last, now, self._blocked_until)
+            logging.warning(
+                f"Server throttled request, rate reduced to {self._rate:.2f}/s"
+                + (f", waiting {retry_after:.1f}s" if retry_after else "")
+            )
@@ -0,0 +1,343 @@
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+from model.field import Field
+from .record_index import IndexKind, RecordIndex
+
+DEFAULT_CACHE_PATH = (
+    Path.home() / ".archivesspace_collections_manager" / "record_cache.sqlite3"
+)
+
+# Seconds a record is served from the cache without the repository being synced. Kept short, because until a sync
+# revalidates them, cached copies miss other users' edits
+DEFAULT_MAX_AGE = 10 * 60
+
+
+def resource_id_from_uri(uri: str) -> int:
+    """Pull the trailing resource id out of a uri like /repositories/2/resources/15"""
+    return int(uri.rstrip("/").rsplit("/", 1)[-1])
+
+
+class RecordMemo:
+    """
+    A small, bounded, in-memory LRU of records for the duration of one run.
+
+    It guarantees that code which still looks records up by id during a run, rather than being handed them, hits the
+    network at most once per record while that record is recent.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self._records: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, repo: int, resource_id: int) -> Optional[dict]:
+        with self._lock:
+            record = self._records.get((repo, resource_id))
+            if record is None:
+                self.misses += 1
+                return None
+            self._records.move_to_end((repo, resource_id))
+            self.hits += 1
+            return record
+
+    def put(self, repo: int, resource_id: int, record: dict) -> None:
+        with self._lock:
+            self._records[(repo, resource_id)] = record
+            self._records.move_to_end((repo, resource_id))
+            while len(self._records) > self.max_size:
+                self._records.popitem(last=False)
+
+    def discard(self, repo: int, resource_id: int) -> None:
+        with self._lock:
+            self._records.pop((repo, resource_id), None)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+
+class RecordCache:
+    """
+    A local SQLite store of resource JSON, keyed by (server, repository, resource id).
+
+    Each row keeps the record's lock_version and system_mtime alongside the JSON and the time we fetched it. An entry
+    is served while it is younger than max_age seconds (None means entries never expire on their own), and is dropped
+    whenever we write the record back to the server, since the server bumps lock_version on every update. Age alone
+    can't tell that someone else has edited a record, so max_age defaults to a few minutes.
+
+    Incremental syncs record a watermark per (server, repository) here too. A sync that brings a repository up to
+    date also marks all of its rows as freshly fetched, so they stay valid without being downloaded again. Syncing
+    before a run is what lets it rely on the cache; see ConnectionManager.sync_repository.
+
+    One sqlite connection is shared by all threads behind a lock; reads and writes are short, so this is cheaper than
+    a connection per worker.
+
+    Secondary indexes over index_fields (see RecordIndex) are built for a repository the first time they are asked
+    for, then kept up to date as records are stored, written back or dropped.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path] = DEFAULT_CACHE_PATH,
+        max_age: Optional[float] = DEFAULT_MAX_AGE,
+        index_fields: Optional[dict[Field, Iterable[IndexKind]]] = None,
+    ):
+        self.path = path
+        self.max_age = max_age
+        self.index_fields = index_fields
+        self._indexes: dict[tuple[str, int], RecordIndex] = {}
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS resources (
+                server TEXT NOT NULL,
+                repo INTEGER NOT NULL,
+                id INTEGER NOT NULL,
+                lock_version INTEGER,
+                system_mtime TEXT,
+                fetched_at REAL NOT NULL,
+                json TEXT NOT NULL,
+                PRIMARY KEY (server, repo, id)
+            )
+            """
+        )
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sync_state (
+                server TEXT NOT NULL,
+                repo INTEGER NOT NULL,
+                last_sync REAL NOT NULL,
+                PRIMARY KEY (server, repo)
+            )
+            """
+        )
+        self._db.commit()
+        logging.debug(f"Opened record cache at {path}")
+
+    def _oldest_valid(self) -> float:
+        if self.max_age is None:
+            return float("-inf")
+        return time.time() - self.max_age
+
+    def get(self, server: str, repo: int, resource_id: int) -> Optional[dict]:
+        """Return the cached record, or None if it is missing or too old"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT json FROM resources WHERE server=? AND repo=? AND id=? AND fetched_at>=?",
+                (server, repo, resource_id, self._oldest_valid()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, server: str, repo: int, resource_ids: Iterable[int]) -> dict:
+        """Return {id: record} for whichever of resource_ids are cached and still valid"""
+        resource_ids = list(resource_ids)
+        found = {}
+        oldest_valid = self._oldest_valid()
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(resource_ids), 500):
+            chunk = resource_ids[start : start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            with self._lock:
+                rows = self._db.execute(
+                    f"SELECT id, json FROM resources WHERE server=? AND repo=? AND fetched_at>=? "
+                    f"AND id IN ({placeholders})",
+                    (server, repo, oldest_valid, *chunk),
+                ).fetchall()
+            for resource_id, data in rows:
+                found[resource_id] = json.loads(data)
+        return found
+
+    def lock_version(self, server: str, repo: int, resource_id: int) -> Optional[int]:
+        """Return the cached lock_version of a record regardless of age, or None if it isn't cached"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT lock_version FROM resources WHERE server=? AND repo=? AND id=?",
+                (server, repo, resource_id),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, server: str, repo: int, record: dict) -> None:
+        """Store one record, replacing any older copy"""
+        self.put_many(server, repo, [record])
+
+    def put_many(self, server: str, repo: int, records: Iterable[dict]) -> None:
+        """Store several records in one transaction"""
+        now = time.time()
+        records = list(records)
+        rows = [
+            (
+                server,
+                repo,
+                resource_id_from_uri(record["uri"]),
+                record.get("lock_version"),
+                record.get("system_mtime"),
+                now,
+                json.dumps(record),
+            )
+            for record in records
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO resources VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._db.commit()
+            index = self._indexes.get((server, repo))
+        if index is not None:
+            for record, row in zip(records, rows):
+                index.add(row[2], record)
+
+    def invalidate(self, server: str, repo: int, resource_id: int) -> None:
+        """Forget one record, e.g. because we just changed it on the server"""
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM resources WHERE server=? AND repo=? AND id=?",
+                (server, repo, resource_id),
+            )
+            self._db.commit()
+            index = self._indexes.get((server, repo))
+        if index is not None:
+            # Until we read it back, the record's new values are unknown
+            index.mark_unknown(resource_id)
+
+    def invalidate_many(self, server: str, repo: int, resource_ids: Iterable[int]) -> None:
+        """Forget several records, e.g. because the server reports them deleted"""
+        rows = [(server, repo, resource_id) for resource_id in resource_ids]
+        with self._lock:
+            self._db.executemany(
+                "DELETE FROM resources WHERE server=? AND repo=? AND id=?", rows
+            )
+            self._db.commit()
+            index = self._indexes.get((server, repo))
+        if index is not None:
+            for _, _, resource_id in rows:
+                index.remove(resource_id)
+
+    def cached_ids(self, server: str, repo: int) -> set[int]:
+        """Every resource id held for a repository, regardless of age"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id FROM resources WHERE server=? AND repo=?", (server, repo)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def sample(self, server: str, repo: int, limit: int) -> list[dict]:
+        """
+        Up to limit records of a repository picked at random, regardless of age, e.g. for query statistics.
+
+        The rowids are picked from the primary key index alone, so only the chosen records' JSON is ever read, rather
+        than every row being loaded and sorted as ORDER BY RANDOM() would.
+        """
+        with self._lock:
+            rowids = [
+                row[0]
+                for row in self._db.execute(
+                    "SELECT rowid FROM resources WHERE server=? AND repo=?", (server, repo)
+                )
+            ]
+            if len(rowids) > limit:
+                rowids = random.sample(rowids, limit)
+            rows = []
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(rowids), 500):
+                chunk = rowids[start : start + 500]
+                rows += self._db.execute(
+                    f"SELECT json FROM resources WHERE rowid IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def index(self, server: str, repo: int) -> RecordIndex:
+        """The secondary indexes over every record cached for a repository, regardless of age, built on first use"""
+        with self._lock:
+            index = self._indexes.get((server, repo))
+            if index is not None:
+                return index
+            rows = self._db.execute(
+                "SELECT id, json FROM resources WHERE server=? AND repo=?", (server, repo)
+            ).fetchall()
+            index = RecordIndex(self.index_fields)
+            for resource_id, data in rows:
+                index.add(resource_id, json.loads(data))
+            self._indexes[(server, repo)] = index
+        logging.debug(f"Indexed {len(rows)} cached records of repository {repo}")
+        return index
+
+    def is_current(self, server: str, repo: int) -> bool:
+        """Whether the repository has been synced, and recently enough that its cached copy is still valid"""
+        watermark = self.get_watermark(server, repo)
+        return watermark is not None and watermark >= self._oldest_valid()
+
+    def touch_repository(self, server: str, repo: int, fetched_at: float) -> None:
+        """Mark every cached record of a repository as current as of fetched_at"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE resources SET fetched_at=? WHERE server=? AND repo=?",
+                (fetched_at, server, repo),
+            )
+            self._db.commit()
+
+    def get_watermark(self, server: str, repo: int) -> Optional[float]:
+        """When the repository was last synced, as a unix timestamp, or None if it never was"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT last_sync FROM sync_state WHERE server=? AND repo=?",
+                (server, repo),
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, server: str, repo: int, last_sync: float) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?)",
+                (server, repo, last_sync),
+            )
+            self._db.commit()
+
+    def clear(self, server: Optional[str] = None, repo: Optional[int] = None) -> None:
+        """Forget everything, everything from one server, or everything from one repository on a server"""
+        with self._lock:
+            for table in ("resources", "sync_state"):
+                if server is None:
+                    self._db.execute(f"DELETE FROM {table}")
+                elif repo is None:
+                    self._db.execute(f"DELETE FROM {table} WHERE server=?", (server,))
+                else:
+                    self._db.execute(
+                        f"DELETE FROM {table} WHERE server=? AND repo=?", (server, repo)
+                    )
+            self._db.commit()
+            for key in list(self._indexes):
+                if server is None or (key[0] == server and repo in (None, key[1])):
+                    del self._indexes[key]
+
+    def count(self, server: Optional[str] = None) -> int:
+        """Number of cached records, optionally for a single server"""
+        with self._lock:
+            if server is None:
+                row = self._db.execute("SELECT COUNT(*) FROM resources").fetchone()
+            else:
+                row = self._db.execute(
+                    "SELECT COUNT(*) FROM resources WHERE server=?", (server,)
+                ).fetchone()
+        return row[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
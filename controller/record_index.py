@@ -0,0 +1,249 @@
+import threading
+from bisect import bisect_left, insort
+from enum import Enum
+from typing import Iterable, Optional
+
+from model.field import Field
+from model.field_path import field_path
+from model.node import Node
+from model.operator_node import OperatorNode
+from model.operator_type import OperatorType
+from model.query_node import COMPARATORS, QueryNode, _as_text
+from model.query_type import QueryType
+from model.resource_field import ResourceField
+
+NGRAM_SIZE = 3
+
+
+class IndexKind(Enum):
+    """The lookups a FieldIndex can be asked to speed up, beyond the hash index every FieldIndex keeps"""
+
+    PREFIX = 1  # Starts_With, by binary search over the sorted values
+    SUFFIX = 2  # Ends_With, by binary search over the sorted reversed values
+    NGRAM = 3  # Contains, by intersecting the values holding each trigram of the search text
+
+
+# Fields queried often enough to be worth indexing, with the lookups each is typically queried by
+DEFAULT_INDEXED_FIELDS: dict[Field, frozenset[IndexKind]] = {
+    ResourceField.id_0: frozenset(IndexKind),
+    ResourceField.level: frozenset(),
+    ResourceField.finding_aid_status: frozenset(),
+    ResourceField.ead_id: frozenset({IndexKind.PREFIX}),
+    ResourceField.finding_aid_title: frozenset({IndexKind.NGRAM}),
+}
+
+# Each negative query type is answered as the complement of its positive counterpart
+_POSITIVE = {
+    QueryType.Not_Equals: QueryType.Equals,
+    QueryType.Not_In: QueryType.In,
+    QueryType.Not_Empty: QueryType.Empty,
+    QueryType.Not_Starts_With: QueryType.Starts_With,
+    QueryType.Not_Ends_With: QueryType.Ends_With,
+    QueryType.Not_Contains: QueryType.Contains,
+}
+
+
+def _grams(text: str) -> set[str]:
+    return {text[i : i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+class FieldIndex:
+    """
+    Indexes one field of a repository's records by the text of its value, the form every QueryType compares.
+
+    The hash index from each distinct value to the ids holding it is always kept; the other IndexKinds index the
+    distinct values themselves. Comparisons whose kind isn't indexed fall back to scanning the distinct values, which
+    is still far cheaper than scanning the records.
+    """
+
+    def __init__(self, field: Field, kinds: Iterable[IndexKind] = ()):
+        path = field_path(field)
+        if path.multi_valued:
+            raise ValueError(f"Cannot index {path.name}, which holds several values per record")
+        self.field = field
+        self._get = path.get
+        self.kinds = frozenset(kinds)
+        self.text_by_id: dict[int, str] = {}
+        self.ids_by_text: dict[str, set[int]] = {}
+        self.sorted_texts: list[str] = []
+        self.sorted_reversed: list[str] = []
+        self.texts_by_gram: dict[str, set[str]] = {}
+
+    def add(self, resource_id: int, record: dict) -> None:
+        """Index a record, replacing whatever was indexed for it before"""
+        text = _as_text(self._get(record))
+        if self.text_by_id.get(resource_id) == text:
+            return
+        self.remove(resource_id)
+        self.text_by_id[resource_id] = text
+        ids = self.ids_by_text.get(text)
+        if ids is None:
+            ids = self.ids_by_text[text] = set()
+            self._add_text(text)
+        ids.add(resource_id)
+
+    def remove(self, resource_id: int) -> None:
+        text = self.text_by_id.pop(resource_id, None)
+        if text is None:
+            return
+        ids = self.ids_by_text[text]
+        ids.discard(resource_id)
+        if not ids:
+            del self.ids_by_text[text]
+            self._remove_text(text)
+
+    def _add_text(self, text: str) -> None:
+        if IndexKind.PREFIX in self.kinds:
+            insort(self.sorted_texts, text)
+        if IndexKind.SUFFIX in self.kinds:
+            insort(self.sorted_reversed, text[::-1])
+        if IndexKind.NGRAM in self.kinds:
+            for gram in _grams(text):
+                self.texts_by_gram.setdefault(gram, set()).add(text)
+
+    def _remove_text(self, text: str) -> None:
+        if IndexKind.PREFIX in self.kinds:
+            del self.sorted_texts[bisect_left(self.sorted_texts, text)]
+        if IndexKind.SUFFIX in self.kinds:
+            del self.sorted_reversed[bisect_left(self.sorted_reversed, text[::-1])]
+        if IndexKind.NGRAM in self.kinds:
+            for gram in _grams(text):
+                texts = self.texts_by_gram[gram]
+                texts.discard(text)
+                if not texts:
+                    del self.texts_by_gram[gram]
+
+    def lookup(self, query_type: QueryType, compare_data) -> set[int]:
+        """The ids of the indexed records whose value passes a comparison"""
+        positive = _POSITIVE.get(query_type, query_type)
+        ids = set()
+        for text in self._matching_texts(positive, compare_data):
+            ids |= self.ids_by_text[text]
+        if positive is not query_type:
+            return set(self.text_by_id) - ids
+        return ids
+
+    def _matching_texts(self, query_type: QueryType, data) -> Iterable[str]:
+        if query_type == QueryType.Equals:
+            return [data] if data in self.ids_by_text else []
+        if query_type == QueryType.In:
+            return [value for value in data if value in self.ids_by_text]
+        if query_type == QueryType.Empty:
+            return [""] if "" in self.ids_by_text else []
+        if query_type == QueryType.Starts_With and IndexKind.PREFIX in self.kinds:
+            return self._prefixed(self.sorted_texts, data)
+        if query_type == QueryType.Ends_With and IndexKind.SUFFIX in self.kinds:
+            return [text[::-1] for text in self._prefixed(self.sorted_reversed, data[::-1])]
+        if (
+            query_type == QueryType.Contains
+            and IndexKind.NGRAM in self.kinds
+            and len(data) >= NGRAM_SIZE
+        ):
+            candidates = sorted(
+                (self.texts_by_gram.get(gram, set()) for gram in _grams(data)), key=len
+            )
+            texts = set(candidates[0]).intersection(*candidates[1:])
+            return [text for text in texts if data in text]
+
+        compare = COMPARATORS[query_type]
+        return [text for text in self.ids_by_text if compare(text, data)]
+
+    @staticmethod
+    def _prefixed(sorted_texts: list[str], prefix: str) -> list[str]:
+        start = bisect_left(sorted_texts, prefix)
+        end = start
+        while end < len(sorted_texts) and sorted_texts[end].startswith(prefix):
+            end += 1
+        return sorted_texts[start:end]
+
+
+class RecordIndex:
+    """
+    Secondary indexes over selected fields of one repository's records, for narrowing a query to the records worth
+    evaluating before any are read.
+
+    Records whose current values are unknown, because we have just written them and not yet read them back, are
+    tracked too: every set of candidates includes them, so the index never hides a record that might match.
+    """
+
+    def __init__(self, fields: Optional[dict[Field, Iterable[IndexKind]]] = None):
+        fields = DEFAULT_INDEXED_FIELDS if fields is None else fields
+        self.fields: dict[Field, FieldIndex] = {
+            field: FieldIndex(field, kinds) for field, kinds in fields.items()
+        }
+        self.unknown: set[int] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        for index in self.fields.values():
+            return len(index.text_by_id) + len(self.unknown)
+        return len(self.unknown)
+
+    def add(self, resource_id: int, record: dict) -> None:
+        with self._lock:
+            self.unknown.discard(resource_id)
+            for index in self.fields.values():
+                index.add(resource_id, record)
+
+    def remove(self, resource_id: int) -> None:
+        """Forget a record that no longer exists"""
+        with self._lock:
+            self.unknown.discard(resource_id)
+            for index in self.fields.values():
+                index.remove(resource_id)
+
+    def mark_unknown(self, resource_id: int) -> None:
+        """Forget a record's values, but keep offering it as a candidate until it is indexed again"""
+        with self._lock:
+            for index in self.fields.values():
+                index.remove(resource_id)
+            self.unknown.add(resource_id)
+
+    def candidates(self, query: Node) -> Optional[set[int]]:
+        """
+        The ids of a superset of the records matching query, or None if the indexes can't narrow it down.
+
+        AND uses whichever of its children are on indexed fields, OR only narrows when all of its children can, and
+        NOT only when its child is answered exactly.
+        """
+        with self._lock:
+            result = self._candidates(query)
+            if result is None:
+                return None
+            return result[0] | self.unknown
+
+    def _candidates(self, node: Node) -> Optional[tuple[set[int], bool]]:
+        """(ids, exact), where exact means ids are precisely the matching indexed records rather than a superset"""
+        if isinstance(node, QueryNode):
+            index = self.fields.get(node.compare_field)
+            if index is None or not node.validate():
+                return None
+            return index.lookup(node.query_type, node.compare_data), True
+        if not isinstance(node, OperatorNode):
+            return None
+
+        if node.operator == OperatorType.NOT:
+            child = self._candidates(node.children[0])
+            if child is None or not child[1]:
+                return None
+            return self._all_ids() - child[0], True
+
+        results = [self._candidates(child) for child in node.children]
+        if node.operator == OperatorType.AND:
+            answered = sorted(
+                (result for result in results if result is not None),
+                key=lambda result: len(result[0]),
+            )
+            if not answered:
+                return None
+            ids = answered[0][0].intersection(*(result[0] for result in answered[1:]))
+            return ids, len(answered) == len(results) and all(exact for _, exact in answered)
+
+        if any(result is None for result in results):
+            return None
+        return set().union(*(ids for ids, _ in results)), all(exact for _, exact in results)
+
+    def _all_ids(self) -> set[int]:
+        for index in self.fields.values():
+            return set(index.text_by_id)
+        return set()
@@ -0,0 +1,133 @@
+import re
+from typing import Optional
+
+from model.node import Node
+from model.operator_node import OperatorNode
+from model.operator_type import OperatorType
+from model.query_node import QueryNode
+from model.query_type import QueryType
+from model.resource_field import ResourceField
+
+_SOLR_SPECIAL = re.compile(r'([+\-&|!(){}\[\]^"~*?:\\/\s])')
+
+
+def solr_escape(value: str) -> str:
+    """Backslash-escape everything Solr's standard query parser treats specially, including whitespace"""
+    return _SOLR_SPECIAL.sub(r"\\\1", value)
+
+
+class SearchPushdown:
+    """
+    Translates the selective parts of a query tree into a Solr query for ArchivesSpace's repository search endpoint.
+
+    The translation only ever widens the query: against an up to date index, the records the search returns are a
+    superset of those the tree matches. An AND keeps just the children it can translate, an OR is only translated when
+    every child can be, and NOT is never translated. The caller evaluates the full tree against the candidates
+    locally, so pushing down cuts how many records are downloaded. The index lags behind edits, though, so a record
+    changed since it was last indexed can be missed; that is why QueryManager.run_query only searches when asked to.
+
+    EXACT_FIELDS and PREFIX_FIELDS map each indexed ResourceField to the Solr field holding it. Exact fields hold the
+    value as is. Prefix fields hold something the value is the start of, as with id_0 and the joined four-part
+    identifier, so only prefix searches are safe against them.
+    """
+
+    EXACT_FIELDS: dict[ResourceField, str] = {
+        ResourceField.level: "level",
+        ResourceField.finding_aid_status: "finding_aid_status",
+        ResourceField.ead_id: "ead_id",
+    }
+    PREFIX_FIELDS: dict[ResourceField, str] = {
+        ResourceField.id_0: "identifier",
+    }
+
+    def translate(self, node: Node) -> Optional[str]:
+        """
+        Return a Solr query selecting a superset of the records node matches, or None if nothing can be pushed down.
+        """
+        if isinstance(node, QueryNode):
+            return self._translate_leaf(node)
+        if not isinstance(node, OperatorNode):
+            return None
+
+        if node.operator == OperatorType.AND:
+            clauses = [
+                clause
+                for clause in (self.translate(child) for child in node.children)
+                if clause is not None
+            ]
+            if not clauses:
+                return None
+            return clauses[0] if len(clauses) == 1 else "(" + " AND ".join(clauses) + ")"
+
+        if node.operator == OperatorType.OR:
+            clauses = [self.translate(child) for child in node.children]
+            if any(clause is None for clause in clauses):
+                return None
+            return "(" + " OR ".join(clauses) + ")"
+
+        return None
+
+    def pushed_down_nodes(self, node: Node) -> set[int]:
+        """
+        The ids of the nodes whose whole condition translate(node) sends to the index: pushable leaves reached through
+        ANDs or fully pushable ORs, and operators all of whose children are pushed down.
+        """
+        pushed = set()
+        # Each entry is a node whose ancestors all let a pushed-down condition through
+        pending = [node]
+        while pending:
+            current = pending.pop()
+            if isinstance(current, QueryNode):
+                if self._translate_leaf(current) is not None:
+                    pushed.add(id(current))
+            elif isinstance(current, OperatorNode) and (
+                current.operator == OperatorType.AND
+                or (
+                    current.operator == OperatorType.OR
+                    and self.translate(current) is not None
+                )
+            ):
+                pending.extend(current.children)
+
+        # An operator is pushed down as a whole when every one of its children is
+        def mark(current: Node) -> bool:
+            if not isinstance(current, OperatorNode):
+                return id(current) in pushed
+            results = [mark(child) for child in current.children]
+            if current.operator != OperatorType.NOT and all(results):
+                pushed.add(id(current))
+                return True
+            return False
+
+        mark(node)
+        return pushed
+
+    def _translate_leaf(self, node: QueryNode) -> Optional[str]:
+        if not node.compare_data:
+            return None
+
+        if node.compare_field in self.EXACT_FIELDS:
+            solr_field = self.EXACT_FIELDS[node.compare_field]
+            match node.query_type:
+                case QueryType.Equals:
+                    return f"{solr_field}:{solr_escape(node.compare_data)}"
+                case QueryType.In:
+                    values = " OR ".join(
+                        solr_escape(value) for value in sorted(node.compare_data)
+                    )
+                    return f"{solr_field}:({values})"
+                case QueryType.Starts_With:
+                    return f"{solr_field}:{solr_escape(node.compare_data)}*"
+
+        if node.compare_field in self.PREFIX_FIELDS:
+            solr_field = self.PREFIX_FIELDS[node.compare_field]
+            match node.query_type:
+                case QueryType.Equals | QueryType.Starts_With:
+                    return f"{solr_field}:{solr_escape(node.compare_data)}*"
+                case QueryType.In:
+                    values = " OR ".join(
+                        f"{solr_escape(value)}*" for value in sorted(node.compare_data)
+                    )
+                    return f"{solr_field}:({values})"
+
+        return None
@@ -0,0 +1,154 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+
+class UpdateJournal:
+    """
+    An append-only, on-disk record of a bulk update run, so a run that dies part way can be resumed rather than redone.
+
+    Every change is journaled as planned before its write is sent, then as applied (with the lock_version the server
+    gave the record), skipped (the transform left it alone) or failed. Entries are JSON lines, buffered and written out with an fsync every flush_every
+    entries or flush_interval seconds, whichever comes first, and on close. A crash loses at most the last unflushed
+    batch, and a torn final line is ignored when the journal is read back.
+
+    Resuming a journal skips each record whose latest entry says we applied it and whose lock_version is still the one
+    our write produced. A record someone has edited since is processed again. So is a record planned but never
+    confirmed either way, since its write may or may not have reached the server; these are listed in in_doubt.
+    """
+
+    PLANNED = "planned"
+    APPLIED = "applied"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        resume: bool = False,
+        flush_every: int = 100,
+        flush_interval: float = 1.0,
+    ):
+        """
+        :param path: the journal file
+        :param resume: continue the run journaled at path. Otherwise path must not already hold a journal
+        :param flush_every: most entries buffered before they are written and fsync'd
+        :param flush_interval: most seconds an entry stays buffered before it is written and fsync'd
+        :raises FileExistsError: if path already holds a journal and resume is False
+        """
+        if flush_every < 1:
+            raise ValueError(f"flush_every must be at least 1, not {flush_every}")
+        self.path = Path(path)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        # uri -> lock_version after our write, for every record whose latest entry is applied
+        self.applied: dict[str, Optional[int]] = {}
+        # uris whose latest entry is planned
+        self.in_doubt: set[str] = set()
+
+        exists = self.path.exists() and self.path.stat().st_size > 0
+        if exists and not resume:
+            raise FileExistsError(
+                f"{self.path} already holds an update journal; resume it or choose another path"
+            )
+        if resume and exists:
+            self._load()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._pending: list[str] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        if exists and not self._ends_with_newline():
+            # Start after the torn line rather than on the end of it
+            self._pending.append("\n")
+
+    def _load(self) -> None:
+        with open(self.path, encoding="utf-8") as journal:
+            lines = journal.read().split("\n")
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                logging.warning(
+                    f"Ignoring unreadable line {number} of update journal {self.path}"
+                )
+                continue
+            self._track(entry)
+        logging.info(
+            f"Resuming update journal {self.path}: {len(self.applied)} applied, "
+            f"{len(self.in_doubt)} in doubt"
+        )
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as journal:
+            journal.seek(-1, os.SEEK_END)
+            return journal.read(1) == b"\n"
+
+    def _track(self, entry: dict) -> None:
+        uri = entry.get("uri")
+        event = entry.get("event")
+        if uri is None:
+            return
+        if event == self.APPLIED:
+            self.applied[uri] = entry.get("new_lock_version")
+            self.in_doubt.discard(uri)
+        elif event == self.PLANNED:
+            self.applied.pop(uri, None)
+            self.in_doubt.add(uri)
+        elif event in (self.SKIPPED, self.FAILED):
+            self.applied.pop(uri, None)
+            self.in_doubt.discard(uri)
+
+    def already_applied(self, record: dict) -> bool:
+        """Whether a freshly fetched record already carries the change this run journaled for it"""
+        uri = record.get("uri")
+        return uri in self.applied and self.applied[uri] == record.get("lock_version")
+
+    def planned(self, record: dict) -> None:
+        self.append(
+            self.PLANNED, record.get("uri"), lock_version=record.get("lock_version")
+        )
+
+    def append(self, event: str, uri: str, **details) -> None:
+        """Journal one event for a record, writing the buffer out if it is due"""
+        entry = {"event": event, "uri": uri, "time": round(time.time(), 3), **details}
+        with self._lock:
+            self._track(entry)
+            self._pending.append(json.dumps(entry, separators=(",", ":")) + "\n")
+            if (
+                len(self._pending) >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            ):
+                self._flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._pending:
+            self._file.write("".join(self._pending))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._pending.clear()
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file.closed:
+                return
+            self._flush()
+            self._file.close()
+
+    def __enter__(self) -> "UpdateJournal":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
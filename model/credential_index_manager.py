@@ -4,14 +4,22 @@ Credential Index Manager - maintains a discoverable index of ArchivesSpace crede
 
 import json
 import logging
-import keyring
-from typing import List, Dict, Optional
+from typing import TYPE_CHECKING, List, Dict, Optional
 from dataclasses import dataclass
-from controller.connection import Connection
+
+if TYPE_CHECKING:
+    from controller.connection import Connection
 
 logger = logging.getLogger(__name__)
 
 
+def _keyring():
+    """The keyring module, imported on first use, since discovering its backends slows application startup"""
+    import keyring
+
+    return keyring
+
+
 @dataclass
 class CredentialInfo:
     """Information about a stored credential"""
@@ -60,7 +68,7 @@ class CredentialIndexManager:
             return self._index_cache
 
         try:
-            index_json = keyring.get_password(self.INDEX_SERVICE, self.INDEX_KEY)
+            index_json = _keyring().get_password(self.INDEX_SERVICE, self.INDEX_KEY)
             if index_json:
                 index_data = json.loads(index_json)
                 self._index_cache = [
@@ -83,7 +91,7 @@ class CredentialIndexManager:
         try:
             index_data = [item.to_dict() for item in index]
             index_json = json.dumps(index_data, indent=2)
-            keyring.set_password(self.INDEX_SERVICE, self.INDEX_KEY, index_json)
+            _keyring().set_password(self.INDEX_SERVICE, self.INDEX_KEY, index_json)
             self._index_cache = index
             logger.debug(f"Saved credential index with {len(index)} entries")
         except Exception as e:
@@ -108,7 +116,7 @@ class CredentialIndexManager:
             display_name = f"{username} @ {server}"
 
             # Store the actual credential
-            keyring.set_password(self.CREDENTIAL_SERVICE, storage_key, password)
+            _keyring().set_password(self.CREDENTIAL_SERVICE, storage_key, password)
             logger.debug(f"Stored credential with key: {storage_key}")
 
             # Update the index
@@ -146,7 +154,7 @@ class CredentialIndexManager:
     def get_credential_password(self, cred_info: CredentialInfo) -> Optional[str]:
         """Get the password for a specific credential"""
         try:
-            password = keyring.get_password(
+            password = _keyring().get_password(
                 self.CREDENTIAL_SERVICE, cred_info.storage_key
             )
             return password
@@ -154,8 +162,10 @@ class CredentialIndexManager:
             logger.error(f"Error retrieving password for {cred_info.display_name}: {e}")
             return None
 
-    def load_credential(self, cred_info: CredentialInfo) -> Optional[Connection]:
+    def load_credential(self, cred_info: CredentialInfo) -> Optional["Connection"]:
         """Load a credential as a Connection object"""
+        from controller.connection import Connection
+
         password = self.get_credential_password(cred_info)
         if password:
             return Connection(cred_info.server, cred_info.username, password)
@@ -165,7 +175,7 @@ class CredentialIndexManager:
         """Delete a credential and remove from index"""
         try:
             # Delete from keyring
-            keyring.delete_password(self.CREDENTIAL_SERVICE, cred_info.storage_key)
+            _keyring().delete_password(self.CREDENTIAL_SERVICE, cred_info.storage_key)
             logger.debug(f"Deleted credential from keyring: {cred_info.storage_key}")
 
             # Remove from index
@@ -194,7 +204,7 @@ class CredentialIndexManager:
         removed_count = 0
 
         for cred_info in index:
-            password = keyring.get_password(
+            password = _keyring().get_password(
                 self.CREDENTIAL_SERVICE, cred_info.storage_key
             )
             if password is not None:
@@ -226,7 +236,7 @@ class CredentialIndexManager:
 
         for pattern in common_patterns:
             try:
-                password = keyring.get_password(
+                password = _keyring().get_password(
                     self.CREDENTIAL_SERVICE, pattern["storage_key"]
                 )
                 if password:
@@ -55,10 +55,11 @@ class DataModel:
 
     def __init__(self, main=None):
         # Only initialize once, even if called multiple times
-        if not DataModel._initialized and main is not None:
+        # DataModel is the singleton's factory function here, so the flag lives on the class itself
+        if not type(self)._initialized and main is not None:
             self.main = main
             self.repositories = None
-            DataModel._initialized = True
+            type(self)._initialized = True
             self.query = None
     def initialize_repositories(self):
         if self.repositories is None and hasattr(self, 'main') and self.main is not None:
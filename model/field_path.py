@@ -0,0 +1,116 @@
+import re
+from typing import Any, Callable, Union
+
+from model.field import Field
+
+# One step of a path: a key, a [n] index into a list, or a [*] wildcard over every item of a list
+_STEP = re.compile(r"\.?(?P<key>\w+)|\[(?P<index>-?\d+)\]|\[(?P<each>\*)\]")
+
+
+class FieldPath:
+    """
+    A path to a value in a record's JSON, like dates[*].expression, extents[0].number or
+    notes[*].subnotes[*].content, compiled once into a function that reads it from any record.
+
+    Keys step into objects and [n] indexes into lists. A [*] wildcard steps into every item of a list, which makes
+    the path multi-valued: get returns the list of every value the path reaches, and a query against it matches a
+    record when any of those values does (for the negated query types and Empty, when none passes the opposite). A path
+    with no wildcard reads a single value, "" when any step is missing, exactly as a top-level field does.
+
+    A FieldPath stands in for a Field on a QueryNode; name is the path as written, so the node is saved as %path.
+    """
+
+    def __init__(self, expression: str):
+        steps = []
+        position = 0
+        for match in _STEP.finditer(expression):
+            is_key = match.group("key") is not None
+            # Keys after the first are written .key; the first is written bare
+            dotted = match.group(0)[0] == "."
+            if match.start() != position or (is_key and (position == 0) == dotted):
+                break
+            position = match.end()
+            if is_key:
+                steps.append(("key", match.group("key")))
+            elif match.group("index") is not None:
+                steps.append(("index", int(match.group("index"))))
+            else:
+                steps.append(("each", None))
+        if not steps or position != len(expression) or steps[0][0] != "key":
+            raise ValueError(f"Invalid field path: {expression!r}")
+
+        self.name = expression
+        self.root: str = steps[0][1]
+        self.steps: tuple = tuple(steps)
+        self.multi_valued = any(kind == "each" for kind, _ in steps)
+        self.get: Callable[[dict], Any] = (
+            _compile_multi(self.steps)
+            if self.multi_valued
+            else _compile_single(self.steps)
+        )
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, FieldPath) and other.name == self.name
+
+    def __hash__(self) -> int:
+        return hash(("FieldPath", self.name))
+
+    def __repr__(self) -> str:
+        return f"FieldPath({self.name!r})"
+
+
+def _compile_single(steps: tuple) -> Callable[[dict], Any]:
+    if len(steps) == 1:
+        key = steps[0][1]
+        return lambda record: record.get(key, "")
+
+    def get(record: dict) -> Any:
+        value = record
+        for kind, arg in steps:
+            if kind == "key":
+                if not isinstance(value, dict) or arg not in value:
+                    return ""
+            elif not isinstance(value, list) or not -len(value) <= arg < len(value):
+                return ""
+            value = value[arg]
+        return value
+
+    return get
+
+
+def _compile_multi(steps: tuple) -> Callable[[dict], list]:
+    def get(record: dict) -> list:
+        values = [record]
+        for kind, arg in steps:
+            if kind == "key":
+                values = [
+                    value[arg]
+                    for value in values
+                    if isinstance(value, dict) and arg in value
+                ]
+            elif kind == "index":
+                values = [
+                    value[arg]
+                    for value in values
+                    if isinstance(value, list) and -len(value) <= arg < len(value)
+                ]
+            else:
+                values = [
+                    item for value in values if isinstance(value, list) for item in value
+                ]
+        return values
+
+    return get
+
+
+_FIELD_PATHS: dict[Field, FieldPath] = {}
+
+
+def field_path(field: Union[Field, FieldPath]) -> FieldPath:
+    """The compiled path for a field: a FieldPath as is, or the top-level key of a Field's name"""
+    if isinstance(field, FieldPath):
+        return field
+    path = _FIELD_PATHS.get(field)
+    if path is None:
+        path = _FIELD_PATHS[field] = FieldPath(field.name)
+    return path
@@ -3,6 +3,7 @@
 """***DO NOT DELETE. USED AS AN INTERFACE***"""
 
 import abc
+from typing import Callable
 
 
 class Node:
@@ -16,6 +17,16 @@ class Node:
     def eval(self, repo, recordID: int) -> bool:
         pass
 
+    @abc.abstractmethod
+    def eval_record(self, record: dict) -> bool:
+        """Evaluate this subtree against a record that has already been fetched"""
+        pass
+
+    @abc.abstractmethod
+    def fetch_record(self, repo, record_id: int) -> dict:
+        """Fetch the record this tree would be evaluated against"""
+        pass
+
     @abc.abstractmethod
     def traverse(self, depth, nodes):
         pass
@@ -23,3 +34,13 @@ class Node:
     @abc.abstractmethod
     def to_string(self):
         pass
+
+    @abc.abstractmethod
+    def write_to(self, out: list) -> None:
+        """Append this subtree's string representation to out, in pieces, for the caller to join once"""
+        pass
+
+    @abc.abstractmethod
+    def compile(self) -> Callable[[dict], bool]:
+        """Turn this (validated) subtree into a single predicate over a record's JSON"""
+        pass
@@ -1,3 +1,5 @@
+from typing import Callable
+
 import model.node as Node
 import model.operator_type as OperatorType
 
@@ -10,11 +12,30 @@ class OperatorNode(Node.Node):
     """
 
     def to_string(self):
-        string = "$"
-        string += self.operator.name
-        for child in self.children:
-            string += "{" + child.to_string() + "}"
-        return string
+        out = []
+        self.write_to(out)
+        return "".join(out)
+
+    def write_to(self, out: list) -> None:
+        """
+        Append this subtree's .ACMQ representation to out, a list of string pieces joined once at the end.
+
+        Nested operators are walked with an explicit stack, so deep trees don't hit the recursion limit.
+        """
+        # Either a node still to be written, or a literal closing brace
+        pending = [self]
+        while pending:
+            item = pending.pop()
+            if isinstance(item, str):
+                out.append(item)
+            elif isinstance(item, OperatorNode):
+                out.append("$" + item.operator.name)
+                for child in reversed(item.children):
+                    pending.append("}")
+                    pending.append(child)
+                    pending.append("{")
+            else:
+                item.write_to(out)
 
     def __init__(self, operator_type: OperatorType.OperatorType, children):
         super().__init__()
@@ -23,7 +44,7 @@ class OperatorNode(Node.Node):
 
     def validate(self) -> bool:
         for child in self.children:
-            if not isinstance(child, Node):
+            if not isinstance(child, Node.Node):
                 return False
             if not child.validate():
                 return False
@@ -34,6 +55,12 @@ class OperatorNode(Node.Node):
         return False
 
     def eval(self, repo, record_id: int):
+        """
+        Fetch the record once, then evaluate the whole subtree against it. Leaves never fetch for themselves here.
+        """
+        return self.eval_record(self.fetch_record(repo, record_id))
+
+    def eval_record(self, record: dict) -> bool:
         """
         we may want to intersperse extra operatortypes between children, not sure yet. Leaning towards the controller
         just having a parser function for this. A bit convoluted, but so are the functional requirements, so I'm not too
@@ -42,18 +69,87 @@ class OperatorNode(Node.Node):
 
         match self.operator:
             case OperatorType.OperatorType.NOT:
-                return not self.children[0].eval(repo, record_id)
+                return not self.children[0].eval_record(record)
             case OperatorType.OperatorType.OR:
                 for child in self.children:
-                    if child.eval(repo, record_id):
+                    if child.eval_record(record):
                         return True
                 return False
             case OperatorType.OperatorType.AND:
                 for child in self.children:
-                    if not child.eval(repo, record_id):
+                    if not child.eval_record(record):
                         return False
                 return True
 
+    def fetch_record(self, repo, record_id: int) -> dict:
+        """Operators hold no connection of their own, so the first child fetches on the whole tree's behalf"""
+        return self.children[0].fetch_record(repo, record_id)
+
+    def compile(self) -> Callable[[dict], bool]:
+        """
+        Build one predicate over a record's JSON for this whole subtree.
+
+        Nested ANDs within ANDs (and ORs within ORs) are flattened into a single short-circuiting loop, so deep
+        trees built a clause at a time don't cost a call per level.
+
+        Raises:
+            ValueError: If the tree fails validation
+        """
+        if not self.validate():
+            raise ValueError(f"Cannot compile invalid query: {self.to_string()}")
+        return self._compile()
+
+    def _compile(self) -> Callable[[dict], bool]:
+        if self.operator == OperatorType.OperatorType.NOT:
+            child = self._compile_child(self.children[0])
+            return lambda record: not child(record)
+
+        predicates = tuple(
+            self._compile_child(child)
+            for child in self._flattened_children(self.operator)
+        )
+        if self.operator == OperatorType.OperatorType.AND:
+            if len(predicates) == 2:
+                first, second = predicates
+                return lambda record: first(record) and second(record)
+
+            def all_match(record: dict) -> bool:
+                for predicate in predicates:
+                    if not predicate(record):
+                        return False
+                return True
+
+            return all_match
+
+        if len(predicates) == 2:
+            first, second = predicates
+            return lambda record: first(record) or second(record)
+
+        def any_match(record: dict) -> bool:
+            for predicate in predicates:
+                if predicate(record):
+                    return True
+            return False
+
+        return any_match
+
+    @staticmethod
+    def _compile_child(child) -> Callable[[dict], bool]:
+        # The whole tree was validated once in compile, so operator children skip straight to building
+        if isinstance(child, OperatorNode):
+            return child._compile()
+        return child.compile()
+
+    def _flattened_children(self, operator) -> list:
+        """Children of this node, with same-operator descendants pulled up into this level"""
+        flattened = []
+        for child in self.children:
+            if isinstance(child, OperatorNode) and child.operator == operator:
+                flattened.extend(child._flattened_children(operator))
+            else:
+                flattened.append(child)
+        return flattened
+
     def traverse(self, depth, nodes):
         for child in self.children:
             nodes += child.traverse(depth + 1, nodes)
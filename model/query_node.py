@@ -1,12 +1,86 @@
 
 
-from typing import Optional, Any
+from pathlib import Path
+from typing import Optional, Any, Callable, Iterable, Union
 from model.node import Node
 from model.data_model import DataModel
 from model.field import Field
+from model.field_path import FieldPath, field_path
 from model.query_type import QueryType
 
 
+def _as_text(value: Any) -> str:
+    return str(value) if value is not None else ""
+
+
+def _escape(value: str) -> str:
+    """Backslash-escape the characters that would end or corrupt a quoted .ACMQ value"""
+    if "\\" in value or '"' in value:
+        return value.replace("\\", "\\\\").replace('"', '\\"')
+    return value
+
+
+# One comparison per QueryType, taking the raw field value and the node's compare_data
+COMPARATORS: dict[QueryType, Callable[[Any, Optional[str]], bool]] = {
+    QueryType.Equals: lambda value, data: _as_text(value) == data,
+    QueryType.Not_Equals: lambda value, data: _as_text(value) != data,
+    QueryType.Empty: lambda value, data: value is None or _as_text(value) == "",
+    QueryType.Not_Empty: lambda value, data: value is not None
+    and _as_text(value) != "",
+    QueryType.Starts_With: lambda value, data: _as_text(value).startswith(data),
+    QueryType.Not_Starts_With: lambda value, data: not _as_text(value).startswith(
+        data
+    ),
+    QueryType.Ends_With: lambda value, data: _as_text(value).endswith(data),
+    QueryType.Not_Ends_With: lambda value, data: not _as_text(value).endswith(data),
+    QueryType.Contains: lambda value, data: data in _as_text(value),
+    QueryType.Not_Contains: lambda value, data: data not in _as_text(value),
+    # compare_data is a frozenset for these, so membership is a single hash lookup however long the list
+    QueryType.In: lambda value, data: _as_text(value) in data,
+    QueryType.Not_In: lambda value, data: _as_text(value) not in data,
+}
+
+# For multi-valued paths, each negated type (and Empty) matches when its opposite matches none of the values
+_OPPOSITES = {
+    QueryType.Not_Equals: QueryType.Equals,
+    QueryType.Not_In: QueryType.In,
+    QueryType.Empty: QueryType.Not_Empty,
+    QueryType.Not_Starts_With: QueryType.Starts_With,
+    QueryType.Not_Ends_With: QueryType.Ends_With,
+    QueryType.Not_Contains: QueryType.Contains,
+}
+
+
+def _any_comparator(query_type: QueryType) -> Callable[[list, Any], bool]:
+    opposite = _OPPOSITES.get(query_type)
+    if opposite is None:
+        compare = COMPARATORS[query_type]
+        return lambda values, data: any(compare(value, data) for value in values)
+    compare = COMPARATORS[opposite]
+    return lambda values, data: not any(compare(value, data) for value in values)
+
+
+# The same comparisons over every value a multi-valued FieldPath reaches
+MULTI_VALUE_COMPARATORS: dict[QueryType, Callable[[list, Any], bool]] = {
+    query_type: _any_comparator(query_type) for query_type in COMPARATORS
+}
+
+NO_DATA_QUERY_TYPES = frozenset({QueryType.Empty, QueryType.Not_Empty})
+SET_QUERY_TYPES = frozenset({QueryType.In, QueryType.Not_In})
+
+
+def load_value_list(path: Union[str, Path]) -> frozenset[str]:
+    """
+    Read a value list for an In/Not_In query: one value per line, ignoring blank lines and lines starting with #.
+    """
+    with open(path, encoding="utf-8") as value_file:
+        return frozenset(
+            line.strip()
+            for line in value_file
+            if line.strip() and not line.lstrip().startswith("#")
+        )
+
+
 class QueryNode(Node):
     """
     A query node that evaluates a single condition against ArchivesSpace records.
@@ -17,20 +91,46 @@ class QueryNode(Node):
 
     def __init__(
         self,
-        data_model: DataModel,compare_field: Field,
+        data_model: DataModel,compare_field: Union[Field, FieldPath],
         query_type: QueryType,
 
-        compare_data: Optional[str] = None,
+        compare_data: Optional[Union[str, Iterable[str]]] = None,
+        source_path: Optional[str] = None,
     ):
         self.query_type = query_type
+        if query_type in SET_QUERY_TYPES and compare_data is not None:
+            if isinstance(compare_data, str):
+                compare_data = [compare_data]
+            compare_data = frozenset(compare_data)
         self.compare_data = compare_data
         self.compare_field = compare_field
         self.data_model = data_model
+        # For In/Not_In lists loaded from a file, so the query is saved as a reference to the file and not its contents
+        self.source_path = source_path
+
+    @classmethod
+    def from_value_file(
+        cls,
+        data_model: DataModel,
+        compare_field: Field,
+        query_type: QueryType,
+        path: Union[str, Path],
+    ) -> "QueryNode":
+        """Build an In/Not_In node whose values are read from a file, one per line"""
+        if query_type not in SET_QUERY_TYPES:
+            raise ValueError(f"{query_type.name} does not take a list of values")
+        return cls(
+            data_model,
+            compare_field,
+            query_type,
+            load_value_list(path),
+            source_path=str(path),
+        )
 
     def validate(self) -> bool:
         """Validate that the query node configuration is valid."""
         # Check if data_to_compare_to is required for this query type
-        requires_data = self.query_type not in [QueryType.Empty, QueryType.Not_Empty]
+        requires_data = self.query_type not in NO_DATA_QUERY_TYPES
 
         if requires_data and not self.compare_data:
             return False
@@ -42,7 +142,9 @@ class QueryNode(Node):
 
     def eval(self, repo: int, record_id: int) -> bool:
         """
-        Evaluate this query condition against a specific record.
+        Fetch a record and evaluate this query condition against it.
+
+        Prefer eval_record when the record is already in hand; this exists for callers that only have an id.
 
         Args:
             repo: Repository ID
@@ -55,15 +157,28 @@ class QueryNode(Node):
             NotImplementedError: For unsupported record types
             ValueError: For invalid query configurations
         """
-        # Get the record data based on the record type
-        record_data = self._get_record_data(repo, record_id)
+        return self.eval_record(self.fetch_record(repo, record_id))
 
+    def eval_record(self, record_data: dict) -> bool:
+        """
+        Evaluate this query condition against an already fetched record.
+
+        Args:
+            record_data: The record's JSON
+
+        Returns:
+            bool: True if the record matches this condition
+        """
         # Extract the field value we want to compare
         field_value = self._extract_field_value(record_data)
 
         # Perform the comparison
         return self._compare_values(field_value)
 
+    def fetch_record(self, repo: int, record_id: int) -> dict:
+        """Fetch the record this condition is evaluated against."""
+        return self._get_record_data(repo, record_id)
+
     def _get_record_data(self, repo: int, record_id: int) -> Any:
         """Get record data from ArchivesSpace based on record type."""
         # Note: The original logic seems confused - it's matching against compare_field
@@ -74,69 +189,63 @@ class QueryNode(Node):
         )
 
     def _extract_field_value(self, record_data: dict) -> Any:
-        """Extract the specific field value from the record data."""
-        # This would need to be implemented based on how fields map to JSON keys
-        # For now, using the field name directly
-        return record_data.get(self.compare_field.name, "")
+        """
+        Extract the field value from the record data through the field's compiled path: the top-level key for a Field,
+        and for a multi-valued FieldPath the list of every value it reaches.
+        """
+        return field_path(self.compare_field).get(record_data)
 
     def _compare_values(self, field_value: Any) -> bool:
         """Compare the field value according to the query type."""
-        # Convert to string for comparison if needed
-        field_str = str(field_value) if field_value is not None else ""
-
-        match self.query_type:
-            case QueryType.Equals:
-                if not self.compare_data:
-                    raise ValueError("Equals query requires comparison data")
-                return field_str == self.compare_data
-
-            case QueryType.Not_Equals:
-                if not self.compare_data:
-                    raise ValueError("Not_Equals query requires comparison data")
-                return field_str != self.compare_data
-
-            case QueryType.Empty:
-                if self.compare_data:
-                    raise ValueError("Empty query should not have comparison data")
-                return field_str == "" or field_value is None
-
-            case QueryType.Not_Empty:
-                if self.compare_data:
-                    raise ValueError("Not_Empty query should not have comparison data")
-                return field_str != "" and field_value is not None
-
-            case QueryType.Starts_With:
-                if not self.compare_data:
-                    raise ValueError("Starts_With query requires comparison data")
-                return field_str.startswith(self.compare_data)
-
-            case QueryType.Not_Starts_With:
-                if not self.compare_data:
-                    raise ValueError("Not_Starts_With query requires comparison data")
-                return not field_str.startswith(self.compare_data)
-
-            case QueryType.Ends_With:
-                if not self.compare_data:
-                    raise ValueError("Ends_With query requires comparison data")
-                return field_str.endswith(self.compare_data)
-
-            case QueryType.Not_Ends_With:
-                if not self.compare_data:
-                    raise ValueError("Not_Ends_With query requires comparison data")
-                return not field_str.endswith(self.compare_data)
-
-            case QueryType.Contains:
-                if not self.compare_data:
-                    raise ValueError("Contains query requires comparison data")
-                return self.compare_data in field_str
-
-            case QueryType.Not_Contains:
-                if not self.compare_data:
-                    raise ValueError("Not_Contains query requires comparison data")
-                return self.compare_data not in field_str
-
-            case _:
-                raise ValueError(f"Unsupported query type: {self.query_type}")
+        self._check_compare_data()
+        return self._comparators()[self.query_type](field_value, self.compare_data)
+
+    def _comparators(self) -> dict:
+        if field_path(self.compare_field).multi_valued:
+            return MULTI_VALUE_COMPARATORS
+        return COMPARATORS
+
+    def _check_compare_data(self) -> None:
+        """Raise ValueError unless compare_data suits the query type."""
+        if self.query_type not in COMPARATORS:
+            raise ValueError(f"Unsupported query type: {self.query_type}")
+        if self.query_type in NO_DATA_QUERY_TYPES:
+            if self.compare_data:
+                raise ValueError(
+                    f"{self.query_type.name} query should not have comparison data"
+                )
+        elif not self.compare_data:
+            raise ValueError(f"{self.query_type.name} query requires comparison data")
+
+    def compile(self) -> Callable[[dict], bool]:
+        """
+        Build a predicate over a record's JSON equivalent to evaluating this node.
+
+        The field's compiled path, comparison function and comparison data are all bound up front and the node is
+        validated once here, so calling the predicate does no validation, path parsing, enum matching or attribute
+        lookups.
+
+        Raises:
+            ValueError: For invalid query configurations
+        """
+        self._check_compare_data()
+        path = field_path(self.compare_field)
+        data = self.compare_data
+        compare = self._comparators()[self.query_type]
+        if path.multi_valued or len(path.steps) > 1:
+            get = path.get
+
+            def predicate(record: dict) -> bool:
+                return compare(get(record), data)
+
+            return predicate
+
+        key = path.root
+
+        def predicate(record: dict) -> bool:
+            return compare(record.get(key, ""), data)
+
+        return predicate
 
     def traverse(self, depth: int, nodes: list) -> tuple:
         """
@@ -160,6 +269,16 @@ class QueryNode(Node):
         Returns:
             str: String representation of this query
         """
+        out = []
+        self.write_to(out)
+        return "".join(out)
+
+    def write_to(self, out: list) -> None:
+        """
+        Append this node's .ACMQ representation to out, a list of string pieces joined once at the end.
+
+        Quotes and backslashes in values are escaped with a backslash, so what is written parses back unchanged.
+        """
         field_name = (
             self.compare_field.name
             if hasattr(self.compare_field, "name")
@@ -170,8 +289,15 @@ class QueryNode(Node):
             if hasattr(self.query_type, "name")
             else str(self.query_type)
         )
-
-        if self.compare_data:
-            return f'%{field_name} &{query_name} "{self.compare_data}"'
-        else:
-            return f"%{field_name} &{query_name}"
+        out.append(f"%{field_name} &{query_name}")
+
+        if self.source_path is not None:
+            out.append(f' @"{_escape(self.source_path)}"')
+        elif self.query_type in SET_QUERY_TYPES:
+            out.append(
+                " ["
+                + ", ".join(f'"{_escape(value)}"' for value in sorted(self.compare_data))
+                + "]"
+            )
+        elif self.compare_data:
+            out.append(f' "{_escape(self.compare_data)}"')
@@ -16,3 +16,5 @@ class QueryType(Enum):
     Not_Ends_With = 8
     Contains = 9
     Not_Contains = 10
+    In = 11  # compare_data is a set of values, e.g. a list of identifiers
+    Not_In = 12
@@ -17,3 +17,5 @@ class UiEvent(Enum):
     QUERY_UPDATED = "query_updated"
     NOTE_CREATED = "note_created"
     ACTION_SELECTED = "action_selected"
+    CONNECTION_TESTED = "connection_tested"
+    TASK_FAILED = "task_failed"
@@ -3,13 +3,14 @@
 import logging
 import tkinter
 from tkinter import ttk
-from typing import Optional
+from typing import Callable, Optional
 
 from controller.connection_manager import ConnectionManager
 from view import IfBlockFrame, QueryFrame, MenuFrame, RepoFrame
 from view.action_submit_frame import ActionSubmitFrame
 from view.connection_frame import ConnectionFrame
 from view.ui_event_manager import UiEventManager
+from view.util.background_worker import BackgroundWorker
 from view.util.FrameUtils import FrameUtils
 
 
@@ -18,7 +19,15 @@ class MasterFrame(ttk.Frame):
     Masterframe draws the main application window. Grid layout
     """
 
-    def __init__(self, connection_manager: ConnectionManager, event_manager: Optional[UiEventManager] = None):
+    def __init__(
+        self,
+        connection_manager: ConnectionManager,
+        event_manager: Optional[UiEventManager] = None,
+        on_first_paint: Optional[Callable[[], None]] = None,
+    ):
+        """
+        :param on_first_paint: called once the window has been laid out and drawn, as the event loop first goes idle
+        """
         if event_manager is None:
             event_manager = UiEventManager()
         self.event_manager = event_manager
@@ -28,6 +37,11 @@ class MasterFrame(ttk.Frame):
         logging.debug(f"Created root: {self.root}")
         super().__init__(self.root)
         self.root.geometry("950x200")
+        # Events published from any thread are delivered on this window's event loop, in batches
+        self.event_manager.enable_async(self.root)
+        # Network calls run on the worker's threads, and their results come back through this window's event loop
+        self.worker = BackgroundWorker(event_manager=self.event_manager)
+        self.worker.attach(self.root)
         logging.debug("About to call set_icon")
         FrameUtils.set_icon(self.root)
         logging.debug("Finished calling set_icon")
@@ -58,5 +72,10 @@ class MasterFrame(ttk.Frame):
         logging.debug("UI initialized successfully!")
 
         self.focus_force()
+        if on_first_paint is not None:
+            self.root.after_idle(on_first_paint)
         self.mainloop()
+        self.worker.shutdown()
+        self.event_manager.disable_async()
+        logging.debug(self.event_manager.timing_report())
         logging.info("UI started successfully!")
@@ -3,6 +3,9 @@ import tkinter
 from tkinter import ttk
 from typing import TYPE_CHECKING
 
+from observer.ui_event import UiEvent
+from view.util.background_worker import BackgroundWorker
+
 if TYPE_CHECKING:
     from view.MasterFrame import MasterFrame
 
@@ -14,35 +17,51 @@ class RepoFrame(ttk.Frame):
         super().__init__(master=parent, padding="3 3 12 12")
         self.master_frame = parent
         self.check_buttons = dict()
+        self._refresh_task = None
 
     def refresh(self):
-        repos = self.master_frame.connection_manager.get_repositories()
+        """
+        Fetch the repository list in the background, and redraw the checkboxes once it arrives. A refresh still in
+        flight is cancelled, so only the latest list is shown.
+        """
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+        connection_manager = self.master_frame.connection_manager
+        self._refresh_task = BackgroundWorker().submit(
+            lambda task: {"repositories": connection_manager.get_repositories()},
+            name="Loading repositories",
+            on_done=lambda data: self.show_repositories(data["repositories"]),
+            event=UiEvent.REPOSITORIES_LOADED,
+        )
+
+    def show_repositories(self, repos: list[dict]):
+        """Draw a checkbox for each repository, replacing any already shown"""
+        self._refresh_task = None
+        for _, checkbutton in self.check_buttons.values():
+            checkbutton.destroy()
+        self.check_buttons.clear()
 
         for index, repo in enumerate(repos):
             checkvar = tkinter.IntVar()
-            self.check_buttons.update(
-                {
-                    repo["uri"]: (
-                        checkvar,
-                        ttk.Checkbutton(
-                            self,
-                            text=repo["repo_code"],
-                            variable=checkvar,
-                            onvalue=1,
-                            offvalue=0,
-                        ).grid(column=index % 3, row=index // 3),
-                    )
-                }
+            checkbutton = ttk.Checkbutton(
+                self,
+                text=repo["repo_code"],
+                variable=checkvar,
+                onvalue=1,
+                offvalue=0,
             )
+            checkbutton.grid(column=index % 3, row=index // 3)
+            self.check_buttons[repo["uri"]] = (checkvar, checkbutton)
 
         for child in self.winfo_children():
             child.grid_configure(padx=2, pady=5)
 
-    def get_selected_repos(self):
-        uris: list = list()
-        for repo, checkbutton in self.check_buttons:
-            checkbutton: ttk.Checkbutton
-            s = None
-            checkbutton.getint(s)
-            if s:
-                uris += [repo]
+    def get_selected_repos(self) -> list[str]:
+        """The uris of the ticked repositories, in the order they are shown"""
+        return [
+            uri for uri, (checkvar, _) in self.check_buttons.items() if checkvar.get()
+        ]
+
+    def get_selected_repo_numbers(self) -> list[int]:
+        """The numbers of the ticked repositories, as QueryManager.run_query_across takes them"""
+        return [int(uri.rstrip("/").rsplit("/", 1)[-1]) for uri in self.get_selected_repos()]
@@ -8,7 +8,6 @@ import model.action_type
 
 if TYPE_CHECKING:
     from view.MasterFrame import MasterFrame
-from view.note_construction_modal_popup import NoteConstructionModalPopup
 from view.util.widget_factories import ScrollableComboboxFactory
 
 
@@ -76,6 +75,9 @@ class ActionSubmitFrame(ttk.Frame):
 
     def define_note(self):
         """Open the note construction modal popup"""
+        # Loaded on first use rather than with the main window, as most runs never define a note
+        from view.note_construction_modal_popup import NoteConstructionModalPopup
+
         NoteConstructionModalPopup(self.master_frame)
 
     def redraw_layout(self):
@@ -3,9 +3,9 @@ from tkinter import ttk
 from typing import TYPE_CHECKING, Optional
 
 from controller.connection_manager import ConnectionManager
-from observer.ui_event import UiEvent
 from view.menu_buttons.MenuButton import MenuButtonWidget, BaseMenuButtonImpl
 from view.ui_event_manager import UiEventManager
+from view.util.background_worker import BackgroundWorker
 from view.util.FrameUtils import FrameUtils
 
 if TYPE_CHECKING:
@@ -67,11 +67,12 @@ class ConnectionDialog:
         self.frame.grab_set()
 
     def close_window(self):
+        # Tested in the background; set_connection publishes CONNECTION_CHANGED with the outcome
         self.connection_manager.set_connection(
-            self.server.get(), self.username.get(), self.password.get()
-        )
-        self.event_manager.publish_event(
-            UiEvent.CONNECTION_CHANGED, {"server": self.server.get()}
+            self.server.get(),
+            self.username.get(),
+            self.password.get(),
+            worker=BackgroundWorker(),
         )
         self.frame.destroy()
 def create_configure_connection_button(parent, connection_manager, **kwargs) -> MenuButtonWidget:
@@ -5,6 +5,7 @@ import tkinter
 from tkinter import ttk, Toplevel
 
 from controller.connection_manager import ConnectionManager
+from view.util.background_worker import BackgroundWorker
 from view.util.FrameUtils import FrameUtils
 from model.credential_index_manager import credential_manager
 from view.menu_buttons.MenuButton import MenuButtonWidget, BaseMenuButtonImpl
@@ -21,6 +22,7 @@ class ManageConnections:
         self.master_frame = master_frame
         self.connection_manager = connection_manager
         self.dialog = None
+        self._test_task = None
 
     def on_click(self) -> None:
         """Handle button click - show the manage connections dialog."""
@@ -36,6 +38,9 @@ class ManageConnections:
 
     def on_close(self) -> None:
         """Handle dialog close."""
+        if self._test_task is not None:
+            self._test_task.cancel()
+            self._test_task = None
         if self.dialog:
             try:
                 self.dialog.destroy()
@@ -230,7 +235,10 @@ class ManageConnections:
             connection = credential_manager.load_credential(selected)
             if connection:
                 self.connection_manager.set_connection(
-                    connection.server, connection.username, connection.password
+                    connection.server,
+                    connection.username,
+                    connection.password,
+                    worker=BackgroundWorker(),
                 )
                 logger.info(f"Loaded connection: {selected.display_name}")
                 FrameUtils.modal_message_popup(
@@ -260,14 +268,35 @@ class ManageConnections:
             )
             return
 
+        def succeeded(_):
+            self._test_task = None
+            FrameUtils.modal_message_popup(
+                self.dialog,
+                f"Connection test successful:\n{selected.display_name}",
+                "Test Successful",
+            )
+
+        def failed(e: Exception):
+            self._test_task = None
+            logger.error(f"Connection test failed: {e}")
+            FrameUtils.modal_message_popup(
+                self.dialog,
+                f"Connection test failed:\n{selected.display_name}\n\nError: {e}",
+                "Test Failed",
+            )
+
         try:
             connection = credential_manager.load_credential(selected)
             if connection:
-                connection.test_connection()
-                FrameUtils.modal_message_popup(
-                    self.dialog,
-                    f"Connection test successful:\n{selected.display_name}",
-                    "Test Successful",
+                if self._test_task is not None:
+                    self._test_task.cancel()
+                # The test can take several seconds of retries, so it runs off the Tk thread; closing the dialog
+                # cancels it
+                self._test_task = BackgroundWorker().submit(
+                    lambda task: connection.test_connection(task.cancel_event),
+                    name=f"Testing {selected.display_name}",
+                    on_done=succeeded,
+                    on_error=failed,
                 )
             else:
                 FrameUtils.modal_message_popup(
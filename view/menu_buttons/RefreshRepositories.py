@@ -1,4 +1,3 @@
-from controller.connection import Connection
 from view.menu_buttons import TestConnection
 from controller.HttpRequestType import HttpRequestType
 from view.menu_buttons.MenuButton import MenuButtonWidget, BaseMenuButtonImpl
@@ -13,6 +12,8 @@ def refresh_repositories(connection):
     :return:
     TODO: What if a user tries with no saved connection. Add logging and error handling
     """
+    from controller.connection import Connection
+
     if connection.test_connection():
         repositories = Connection.query(
             http_request_type=HttpRequestType.GET, endpoint="repositories"
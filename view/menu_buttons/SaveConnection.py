@@ -1,68 +1,85 @@
 from tkinter import ttk, Toplevel
+from typing import TYPE_CHECKING
 
-from controller.connection import Connection
 from controller.connection_exceptions import (
     AuthenticationError,
     NetworkError,
     ServerError,
     ConfigurationError,
 )
+from view.util.background_worker import BackgroundWorker, Task
 from view.util.FrameUtils import FrameUtils
 from model.credential_index_manager import credential_manager
 from view.menu_buttons.MenuButton import MenuButtonWidget, BaseMenuButtonImpl, PopupButton
 
+if TYPE_CHECKING:
+    from controller.connection import Connection
 
-def save_connection(connection: Connection):
+
+def describe_failure(error: Exception) -> str:
+    """The message shown when a connection fails its test and so isn't stored"""
+    if isinstance(error, ConfigurationError):
+        return f"Unable to store connection: Configuration error.\n{error}"
+    if isinstance(error, AuthenticationError):
+        return f"Unable to store connection: Bad username or password.\n{error}"
+    if isinstance(error, NetworkError):
+        return f"Unable to store connection: Network error.\n{error}"
+    if isinstance(error, ServerError):
+        return f"Unable to store connection: Server error.\n{error}"
+    return f"Unable to store connection: Unexpected error.\n{error}"
+
+
+def store_connection(connection: "Connection") -> str:
+    """Store a connection that passed its test in the system keyring, returning the message to show"""
+    try:
+        success = credential_manager.store_credential(
+            connection.server, connection.username, connection.password
+        )
+    except Exception as e:
+        return f"Unable to store connection: Storage error.\n{e}"
+    if success:
+        return f"Successfully stored credentials for:\n{connection.username} @ {connection.server}"
+    return "Failed to store credentials. Check the application logs for details."
+
+
+def save_connection(connection: "Connection") -> Task:
     """
     This function checks the connection, and saves it to the system keyring if, and only if it is valid.
     Now uses the credential index manager for proper discovery.
 
+    The test retries for several seconds against an unreachable server, so it runs on the BackgroundWorker and the
+    connection is stored, and the outcome shown, once it finishes. Closing the dialog cancels the test, and with it
+    the save.
+
     :param connection: see Connection.py
-    :return: None
+    :return: the Task testing the connection
     """
     frame = Toplevel()
     frame.title("Credential Storage")
 
     FrameUtils.set_icon(frame)
-    ttk.Button(
-        frame, width=70, text="Close", command=lambda: ttk.Frame.destroy(frame)
-    ).grid(column=1, row=2)
-    text = "Your connection has been saved."
-
-    try:
-        # Test the connection first
-        connection.test_connection()
-    except ConfigurationError as e:
-        text = f"Unable to store connection: Configuration error.\n{e}"
-    except AuthenticationError as e:
-        text = f"Unable to store connection: Bad username or password.\n{e}"
-    except NetworkError as e:
-        text = f"Unable to store connection: Network error.\n{e}"
-    except ServerError as e:
-        text = f"Unable to store connection: Server error.\n{e}"
-    except Exception as e:
-        text = f"Unable to store connection: Unexpected error.\n{e}"
-    else:
-        # Connection is valid, store it using the index manager
-        try:
-            success = credential_manager.store_credential(
-                connection.server, connection.username, connection.password
-            )
+    label = ttk.Label(frame, text="Testing connection before saving...", wraplength=220)
+    label.grid(column=1, row=1)
 
-            if success:
-                text = f"Successfully stored credentials for:\n{connection.username} @ {connection.server}"
-            else:
-                text = "Failed to store credentials. Check the application logs for details."
+    task = BackgroundWorker().submit(
+        lambda task: connection.test_connection(task.cancel_event),
+        name="Testing connection to save",
+        on_done=lambda _: label.configure(text=store_connection(connection)),
+        on_error=lambda error: label.configure(text=describe_failure(error)),
+    )
 
-        except Exception as e:
-            text = f"Unable to store connection: Storage error.\n{e}"
+    def close() -> None:
+        task.cancel()
+        ttk.Frame.destroy(frame)
 
-    ttk.Label(frame, text=text, wraplength=220).grid(column=1, row=1)
+    ttk.Button(frame, width=70, text="Close", command=close).grid(column=1, row=2)
+    frame.protocol("WM_DELETE_WINDOW", close)
 
     for child in frame.winfo_children():
         child.grid_configure(padx=5, pady=5)
     frame.focus_set()
     frame.grab_set()
+    return task
 
 class SaveConnectionButtonImpl(BaseMenuButtonImpl, PopupButton):
     """Implementation for Save Connection button - also implements PopupButton"""
@@ -1,12 +1,13 @@
 from tkinter import ttk, Toplevel
-
-import asnake.client.web_client
+from typing import Optional
 
 from controller.connection_exceptions import (
     AuthenticationError,
     NetworkError,
-    ServerError,
 )
+from observer.ui_event import UiEvent
+from view.ui_event_manager import UiEventManager
+from view.util.background_worker import BackgroundWorker
 from view.util.FrameUtils import FrameUtils
 from view.menu_buttons.MenuButton import MenuButtonWidget, BaseMenuButtonImpl
 
@@ -30,27 +31,49 @@ class TestConnection:
         ttk.Button(self.frame, width=70, text="Close", command=self.close_window).grid(
             column=1, row=2
         )
-        text = str()
-        try:
-            self.connection.test_connection()
-        except AuthenticationError:
-            text = "Connection failed due to a bad username or password."
-        except asnake.client.web_client.ASnakeAuthError:
-            text = "Connection failed due to a bad username or password."
-        except NetworkError:
-            text = "Connection failed due to a network error. Are you sure you have the correct API address?"
-        except ServerError:
-            text = "Connection failed due to an unknown error."
-        else:
-            text = "Connection successful! Your connection is ready to use."
-        ttk.Label(self.frame, text=text, wraplength=220).grid(column=1, row=1)
+        self.label = ttk.Label(self.frame, text="Testing connection...", wraplength=220)
+        self.label.grid(column=1, row=1)
 
         for child in self.frame.winfo_children():
             child.grid_configure(padx=5, pady=5)
         self.frame.focus_set()
         self.frame.grab_set()
 
+        # The test retries for several seconds against an unreachable server, so it runs off the Tk thread and the
+        # dialog stays responsive; closing it cancels the test
+        self.task = BackgroundWorker().submit(
+            lambda task: self.connection.test_connection(task.cancel_event),
+            name="Testing connection",
+            on_done=lambda _: self.show_result(None),
+            on_error=self.show_result,
+        )
+
+    @staticmethod
+    def describe(error: Optional[Exception]) -> str:
+        """The message shown for the outcome of a connection test"""
+        import asnake.client.web_client
+
+        if error is None:
+            return "Connection successful! Your connection is ready to use."
+        if isinstance(error, (AuthenticationError, asnake.client.web_client.ASnakeAuthError)):
+            return "Connection failed due to a bad username or password."
+        if isinstance(error, NetworkError):
+            return "Connection failed due to a network error. Are you sure you have the correct API address?"
+        return "Connection failed due to an unknown error."
+
+    def show_result(self, error: Optional[Exception]) -> None:
+        self.label.configure(text=self.describe(error))
+        UiEventManager().publish_event(
+            UiEvent.CONNECTION_TESTED,
+            {
+                "connection": self.connection,
+                "is_valid": error is None,
+                "error_message": None if error is None else str(error),
+            },
+        )
+
     def close_window(self):
+        self.task.cancel()
         ttk.Frame.destroy(self.frame)
 
 class TestConnectionButtonImpl(BaseMenuButtonImpl):
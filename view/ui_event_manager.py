@@ -1,10 +1,55 @@
-from typing import Dict, Any
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Any, Iterable, Optional
 
 from observer.subject import SubjectMixin
 from observer.ui_event import UiEvent
 
+# Events that describe the latest state of something, so an observer only needs the newest of those still undelivered
+DEFAULT_COALESCED_EVENTS = frozenset(
+    {
+        UiEvent.QUERY_UPDATED,
+        UiEvent.REPOSITORY_SELECTION_CHANGED,
+        UiEvent.REPOSITORIES_LOADED,
+    }
+)
+
+
+@dataclass
+class ObserverTiming:
+    """How long one observer has spent handling events"""
+
+    observer: str
+    calls: int = 0
+    seconds: float = 0.0
+    slowest: float = 0.0
+    slowest_event: Optional[UiEvent] = None
+
+    @property
+    def average(self) -> float:
+        return self.seconds / self.calls if self.calls else 0.0
+
 
 class UiEventManager(SubjectMixin):
+    """
+    The application's event bus. Publishers call publish_event; every attached observer's handle_event is called with
+    the event.
+
+    By default, events are delivered at once, on the publisher's thread. With enable_async, publishing only queues the
+    event, from any thread, and the queue is delivered on the Tk thread in batches of at most batch_size every
+    interval_ms, so a slow observer never holds up a publisher and no worker thread ever touches a widget. While
+    queued, an event in coalesced_events is replaced by a newer one of the same kind, so a burst of QUERY_UPDATEs is
+    handled once, with the latest data.
+
+    Every call to an observer is timed. timings holds the totals per observer, and a call taking longer than
+    SLOW_HANDLER_SECONDS is logged as a warning. An observer that raises is logged and skipped, and the others still
+    get the event.
+    """
+
+    SLOW_HANDLER_SECONDS = 0.05
+
     _instance = None
     _initialized = False
 
@@ -17,7 +62,137 @@ class UiEventManager(SubjectMixin):
         if not self._initialized:
             super().__init__()
             self._initialized = True
+            self.timings: Dict[str, ObserverTiming] = {}
+            self._lock = threading.Lock()
+            # [event, data, live] for each undelivered event, in the order published
+            self._pending: list[list] = []
+            # The queued entry of each coalesced event
+            self._latest: Dict[UiEvent, list] = {}
+            self.root = None
+            self.coalesced_events = DEFAULT_COALESCED_EVENTS
+            self.batch_size = 50
+            self.interval_ms = 20
+            self._poll_id = None
+
+    @property
+    def is_async(self) -> bool:
+        return self.root is not None
+
+    def enable_async(
+        self,
+        root,
+        coalesced_events: Iterable[UiEvent] = DEFAULT_COALESCED_EVENTS,
+        batch_size: int = 50,
+        interval_ms: int = 20,
+    ) -> None:
+        """
+        Queue published events and deliver them on root's event loop, which must be run by the Tk thread.
+
+        :param root: the Tk root whose after() delivers the queue
+        :param coalesced_events: events of which only the newest undelivered one is kept
+        :param batch_size: most events delivered each interval
+        :param interval_ms: milliseconds between deliveries
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1, not {batch_size}")
+        self.disable_async()
+        self.coalesced_events = frozenset(coalesced_events)
+        self.batch_size = batch_size
+        self.interval_ms = interval_ms
+        self.root = root
+        self._poll_id = root.after(interval_ms, self._poll)
+
+    def disable_async(self) -> None:
+        """Deliver whatever is still queued, then go back to delivering events as they are published"""
+        if self.root is not None and self._poll_id is not None:
+            try:
+                self.root.after_cancel(self._poll_id)
+            except Exception as e:
+                logging.debug(f"Could not cancel event delivery: {e}")
+        self.root = None
+        self._poll_id = None
+        while self.flush():
+            pass
+
+    def _poll(self) -> None:
+        self.flush(self.batch_size)
+        if self.root is not None:
+            self._poll_id = self.root.after(self.interval_ms, self._poll)
 
     def publish_event(self, event: UiEvent, data: Dict[str, Any] = None):
-        """Publish an event to all observers"""
-        self.notify(event, data)
\ No newline at end of file
+        """Publish an event to all observers, at once or, in async mode, on the Tk thread shortly after"""
+        if not self.is_async:
+            self.notify(event, data)
+            return
+        entry = [event, data, True]
+        with self._lock:
+            if event in self.coalesced_events:
+                superseded = self._latest.get(event)
+                if superseded is not None:
+                    superseded[2] = False
+                self._latest[event] = entry
+            self._pending.append(entry)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(1 for _, _, live in self._pending if live)
+
+    def flush(self, limit: Optional[int] = None) -> int:
+        """
+        Deliver queued events, oldest first, on the calling thread, which should be the Tk thread.
+
+        :param limit: most events to deliver. Defaults to all of them
+        :return: how many were delivered
+        """
+        batch = []
+        with self._lock:
+            taken = 0
+            while taken < len(self._pending) and (limit is None or len(batch) < limit):
+                entry = self._pending[taken]
+                taken += 1
+                if entry[2]:
+                    batch.append(entry)
+                    if self._latest.get(entry[0]) is entry:
+                        del self._latest[entry[0]]
+            del self._pending[:taken]
+        for event, data, _ in batch:
+            self.notify(event, data)
+        return len(batch)
+
+    def notify(self, event: UiEvent, data: Dict[str, Any] = None) -> None:
+        """Call every observer's handle_event, timing each, and carry on past any that fail"""
+        if data is None:
+            data = {}
+        # A copy, so an observer may attach or detach others as it handles the event
+        for observer in list(self._observers):
+            started = time.perf_counter()
+            try:
+                observer.handle_event(event, data)
+            except Exception as e:
+                logging.error(
+                    f"{type(observer).__name__} failed to handle {event}: {e}", exc_info=True
+                )
+            self._record(observer, event, time.perf_counter() - started)
+
+    def _record(self, observer, event: UiEvent, seconds: float) -> None:
+        name = type(observer).__name__
+        timing = self.timings.get(name)
+        if timing is None:
+            timing = self.timings[name] = ObserverTiming(name)
+        timing.calls += 1
+        timing.seconds += seconds
+        if seconds > timing.slowest:
+            timing.slowest = seconds
+            timing.slowest_event = event
+        if seconds > self.SLOW_HANDLER_SECONDS:
+            logging.warning(f"{name} took {seconds * 1000:.0f} ms to handle {event}")
+
+    def timing_report(self) -> str:
+        """Time spent in each observer, slowest in total first"""
+        lines = ["Observer timings (calls | total ms | average ms | slowest ms, event):"]
+        for timing in sorted(self.timings.values(), key=lambda t: t.seconds, reverse=True):
+            lines.append(
+                f"  {timing.observer}: {timing.calls} | {timing.seconds * 1000:.1f} | "
+                f"{timing.average * 1000:.2f} | {timing.slowest * 1000:.1f}, {timing.slowest_event}"
+            )
+        return "\n".join(lines)
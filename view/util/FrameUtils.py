@@ -3,8 +3,6 @@ import tkinter
 import logging
 from tkinter import ttk, TclError
 
-from PIL import Image, ImageTk
-
 
 class FrameUtils:
     """
@@ -89,7 +87,9 @@ class FrameUtils:
                 logging.warning(f"Failed to set icon using PhotoImage: {e}")
 
                 try:
-                    # If both methods fail, try using PIL
+                    # If both methods fail, try using PIL, which is only worth loading when it comes to that
+                    from PIL import Image, ImageTk
+
                     icon = Image.open(icon_path)
                     photo = ImageTk.PhotoImage(icon)
                     root.iconphoto(False, photo)
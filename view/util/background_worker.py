@@ -0,0 +1,162 @@
+import logging
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from observer.ui_event import UiEvent
+from view.ui_event_manager import UiEventManager
+
+
+class Task:
+    """
+    A piece of work submitted to the BackgroundWorker. Work that runs for long should check cancelled, or pass
+    cancel_event to whatever it waits on, so cancelling it stops it promptly rather than just discarding its result.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.cancel_event = threading.Event()
+        self.future: Optional[Future] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def cancel(self) -> None:
+        """Stop the work if it hasn't started, ask it to stop if it has, and drop its result either way"""
+        self.cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+
+class BackgroundWorker:
+    """
+    Runs blocking work, such as network calls, on a small pool of worker threads so the Tk event loop never waits on
+    it, then hands each result back to the Tk thread.
+
+    Finished work is put on a queue, which the Tk thread drains every POLL_INTERVAL_MS through root.after, so every
+    callback, and every UiEvent published about the result, runs on the Tk thread and may touch widgets. Until a root
+    is attached, as in tests or without a display, nothing drains the queue by itself; call drain to deliver what has
+    finished.
+
+    A cancelled task's result is dropped rather than delivered.
+    """
+
+    POLL_INTERVAL_MS = 50
+
+    _instance = None
+    _initialized = False
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(
+        self, max_workers: int = 4, event_manager: Optional[UiEventManager] = None
+    ):
+        if self._initialized:
+            return
+        self._initialized = True
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="background-worker"
+        )
+        self.event_manager = event_manager if event_manager is not None else UiEventManager()
+        self.results: queue.Queue = queue.Queue()
+        self.root = None
+        self._poll_id = None
+
+    def attach(self, root) -> None:
+        """Start delivering results on root's event loop"""
+        self.root = root
+        self._poll_id = root.after(self.POLL_INTERVAL_MS, self._poll)
+
+    def _poll(self) -> None:
+        self.drain()
+        self._poll_id = self.root.after(self.POLL_INTERVAL_MS, self._poll)
+
+    def submit(
+        self,
+        work: Callable[[Task], Any],
+        name: str = "",
+        on_done: Optional[Callable[[Any], None]] = None,
+        on_error: Optional[Callable[[Exception], None]] = None,
+        event: Optional[UiEvent] = None,
+    ) -> Task:
+        """
+        Run work(task) on a worker thread.
+
+        :param work: the blocking call, given its Task so it can watch for cancellation
+        :param name: what the work is, for the log and for TASK_FAILED
+        :param on_done: called on the Tk thread with work's return value
+        :param on_error: called on the Tk thread with the exception if work raised one. Without it, the failure is
+            logged and published as UiEvent.TASK_FAILED
+        :param event: published on the Tk thread once work succeeds, with its return value as the data if that is a
+            dict, and as data["result"] otherwise
+        :return: the Task, through which the work can be cancelled
+        """
+        task = Task(name or getattr(work, "__name__", "task"))
+
+        def run() -> None:
+            if task.cancelled:
+                return
+            try:
+                result = work(task)
+            except Exception as e:
+                self.results.put((task, False, e, on_done, on_error, event))
+            else:
+                self.results.put((task, True, result, on_done, on_error, event))
+
+        task.future = self.executor.submit(run)
+        return task
+
+    def drain(self) -> int:
+        """
+        Deliver every result that has finished, on the calling thread, which should be the Tk thread.
+
+        :return: how many results were delivered
+        """
+        delivered = 0
+        while True:
+            try:
+                task, succeeded, value, on_done, on_error, event = self.results.get_nowait()
+            except queue.Empty:
+                return delivered
+            if task.cancelled:
+                logging.debug(f"Dropping the result of cancelled task {task.name}")
+                continue
+            delivered += 1
+            try:
+                if succeeded:
+                    if event is not None:
+                        data: Dict[str, Any] = value if isinstance(value, dict) else {"result": value}
+                        self.event_manager.publish_event(event, data)
+                    if on_done is not None:
+                        on_done(value)
+                elif on_error is not None:
+                    on_error(value)
+                else:
+                    logging.warning(f"Background task {task.name} failed: {value}")
+                    self.event_manager.publish_event(
+                        UiEvent.TASK_FAILED, {"task": task.name, "error": value}
+                    )
+            except Exception as e:
+                # One bad callback mustn't stop the rest being delivered, nor the polling loop
+                logging.error(f"Error handling the result of {task.name}: {e}", exc_info=True)
+
+    def shutdown(self) -> None:
+        """Stop polling and abandon queued work, without waiting for work in progress"""
+        if self.root is not None and self._poll_id is not None:
+            try:
+                self.root.after_cancel(self._poll_id)
+            except Exception as e:
+                logging.debug(f"Could not cancel background polling: {e}")
+        self.root = None
+        self._poll_id = None
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        type(self)._instance = None
+        self._initialized = False
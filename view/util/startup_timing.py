@@ -0,0 +1,102 @@
+import builtins
+import importlib.util
+import sys
+import threading
+import time
+from typing import Optional
+
+
+class StartupTimer:
+    """
+    Times application startup: how long each phase took to finish, measured from when the timer was made, and how long
+    each module imported along the way took to load, in the manner of python -X importtime.
+
+    Imports are timed by wrapping builtins.__import__ between start and stop, on the thread that called start. Only
+    modules not yet loaded are timed. Self time excludes the modules a module's own imports loaded; cumulative time
+    includes them.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        # (phase, seconds since the timer was made)
+        self.phases: list[tuple[str, float]] = []
+        # (module, nesting depth, self seconds, cumulative seconds), in the order the imports finished
+        self.imports: list[tuple[str, int, float, float]] = []
+        self._original_import = None
+        self._thread: Optional[int] = None
+        # Seconds spent in nested imports, one entry per import in progress
+        self._children: list[float] = []
+
+    def start(self) -> None:
+        """Start timing imports"""
+        if self._original_import is not None:
+            return
+        self._original_import = builtins.__import__
+        self._thread = threading.get_ident()
+        builtins.__import__ = self._timed_import
+
+    def stop(self) -> None:
+        """Stop timing imports, putting the usual import machinery back"""
+        if self._original_import is None:
+            return
+        builtins.__import__ = self._original_import
+        self._original_import = None
+
+    def mark(self, phase: str) -> None:
+        """Record that startup has reached a phase"""
+        self.phases.append((phase, time.perf_counter() - self.started))
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original_import
+        if threading.get_ident() != self._thread:
+            return original(name, globals, locals, fromlist, level)
+        module = name
+        if level:
+            try:
+                module = importlib.util.resolve_name(
+                    "." * level + name, (globals or {}).get("__package__")
+                )
+            except (ImportError, ValueError):
+                pass
+        if module in sys.modules:
+            # from package import submodule loads the submodules through the fromlist, so time those instead
+            package = sys.modules[module]
+            missing = [
+                f"{module}.{item}"
+                for item in fromlist or ()
+                if item != "*"
+                and hasattr(package, "__path__")
+                and not hasattr(package, item)
+                and f"{module}.{item}" not in sys.modules
+            ]
+            if not missing:
+                return original(name, globals, locals, fromlist, level)
+            module = ", ".join(missing)
+
+        self._children.append(0.0)
+        started = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - started
+            children = self._children.pop()
+            if self._children:
+                self._children[-1] += elapsed
+            self.imports.append(
+                (module, len(self._children), elapsed - children, elapsed)
+            )
+
+    def report(self, top: int = 20) -> str:
+        """The phases and the top slowest imports, by cumulative time, as a table for the log"""
+        lines = ["Startup timing (seconds since start):"]
+        lines += [f"  {seconds:8.3f}s  {phase}" for phase, seconds in self.phases]
+        if self.imports:
+            lines.append(
+                f"{top} slowest of {len(self.imports)} imports (self ms | cumulative ms | module):"
+            )
+            slowest = sorted(self.imports, key=lambda entry: entry[3], reverse=True)
+            for module, depth, self_seconds, seconds in slowest[:top]:
+                lines.append(
+                    f"  {self_seconds * 1000:8.1f} | {seconds * 1000:8.1f} | {'  ' * depth}{module}"
+                )
+        return "\n".join(lines)